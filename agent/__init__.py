@@ -1,32 +1,95 @@
-from .flow import run_agent, neo4j_agent_workflow
-from .state import AgentState
-from .nodes import (
-    classify_query,
-    extract_entities,
-    generate_cypher,
-    execute_cypher,
-    generate_response
-)
-from .prompts import (
-    gspatial_summary,
-    classification_prompt,
-    entity_extraction_prompt,
-    cypher_generation_prompt,
-    response_generation_prompt
-)
+"""
+The package exports are loaded on first access (PEP 562), so `import agent`
+does not pull in LangGraph, LangChain or the Neo4j driver. Nothing connects
+or builds until it is used: the chat model (nodes.get_llm), the driver
+(db.get_driver), the schema (schema.get_schema) and the default workflow
+(flow.get_workflow) are all created lazily.
+"""
+import importlib
 
-__all__ = [
-    'run_agent',
-    'neo4j_agent_workflow',
-    'AgentState',
-    'classify_query',
-    'extract_entities',
-    'generate_cypher',
-    'execute_cypher',
-    'generate_response',
-    'gspatial_summary',
-    'classification_prompt',
-    'entity_extraction_prompt',
-    'cypher_generation_prompt',
-    'response_generation_prompt'
-]
+# exported name -> submodule that defines it
+_EXPORTS = {
+    'run_agent': 'flow',
+    'arun_agent': 'flow',
+    'astream_agent': 'flow',
+    'neo4j_agent_workflow': 'flow',
+    'get_workflow': 'flow',
+    'run_session': 'flow',
+    'arun_session': 'flow',
+    'get_session_workflow': 'flow',
+    'get_checkpointer': 'checkpoint',
+    'SQLiteSaver': 'checkpoint',
+    'BoundedInMemorySaver': 'checkpoint',
+    'AgentState': 'state',
+    'iter_query_result': 'results',
+    'remove_query_result': 'results',
+    'Neo4jDriverManager': 'db',
+    'get_driver_manager': 'db',
+    'get_driver': 'db',
+    'get_pool_stats': 'db',
+    'close_driver': 'db',
+    'SchemaCache': 'schema',
+    'get_schema_cache': 'schema',
+    'get_schema': 'schema',
+    'invalidate_schema': 'schema',
+    'SchemaIntrospector': 'introspection',
+    'QuestionCache': 'cache',
+    'get_question_cache': 'cache',
+    'ResultCache': 'cache',
+    'get_result_cache': 'cache',
+    'invalidate_results': 'cache',
+    'Gazetteer': 'gazetteer',
+    'get_gazetteer': 'gazetteer',
+    'STRTree': 'spatial_index',
+    'EnvelopeIndex': 'spatial_index',
+    'get_envelope_index': 'spatial_index',
+    'QueryTypeClassifier': 'classifier',
+    'get_query_classifier': 'classifier',
+    'MetricsRegistry': 'metrics',
+    'get_metrics_registry': 'metrics',
+    'write_metrics': 'metrics',
+    'start_metrics_server': 'metrics',
+    'AgentService': 'service',
+    'AdmissionController': 'service',
+    'classify_query': 'nodes',
+    'extract_entities': 'nodes',
+    'resolve_entities': 'nodes',
+    'generate_cypher': 'nodes',
+    'parameterize_cypher': 'nodes',
+    'validate_cypher': 'nodes',
+    'execute_cypher': 'nodes',
+    'generate_response': 'nodes',
+    'plan_query': 'nodes',
+    'get_llm': 'nodes',
+    'aclassify_query': 'async_nodes',
+    'aextract_entities': 'async_nodes',
+    'aresolve_entities': 'async_nodes',
+    'agenerate_cypher': 'async_nodes',
+    'avalidate_cypher': 'async_nodes',
+    'aexecute_cypher': 'async_nodes',
+    'agenerate_response': 'async_nodes',
+    'aplan_query': 'async_nodes',
+    'gspatial_summary': 'prompts',
+    'classification_prompt': 'prompts',
+    'entity_extraction_prompt': 'prompts',
+    'cypher_generation_prompt': 'prompts',
+    'planner_prompt': 'prompts',
+    'response_generation_prompt': 'prompts'
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    # Later lookups find the export directly and skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = list(_EXPORTS)
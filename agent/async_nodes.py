@@ -0,0 +1,219 @@
+import os
+import asyncio
+import weakref
+import threading
+from typing import Dict, Any
+
+from . import nodes
+from .db import get_async_session
+from .results import RowCollector, result_settings
+from .classifier import classify_locally
+from .planner import PLAN_RESPONSE_FORMAT
+from .metrics import record_llm_usage
+from .session import followup_entities
+from .prompts import (
+    classification_prompt,
+    entity_extraction_prompt,
+    cypher_generation_prompt,
+    planner_prompt,
+    response_generation_prompt
+)
+from .nodes import (
+    _parse_query_type,
+    _parse_entities,
+    _cypher_prompt_input,
+    _compile_template,
+    _cypher_generated,
+    _planner_prompt_input,
+    _plan_update,
+    _explain_query,
+    _start_execution,
+    _prefilter_plan,
+    _apply_prefilter,
+    _cached_result,
+    _store_result,
+    _db_timings,
+    _execution_succeeded,
+    _execution_failed,
+    _error_response,
+    _fast_response,
+    _response_prompt_input
+)
+
+
+class _LoopSemaphore:
+    """
+    Bounded-concurrency limiter shared by all coroutines of an event loop.
+    asyncio primitives are bound to one loop, so each loop gets its own
+    semaphore; loops in different threads never share or replace one.
+    """
+
+    def __init__(self, env_name: str, default: int):
+        self.env_name = env_name
+        self.default = default
+        self._lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def limit(self) -> int:
+        try:
+            return int(os.getenv(self.env_name, self.default))
+        except ValueError:
+            return self.default
+
+    def _get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(loop, asyncio.Semaphore(self.limit))
+        return semaphore
+
+    async def __aenter__(self):
+        await self._get().acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        # Same loop, so the same semaphore as in __aenter__
+        self._get().release()
+
+
+# Concurrency limits for in-flight LLM calls and database queries
+llm_semaphore = _LoopSemaphore("LLM_MAX_CONCURRENCY", 32)
+db_semaphore = _LoopSemaphore("NEO4J_MAX_CONCURRENCY", int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")))
+
+
+async def _ainvoke(prompt, prompt_input: Dict[str, Any], **bind_kwargs):
+    # Resolve the model at call time so a replaced nodes.llm is honoured
+    model = nodes.get_llm()
+    chain = prompt | (model.bind(**bind_kwargs) if bind_kwargs else model)
+    async with llm_semaphore:
+        result = await chain.ainvoke(prompt_input)
+    record_llm_usage(result)
+    return result
+
+
+async def aclassify_query(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify the type of the user's query (async)."""
+    # The local classifier takes ~0.1 ms, no need to leave the loop
+    local = classify_locally(state["question"])
+    if local is not None:
+        return {**local, "query_type_source": "classifier"}
+
+    result = await _ainvoke(classification_prompt, {
+        "input": state["question"],
+        "schema": ""  # Add schema if needed
+    })
+    return {"query_type": _parse_query_type(result.content), "query_type_confidence": None, "query_type_source": "llm"}
+
+
+async def aextract_entities(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract entities from the user's query (async)."""
+    if state.get("followup"):
+        return followup_entities(state["session_context"])
+    result = await _ainvoke(entity_extraction_prompt, {"input": state["question"]})
+    return {"entities": _parse_entities(result.content)}
+
+
+async def aresolve_entities(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Ground the extracted place names in the gazetteer (async)."""
+    # Lookups take microseconds, but the first one loads the index from Neo4j
+    return await asyncio.to_thread(nodes.resolve_entities, state)
+
+
+async def agenerate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a Cypher query based on the query type and entities (async)."""
+    # The schema may need a blocking load on first use, keep it off the loop
+    compiled = await asyncio.to_thread(_compile_template, state)
+    if compiled is not None:
+        return compiled
+    prompt_input = await asyncio.to_thread(_cypher_prompt_input, state)
+
+    try:
+        result = await _ainvoke(cypher_generation_prompt, prompt_input)
+        return _cypher_generated(state, result.content)
+
+    except Exception as e:
+        return {
+            "cypher_query": None,
+            "error": f"Failed to generate Cypher query: {str(e)}"
+        }
+
+
+async def aplan_query(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan the query in one structured-output call (async, planner mode)."""
+    prompt_input = await asyncio.to_thread(_planner_prompt_input, state)
+    try:
+        result = await _ainvoke(planner_prompt, prompt_input, response_format=PLAN_RESPONSE_FORMAT)
+    except Exception as e:
+        print(f"Warning: Planner call failed, falling back to separate calls: {e}")
+        return {"plan": None, "cypher_query": None}
+    return _plan_update(state, result.content)
+
+
+async def avalidate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Check the generated query with EXPLAIN before executing it (async)."""
+    retry_context = _start_execution(state)
+    if not state.get("cypher_query") or os.getenv("CYPHER_VALIDATE", "true").lower() in ("0", "false", "no"):
+        return {"retry_context": retry_context}
+
+    try:
+        async with db_semaphore:
+            async with get_async_session() as session:
+                result = await session.run(_explain_query(state["cypher_query"]), state.get("cypher_params") or {})
+                await result.consume()
+        return {"retry_context": retry_context, "error": None}
+
+    except Exception as e:
+        return _execution_failed(retry_context, e)
+
+
+async def aexecute_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute the generated Cypher query against Neo4j with the async driver."""
+    retry_context = _start_execution(state)
+    fetch_size, row_cap, spill_dir = result_settings()
+
+    # The lookup may read the database marker with the sync driver
+    cache_key, cached = await asyncio.to_thread(_cached_result, state, row_cap)
+    if cached is not None:
+        return _execution_succeeded(retry_context, {**cached, "db_timings": None})
+    collector = RowCollector(row_cap, spill_dir)
+
+    try:
+        async with db_semaphore:
+            async with get_async_session(fetch_size=fetch_size) as session:
+                query, params, prefilter_stats = state["cypher_query"], state.get("cypher_params") or {}, None
+                plan = _prefilter_plan(state)
+                if plan is not None:
+                    try:
+                        ids = await session.run(plan["id_query"], params)
+                        # The envelope index may need a blocking load on first use
+                        prefiltered = await asyncio.to_thread(_apply_prefilter, state, plan, await ids.single())
+                        query, params, prefilter_stats = prefiltered["query"], prefiltered["params"], prefiltered["stats"]
+                    except Exception as e:
+                        print(f"Warning: Spatial prefilter skipped: {str(e)}")
+
+                result = await session.run(query, params)
+                async for record in result:
+                    collector.add(record)
+                summary = await result.consume()
+        result_update = {**collector.finish(), "prefilter_stats": prefilter_stats, "result_cache_hit": False}
+        _store_result(state, cache_key, result_update, summary)
+        return _execution_succeeded(retry_context, {**result_update, "db_timings": _db_timings(summary)})
+
+    except Exception as e:
+        collector.abort()
+        return _execution_failed(retry_context, e)
+
+
+async def agenerate_response(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a natural language response based on the query results (async)."""
+    if state.get("error"):
+        return _error_response(state)
+
+    fast = _fast_response(state)
+    if fast is not None:
+        return fast
+
+    result = await _ainvoke(response_generation_prompt, _response_prompt_input(state))
+    return {"response": result.content.strip(), "response_source": "llm"}
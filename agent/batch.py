@@ -0,0 +1,275 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Iterable, Set
+
+from .results import to_jsonable
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """
+    Load questions from a text file (one question per line) or a JSONL file
+    with a "question" field and an optional "id". Line numbers are used as ids
+    when none is given, so ids stay stable across resumed runs.
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                questions.append({"id": str(item.get("id", line_no)), "question": item["question"]})
+            else:
+                questions.append({"id": str(line_no), "question": line})
+    return questions
+
+
+def load_finished_ids(path: str) -> Set[str]:
+    """Return the ids of questions that already completed in an output JSONL file."""
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Ignore a partially written last line from an interrupted run
+                continue
+            if isinstance(record, dict) and record.get("status") == "ok":
+                finished.add(str(record.get("id")))
+    return finished
+
+
+def truncate_partial_line(path: str) -> None:
+    """Drop an unterminated last line left by an interrupted run, so appended records start on a line of their own."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            size = min(65536, position)
+            f.seek(position - size)
+            chunk = f.read(size)
+            if position == end and chunk.endswith(b"\n"):
+                return
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(position - size + newline + 1)
+                return
+            position -= size
+        f.truncate(0)
+
+
+# "Rate limit reached", "rate_limit_exceeded", "Too Many Requests", "Error code: 429"
+RATE_LIMIT_TEXT = re.compile(
+    r"rate[ _-]?limit|too many requests|\b(?:error code|status(?: code)?|http)\W{0,3}429\b",
+    re.IGNORECASE
+)
+
+
+def is_rate_limit_error(error: Any) -> bool:
+    """Detect LLM rate-limit errors, raised or reported as a state error string."""
+    if error is None:
+        return False
+    if type(error).__name__ == "RateLimitError" or getattr(error, "status_code", None) == 429:
+        return True
+    # A bare 429 also occurs in coordinates and Neo4j line/offset positions
+    return RATE_LIMIT_TEXT.search(str(error)) is not None
+
+
+class RateLimitBackoff:
+    """
+    Shared exponential backoff for all batch workers.
+    When any worker hits a rate limit every worker pauses until the cooldown
+    ends, and the delay grows with consecutive hits and shrinks on success.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._streak = 0
+        self.hits = 0
+
+    def wait(self) -> None:
+        delay = self._cooldown_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_rate_limit(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.hits += 1
+            self._streak += 1
+            delay = retry_after or min(self.base_delay * (2 ** (self._streak - 1)), self.max_delay)
+            # Jitter spreads the workers' retries
+            delay *= 1 + random.random() * 0.25
+            self._cooldown_until = max(self._cooldown_until, time.time() + delay)
+
+    def on_success(self) -> None:
+        if self._streak:
+            with self._lock:
+                self._streak = max(self._streak - 1, 0)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after")) if headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def run_question(question: str, workflow=None) -> Dict[str, Any]:
+    """
+    Run one question through the workflow and return the final state together
+    with the time (seconds since start) at which each node finished.
+    """
+    if workflow is None:
+        from .flow import get_workflow
+        workflow = get_workflow()
+    from .flow import _initial_state
+
+    start = time.perf_counter()
+    timings = {}
+    state = {}
+    for mode, chunk in workflow.stream(_initial_state(question), stream_mode=["updates", "values"]):
+        if mode == "updates":
+            for node in chunk:
+                timings[node] = round(time.perf_counter() - start, 4)
+        else:
+            state = chunk
+    timings["total"] = round(time.perf_counter() - start, 4)
+    return {"state": state, "timings": timings}
+
+
+class BatchRunner:
+    """
+    Run many questions concurrently and stream one JSON line per question to
+    `output_path` as each one completes. Questions already recorded with
+    status "ok" in the output file are skipped, so interrupted runs resume;
+    questions that ended with an error (e.g. still rate limited after
+    `max_retries`) are recorded as "failed" and run again.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        workers: int = 4,
+        max_retries: int = 5,
+        resume: bool = True,
+        backoff: Optional[RateLimitBackoff] = None,
+        workflow=None
+    ):
+        self.output_path = output_path
+        self.workers = workers
+        self.max_retries = max_retries
+        self.resume = resume
+        self.backoff = backoff or RateLimitBackoff()
+        self.workflow = workflow
+        self._write_lock = threading.Lock()
+
+    def _run_one(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        record = {"id": item["id"], "question": item["question"]}
+        attempts = 0
+        while True:
+            attempts += 1
+            self.backoff.wait()
+            try:
+                result = run_question(item["question"], self.workflow)
+                state = result["state"]
+                if is_rate_limit_error(state.get("error")) and attempts <= self.max_retries:
+                    self.backoff.on_rate_limit()
+                    continue
+                if not is_rate_limit_error(state.get("error")):
+                    self.backoff.on_success()
+                rows = state.get("query_result")
+                record.update({
+                    "status": "failed" if state.get("error") else "ok",
+                    "query_type": state.get("query_type"),
+                    "query_type_source": state.get("query_type_source"),
+                    "entities": state.get("entities"),
+                    "cypher_query": state.get("cypher_query"),
+                    "row_count": state.get("row_count", len(rows) if isinstance(rows, list) else None),
+                    "rows": rows,
+                    "result_path": state.get("result_path"),
+                    "response": state.get("response"),
+                    "response_source": state.get("response_source"),
+                    "error": state.get("error"),
+                    "timings": result["timings"],
+                    "node_metrics": state.get("node_metrics") or None
+                })
+                break
+            except Exception as e:
+                if is_rate_limit_error(e) and attempts <= self.max_retries:
+                    self.backoff.on_rate_limit(_retry_after(e))
+                    continue
+                record.update({"status": "failed", "error": str(e)})
+                break
+        record["attempts"] = attempts
+        return record
+
+    def _write(self, out, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=to_jsonable)
+        with self._write_lock:
+            out.write(line + "\n")
+            out.flush()
+
+    def run(self, questions: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run the batch and return a summary of the run."""
+        questions = list(questions)
+        finished = load_finished_ids(self.output_path) if self.resume else set()
+        pending = [item for item in questions if item["id"] not in finished]
+        summary = {
+            "total": len(questions),
+            "skipped": len(questions) - len(pending),
+            "ok": 0,
+            "failed": 0,
+            "rate_limit_hits": 0,
+            "fast_path": 0,
+            "fast_path_share": 0.0,
+            "elapsed": 0.0
+        }
+
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        if self.resume:
+            truncate_partial_line(self.output_path)
+        with open(self.output_path, "a" if self.resume else "w", encoding="utf-8") as out:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self._run_one, item) for item in pending]
+                for done, future in enumerate(as_completed(futures), 1):
+                    record = future.result()
+                    self._write(out, record)
+                    summary[record["status"]] += 1
+                    if record.get("response_source") == "template":
+                        summary["fast_path"] += 1
+                    print(f"[{done}/{len(pending)}] {record['id']} {record['status']}")
+
+        summary["rate_limit_hits"] = self.backoff.hits
+        # Share of answered questions whose response skipped the LLM
+        summary["fast_path_share"] = round(summary["fast_path"] / summary["ok"], 3) if summary["ok"] else 0.0
+        summary["elapsed"] = round(time.perf_counter() - start, 3)
+        return summary
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int = 4,
+    max_retries: int = 5,
+    resume: bool = True,
+    workflow=None
+) -> Dict[str, Any]:
+    """Run every question in `input_path` and stream results to `output_path` (JSONL)."""
+    runner = BatchRunner(output_path, workers=workers, max_retries=max_retries, resume=resume, workflow=workflow)
+    return runner.run(load_questions(input_path))
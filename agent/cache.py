@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import re
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+from .db import get_session
+from .results import ResultRows, to_jsonable
+
+from .prompts import (
+    classification_prompt,
+    entity_extraction_prompt,
+    cypher_generation_prompt,
+    planner_prompt
+)
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an entry limit and a TTL, and
+    optionally a limit on the total size of the values (`max_bytes`, with
+    sizes given to put()).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.bytes = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at, size = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.bytes -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, size: int = 0) -> None:
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self.bytes -= item[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Persistent key/value tier backed by SQLite, with entry limit and TTL."""
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            # Evict the least recently used entries beyond the limit
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM cache").fetchone()[0]
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups (Unicode form, case, spacing, trailing punctuation)."""
+    text = unicodedata.normalize("NFKC", question).strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" .?!。？！")
+
+
+def prompt_version() -> str:
+    """Hash of the prompt templates that influence the cached plan."""
+    templates = [
+        classification_prompt.template,
+        entity_extraction_prompt.template,
+        cypher_generation_prompt.template,
+        planner_prompt.template
+    ]
+    return hashlib.sha256("\x00".join(templates).encode("utf-8")).hexdigest()[:12]
+
+
+class QuestionCache:
+    """
+    Cache of question → (query_type, entities, cypher_query).
+
+    Keys combine the normalized question, the schema fingerprint and the
+    prompt version, so a schema or prompt change never serves a stale plan.
+    Lookups go to an in-memory LRU tier first and then to an optional SQLite
+    tier; disk hits are promoted to memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        max_disk_entries: Optional[int] = None
+    ):
+        max_entries = max_entries or int(os.getenv("QUESTION_CACHE_SIZE", "1024"))
+        ttl = ttl if ttl is not None else float(os.getenv("QUESTION_CACHE_TTL", "86400"))
+        path = path if path is not None else os.getenv("QUESTION_CACHE_PATH")
+        self.memory = LRUCache(max_entries, ttl)
+        self.disk = SQLiteCache(
+            path,
+            max_entries=max_disk_entries or int(os.getenv("QUESTION_CACHE_DISK_SIZE", "100000")),
+            ttl=ttl
+        ) if path else None
+        self._prompt_version = prompt_version()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def make_key(self, question: str, schema_fingerprint: Optional[str]) -> str:
+        payload = "\x00".join([normalize_question(question), schema_fingerprint or "", self._prompt_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def invalidate(self) -> None:
+        """Drop every cached entry from both tiers."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_entries": len(self.disk) if self.disk is not None else None
+        }
+
+
+_question_cache: Optional[QuestionCache] = None
+_question_cache_lock = threading.Lock()
+
+
+def get_question_cache() -> QuestionCache:
+    """Return the process-wide question cache."""
+    global _question_cache
+    if _question_cache is None:
+        with _question_cache_lock:
+            if _question_cache is None:
+                _question_cache = QuestionCache()
+    return _question_cache
+
+
+def question_cache_enabled() -> bool:
+    return os.getenv("QUESTION_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+_CYPHER_STRING = re.compile(r"('(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|`[^`]*`)")
+WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+
+# Node and relationship totals come from the count store, so the default
+# marker is O(1); it catches inserts and deletes but not property updates
+DEFAULT_MARKER_QUERY = (
+    "CALL { MATCH (n) RETURN count(n) AS nodes } "
+    "CALL { MATCH ()-[r]->() RETURN count(r) AS relationships } "
+    "RETURN [nodes, relationships] AS marker"
+)
+
+
+def normalize_cypher(query: str) -> str:
+    """Collapse whitespace outside string literals and quoted identifiers."""
+    parts = _CYPHER_STRING.split(query.strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def is_write_query(query: str) -> bool:
+    """Whether the query contains a clause that modifies the graph (string literals ignored)."""
+    parts = _CYPHER_STRING.split(query)
+    return any(WRITE_CLAUSE.search(part) for part in parts[::2])
+
+
+class ResultCache:
+    """
+    Cache of executed Cypher → result state update (query_result, row_count,
+    result_truncated).
+
+    Keys combine the normalized query text, its parameters, the database and
+    the row cap. Memory is bounded by the JSON size of the cached results
+    (`max_bytes`), least recently used entries going first. Entries expire
+    after `ttl` seconds, are dropped by invalidate(), when a query that
+    wrote to the graph runs through the agent, and when the database marker
+    (`marker_query`, checked at most every `marker_interval` seconds)
+    changes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        marker_query: Optional[str] = None,
+        marker_interval: Optional[float] = None,
+        max_entries: int = 100000,
+        session_factory: Callable = get_session
+    ):
+        max_bytes = max_bytes or int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        ttl = ttl if ttl is not None else float(os.getenv("RESULT_CACHE_TTL", "600"))
+        self.memory = LRUCache(max_entries, ttl, max_bytes=max_bytes)
+        self.marker_query = marker_query if marker_query is not None else os.getenv("RESULT_CACHE_MARKER_QUERY", DEFAULT_MARKER_QUERY)
+        self.marker_interval = marker_interval if marker_interval is not None else float(os.getenv("RESULT_CACHE_MARKER_INTERVAL", "5"))
+        self.session_factory = session_factory
+        self._marker = _MISSING
+        self._marker_checked_at = 0.0
+        self._marker_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def make_key(self, query: str, params: Optional[Dict[str, Any]], row_cap: int) -> str:
+        payload = "\x00".join([
+            normalize_cypher(query),
+            json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=to_jsonable),
+            os.getenv("NEO4J_DATABASE", ""),
+            str(row_cap)
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _check_marker(self) -> None:
+        if not self.marker_query or time.time() - self._marker_checked_at < self.marker_interval:
+            return
+        with self._marker_lock:
+            if time.time() - self._marker_checked_at < self.marker_interval:
+                return
+            try:
+                with self.session_factory() as session:
+                    record = session.run(self.marker_query).single()
+                marker = record["marker"] if record is not None else None
+            except Exception as e:
+                print(f"Warning: Could not read the result cache marker: {str(e)}")
+                marker = _MISSING
+            if marker is _MISSING or (self._marker is not _MISSING and marker != self._marker):
+                # The data changed, or its state is unknown
+                self.invalidate()
+            self._marker = marker
+            self._marker_checked_at = time.time()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._check_marker()
+        value = self.memory.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {**value, "query_result": ResultRows(value["query_result"])}
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result update; spilled results (result_path) are not cached."""
+        if value.get("result_path"):
+            return
+        entry = {
+            "query_result": list(value["query_result"]),
+            "row_count": value["row_count"],
+            "result_truncated": value["result_truncated"],
+            "result_path": None
+        }
+        size = len(json.dumps(entry, ensure_ascii=False, default=to_jsonable).encode("utf-8"))
+        self.memory.put(key, entry, size=size)
+
+    def invalidate(self) -> None:
+        """Drop every cached result."""
+        self.memory.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+            "max_bytes": self.memory.max_bytes,
+            "evictions": self.memory.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache()
+    return _result_cache
+
+
+def result_cache_enabled() -> bool:
+    return os.getenv("RESULT_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def invalidate_results() -> None:
+    """Drop every cached query result, e.g. after writing to the database outside the agent."""
+    get_result_cache().invalidate()
@@ -0,0 +1,428 @@
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+    get_checkpoint_metadata
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .cache import LRUCache
+from .results import ResultRows, to_jsonable
+
+
+# Marker of a result stored by reference in a checkpoint
+REF_KEY = "__result_ref__"
+
+
+class ResultStore:
+    """
+    Query result rows referenced from session checkpoints. Rows are kept in
+    memory (LRU, SESSION_RESULT_MAX_ENTRIES) or, with `path`, in a table of
+    the session SQLite database next to the checkpoints.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries or int(os.getenv("SESSION_RESULT_MAX_ENTRIES", "1000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_TTL", str(7 * 86400)))
+        self._memory = LRUCache(self.max_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_results (ref TEXT PRIMARY KEY, rows TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def put(self, rows: List[Any]) -> str:
+        ref = uuid.uuid4().hex
+        if self._conn is None:
+            self._memory.put(ref, rows)
+            return ref
+        data = json.dumps(list(rows), ensure_ascii=False, default=to_jsonable)
+        with self._lock:
+            self._conn.execute("INSERT INTO session_results (ref, rows, created_at) VALUES (?, ?, ?)", (ref, data, time.time()))
+            if self.ttl:
+                self._conn.execute("DELETE FROM session_results WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        return ref
+
+    def get(self, ref: str) -> Optional[List[Any]]:
+        rows = self._memory.get(ref)
+        if rows is not None or self._conn is None:
+            return rows
+        with self._lock:
+            row = self._conn.execute("SELECT rows FROM session_results WHERE ref = ?", (ref,)).fetchone()
+        if row is None:
+            return None
+        rows = json.loads(row[0])
+        # Later turns of the session read the same rows again
+        self._memory.put(ref, rows)
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory_entries": len(self._memory), "path": self.path}
+        if self._conn is not None:
+            with self._lock:
+                stats["stored"] = self._conn.execute("SELECT COUNT(*) FROM session_results").fetchone()[0]
+        return stats
+
+
+class ResultRefSerializer:
+    """
+    Checkpoint serializer that stores every ResultRows (query_result) in a
+    ResultStore and writes only its reference, so a large result is stored
+    once per turn rather than in every checkpoint. Everything else goes to
+    the wrapped serializer (JsonPlusSerializer by default).
+    """
+
+    def __init__(self, store: ResultStore, serde=None):
+        self.store = store
+        self.serde = serde or JsonPlusSerializer()
+
+    def _externalize(self, value: Any) -> Any:
+        if isinstance(value, ResultRows):
+            if not value:
+                return []
+            if value.ref is None:
+                value.ref = self.store.put(value)
+            return {REF_KEY: value.ref, "rows": len(value)}
+        if type(value) is dict:
+            return {key: self._externalize(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._externalize(item) for item in value)
+        return value
+
+    def _internalize(self, value: Any) -> Any:
+        if type(value) is dict:
+            if REF_KEY in value and len(value) == 2:
+                stored = self.store.get(value[REF_KEY])
+                rows = ResultRows(stored or [])
+                rows.ref = value[REF_KEY]
+                # Evicted or past SESSION_TTL: say so instead of passing for an empty result
+                rows.expired = stored is None
+                return rows
+            return {key: self._internalize(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._internalize(item) for item in value)
+        return value
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.serde.dumps_typed(self._externalize(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self._internalize(self.serde.loads_typed(data))
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(self._externalize(obj))
+
+    def loads(self, data: bytes) -> Any:
+        return self._internalize(self.serde.loads(data))
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """
+    InMemorySaver for a long-running process: each thread keeps only its
+    newest `max_checkpoints` checkpoints (pruned in batches, with the writes
+    and channel blobs nothing references any more), at most `max_threads`
+    threads are kept (least recently used dropped first), and threads idle
+    for `ttl` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        serde=None,
+        max_checkpoints: Optional[int] = None,
+        max_threads: Optional[int] = None,
+        ttl: Optional[float] = None
+    ):
+        super().__init__(serde=serde)
+        self.max_checkpoints = max_checkpoints or int(os.getenv("SESSION_MAX_CHECKPOINTS", "20"))
+        self.max_threads = max_threads or int(os.getenv("SESSION_MAX_THREADS", "500"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_TTL", str(7 * 86400)))
+        # thread_id -> last checkpoint time, least recently used first
+        self._threads: "OrderedDict[str, float]" = OrderedDict()
+        # (thread_id, checkpoint_ns) -> keys of its channel blobs
+        self._blob_keys: Dict[Tuple[str, str], set] = {}
+        self._prune_lock = threading.RLock()
+        self.threads_expired = 0
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        # Prune once the thread holds twice the limit, so the cost is amortized over puts
+        if len(checkpoints) < 2 * self.max_checkpoints:
+            return
+        ordered = sorted(checkpoints)
+        for checkpoint_id in ordered[:-self.max_checkpoints]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        referenced = set()
+        for saved, _, _ in checkpoints.values():
+            referenced.update(self.serde.loads_typed(saved).get("channel_versions", {}).items())
+        keys = self._blob_keys.get((thread_id, checkpoint_ns), set())
+        for key in [k for k in keys if (k[2], k[3]) not in referenced]:
+            keys.discard(key)
+            self.blobs.pop(key, None)
+
+    def _expire_threads(self, now: float) -> None:
+        expired = []
+        while self._threads:
+            thread_id, used_at = next(iter(self._threads.items()))
+            if len(self._threads) <= self.max_threads and (self.ttl <= 0 or now - used_at <= self.ttl):
+                break
+            del self._threads[thread_id]
+            expired.append(thread_id)
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        self.threads_expired += len(expired)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._prune_lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys.setdefault((thread_id, checkpoint_ns), set()).update(
+                (thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()
+            )
+            now = time.time()
+            self._threads[thread_id] = now
+            self._threads.move_to_end(thread_id)
+            self._prune_thread(thread_id, checkpoint_ns)
+            self._expire_threads(now)
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._prune_lock:
+            for key in [key for key in self._blob_keys if key[0] == thread_id]:
+                for blob_key in self._blob_keys.pop(key):
+                    self.blobs.pop(blob_key, None)
+            self.storage.pop(thread_id, None)
+            for key in [key for key in self.writes if key[0] == thread_id]:
+                del self.writes[key]
+            self._threads.pop(thread_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": len(self._threads),
+            "threads_expired": self.threads_expired,
+            "checkpoints": sum(len(c) for namespaces in self.storage.values() for c in namespaces.values()),
+            "blobs": len(self.blobs)
+        }
+
+
+class SQLiteSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer on a SQLite file (stdlib sqlite3, so sync and
+    async graphs can share it). Only the newest `max_checkpoints` checkpoints
+    of each thread are kept: sessions resume from the latest one and never
+    travel back further than that.
+    """
+
+    def __init__(self, path: str, serde=None, max_checkpoints: Optional[int] = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_checkpoints = max_checkpoints or int(os.getenv("SESSION_MAX_CHECKPOINTS", "20"))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+            "CREATE TABLE IF NOT EXISTS writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB, "
+            "task_path TEXT NOT NULL DEFAULT '', "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+        )
+        self._conn.commit()
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+        return CheckpointTuple(
+            config=config,
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes]
+        )
+
+    def get_tuple(self, config) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+        return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        where, params = [], []
+        if config is not None:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+        if before is not None and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall()
+        count = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            found = self._tuple(thread_id, checkpoint_ns, row)
+            if filter and any(found.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            yield found
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data)
+            )
+            # Keep the newest max_checkpoints of the thread
+            stale = (
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?"
+            )
+            args = (thread_id, checkpoint_ns, self.max_checkpoints)
+            self._conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({stale})",
+                (thread_id, checkpoint_ns) + args
+            )
+            self._conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({stale})",
+                (thread_id, checkpoint_ns) + args
+            )
+            self._conn.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) replace earlier ones, regular writes are kept once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    # The async API runs the same statements off the event loop
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[CheckpointTuple]:
+        found = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in found:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current, channel) -> str:
+        # Same versions as InMemorySaver: a zero-padded counter with a random suffix
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def session_store() -> str:
+    """Checkpointer used for sessions: "memory" (default) or "sqlite"."""
+    return os.getenv("SESSION_STORE", "memory").lower()
+
+
+def _default_session_path() -> str:
+    return os.path.expanduser(os.getenv("SESSION_DB_PATH", ".cache/sessions.sqlite"))
+
+
+def create_checkpointer(kind: Optional[str] = None, path: Optional[str] = None):
+    """
+    Create a session checkpointer whose checkpoints keep query results by
+    reference: BoundedInMemorySaver ("memory") or SQLiteSaver ("sqlite", at
+    `path`, default SESSION_DB_PATH, results in the same file).
+    """
+    kind = kind or session_store()
+    if kind == "memory":
+        return BoundedInMemorySaver(serde=ResultRefSerializer(ResultStore()))
+    if kind == "sqlite":
+        path = path or _default_session_path()
+        return SQLiteSaver(path, serde=ResultRefSerializer(ResultStore(path)))
+    raise ValueError(f"Unknown session store: {kind}")
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Return the process-wide session checkpointer (SESSION_STORE)."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = create_checkpointer()
+    return _checkpointer
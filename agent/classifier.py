@@ -0,0 +1,163 @@
+import os
+import re
+import zlib
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .compiler import OPERATIONS, _OPERATION_PATTERNS
+
+
+LABELS = ["TOPOLOGICAL", "SET", "BUFFER", "SINGLE", "DISTANCE"]
+OPERATION_TYPES = {op: query_type for query_type, ops in OPERATIONS.items() for op in ops}
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "query_type_model.npz")
+# Weight of the keyword lexicon relative to the n-gram model (the model counts 1)
+RULE_WEIGHT = 2.0
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " " + re.sub(r"\s+", " ", text).strip() + " "
+
+
+def char_ngrams(text: str, n_min: int = 1, n_max: int = 3) -> List[str]:
+    """Character n-grams of the normalized text, padded with spaces at word edges."""
+    text = _normalize(text)
+    return [text[i:i + n] for n in range(n_min, n_max + 1) for i in range(len(text) - n + 1)]
+
+
+def featurize(texts: List[str], dim: int) -> np.ndarray:
+    """Hashed, L2-normalized character n-gram counts, one row per text."""
+    features = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for gram in char_ngrams(text):
+            # crc32 is stable across processes, unlike hash()
+            features[row, zlib.crc32(gram.encode("utf-8")) % dim] += 1.0
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.maximum(norms, 1e-12)
+
+
+def rule_types(question: str) -> List[str]:
+    """Query types named by operation keywords in the question (see compiler.OPERATION_KEYWORDS)."""
+    types = []
+    for pattern, op in _OPERATION_PATTERNS:
+        if pattern.search(question) and OPERATION_TYPES[op] not in types:
+            types.append(OPERATION_TYPES[op])
+    return types
+
+
+class QueryTypeClassifier:
+    """
+    Local query_type classifier: a keyword lexicon combined with a
+    multinomial logistic regression over hashed character n-grams.
+
+    The model is a (dim, 5) weight matrix and a bias, stored as a compressed
+    float16 .npz file. classify() returns the type with its confidence (the
+    combined probability); callers defer to the LLM below their threshold.
+    """
+
+    def __init__(self, weights: Optional[np.ndarray] = None, bias: Optional[np.ndarray] = None, dim: int = 2048):
+        self.weights = weights
+        self.bias = bias
+        self.dim = weights.shape[0] if weights is not None else dim
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "QueryTypeClassifier":
+        """Load the model file; without one only the lexicon is used."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            labels = [str(label) for label in data["labels"]]
+            if labels != LABELS:
+                raise ValueError(f"Model labels {labels} do not match {LABELS}")
+            return cls(data["weights"].astype(np.float32), data["bias"].astype(np.float32))
+
+    def save(self, path: str = DEFAULT_MODEL_PATH) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights.astype(np.float16),
+            bias=self.bias.astype(np.float16),
+            labels=np.array(LABELS)
+        )
+
+    @classmethod
+    def train(
+        cls,
+        questions: List[str],
+        labels: List[str],
+        dim: int = 2048,
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4
+    ) -> "QueryTypeClassifier":
+        """Fit the n-gram model with full-batch gradient descent on the softmax loss."""
+        x = featurize(questions, dim)
+        y = np.zeros((len(labels), len(LABELS)), dtype=np.float32)
+        y[np.arange(len(labels)), [LABELS.index(label) for label in labels]] = 1.0
+        weights = np.zeros((dim, len(LABELS)), dtype=np.float32)
+        bias = np.zeros(len(LABELS), dtype=np.float32)
+        for _ in range(epochs):
+            probs = _softmax(x @ weights + bias)
+            gradient = (probs - y) / len(questions)
+            weights -= learning_rate * (x.T @ gradient + l2 * weights)
+            bias -= learning_rate * gradient.sum(axis=0)
+        return cls(weights, bias)
+
+    def model_proba(self, question: str) -> Optional[np.ndarray]:
+        if self.weights is None:
+            return None
+        return _softmax(featurize([question], self.dim) @ self.weights + self.bias)[0]
+
+    def predict_proba(self, question: str) -> np.ndarray:
+        """Probabilities over LABELS from the model and the lexicon."""
+        probs = self.model_proba(question)
+        types = rule_types(question)
+        if probs is None:
+            probs = np.full(len(LABELS), 1.0 / len(LABELS))
+        if not types:
+            return probs
+        rules = np.zeros(len(LABELS))
+        rules[[LABELS.index(t) for t in types]] = 1.0 / len(types)
+        return (probs + RULE_WEIGHT * rules) / (1.0 + RULE_WEIGHT)
+
+    def classify(self, question: str) -> Tuple[str, float]:
+        probs = self.predict_proba(question)
+        best = int(np.argmax(probs))
+        return LABELS[best], float(probs[best])
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+_classifier: Optional[QueryTypeClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_query_classifier() -> QueryTypeClassifier:
+    """Return the process-wide classifier, loaded from QUERY_CLASSIFIER_MODEL on first use."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = QueryTypeClassifier.load(os.getenv("QUERY_CLASSIFIER_MODEL") or DEFAULT_MODEL_PATH)
+    return _classifier
+
+
+def classify_locally(question: str) -> Optional[Dict[str, Any]]:
+    """
+    query_type from the local classifier, or None when it is disabled or its
+    confidence is below QUERY_CLASSIFIER_THRESHOLD.
+    """
+    if os.getenv("QUERY_CLASSIFIER", "true").lower() in ("0", "false", "no"):
+        return None
+    query_type, confidence = get_query_classifier().classify(question)
+    if confidence < float(os.getenv("QUERY_CLASSIFIER_THRESHOLD", "0.7")):
+        return None
+    return {"query_type": query_type, "query_type_confidence": round(confidence, 4)}
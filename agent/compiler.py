@@ -0,0 +1,239 @@
+import os
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+from .schema_render import NAME_PROPERTY
+from .gazetteer import is_grounded
+
+
+# gspatial.operation names per query type (see gspatial_summary)
+OPERATIONS = {
+    "TOPOLOGICAL": ["CONTAINS", "COVERED_BY", "CROSSES", "DISJOINT", "EQUALS", "INTERSECTS", "OVERLAPS", "TOUCHES", "WITHIN"],
+    "SET": ["INTERSECTION", "UNION", "DIFFERENCE"],
+    "BUFFER": ["BUFFER"],
+    "SINGLE": ["AREA", "BBOX", "BOUNDARY", "CENTROID", "CONVEX_HULL", "DIMENSION", "ENVELOPE", "LENGTH", "SRID"],
+    "DISTANCE": ["DISTANCE"]
+}
+
+# Keyword → operation, checked in order (more specific phrases first)
+OPERATION_KEYWORDS: List[Tuple[str, str]] = [
+    (r"중심점|중심\s*좌표|무게\s*중심|centroid", "CENTROID"),
+    (r"볼록\s*껍질|컨벡스|convex", "CONVEX_HULL"),
+    (r"최소\s*경계\s*사각형|bbox|bounding", "BBOX"),
+    (r"외접\s*사각형|envelope", "ENVELOPE"),
+    (r"경계선|경계\s*구해|boundary", "BOUNDARY"),
+    (r"면적|넓이|area", "AREA"),
+    (r"길이|연장|length", "LENGTH"),
+    (r"차원|dimension", "DIMENSION"),
+    (r"srid|좌표계|참조\s*시스템", "SRID"),
+    (r"버퍼|반경|buffer", "BUFFER"),
+    (r"거리|distance|떨어져\s*있는\s*거리", "DISTANCE"),
+    (r"교집합|겹치는\s*영역|intersection", "INTERSECTION"),
+    (r"합집합|합친|합쳐|union", "UNION"),
+    (r"차집합|제외한\s*영역|difference", "DIFFERENCE"),
+    (r"커버|covered", "COVERED_BY"),
+    (r"포함하|contains", "CONTAINS"),
+    (r"내부에|안에\s*있|속한|within", "WITHIN"),
+    (r"가로지르|횡단|crosses", "CROSSES"),
+    (r"부분적으로\s*겹|overlap", "OVERLAPS"),
+    (r"접하|맞닿|인접|touches", "TOUCHES"),
+    (r"교차|intersects", "INTERSECTS"),
+    (r"분리|떨어져\s*있|disjoint", "DISJOINT"),
+    (r"동일|같은\s*객체|equals", "EQUALS")
+]
+OPERATION_CALL = re.compile(r"gspatial\.operation\(\s*(?:'(\w+)'|\"(\w+)\"|\$(\w+))")
+_OPERATION_PATTERNS = [(re.compile(pattern, re.IGNORECASE), op) for pattern, op in OPERATION_KEYWORDS]
+
+PLACE_TYPES = re.compile(r"위치|장소|지역|지명|행정|place|location|area|region", re.IGNORECASE)
+DISTANCE_TYPES = re.compile(r"거리|반경|distance|radius", re.IGNORECASE)
+DISTANCE_VALUE = re.compile(r"(\d+(?:\.\d+)?)\s*(km|킬로미터|킬로|m|미터)?", re.IGNORECASE)
+# In free text a unit is required, otherwise digits in place names (반포3동) would match
+DISTANCE_IN_TEXT = re.compile(r"(\d+(?:\.\d+)?)\s*(km|킬로미터|킬로|m|미터)(?![a-z])", re.IGNORECASE)
+
+# {n_match} / {m_match} select the nodes of each side (see _match_clause)
+TEMPLATES = {
+    "TOPOLOGICAL": """{n_match}
+WITH collect(n) AS n_list
+{m_match}
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation($operation, [n_list, m_list]) YIELD n, m, result
+WHERE result = true
+RETURN n, m""",
+    "SET": """{n_match}
+WITH collect(n) AS n_list
+{m_match}
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation($operation, [n_list, m_list]) YIELD result
+RETURN result""",
+    "BUFFER": """{n_match}
+WITH collect(n) AS n_list
+CALL gspatial.operation($operation, [n_list, [$distance]]) YIELD n, result
+RETURN result""",
+    "SINGLE": """{n_match}
+WITH collect(n) AS n_list
+CALL gspatial.operation($operation, [n_list]) YIELD n, result
+RETURN result""",
+    "DISTANCE": """{n_match}
+WITH collect(n) AS n_list
+{m_match}
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation($operation, [n_list, m_list]) YIELD n, m, result
+RETURN n, m, result"""
+}
+
+# Query types whose procedure takes two node lists
+BINARY_TYPES = {"TOPOLOGICAL", "SET", "DISTANCE"}
+
+
+def detect_operation(question: str, query_type: Optional[str] = None) -> Optional[str]:
+    """Return the gspatial operation named in the question (restricted to query_type if given)."""
+    allowed = OPERATIONS.get(query_type) if query_type else None
+    for pattern, op in _OPERATION_PATTERNS:
+        if pattern.search(question) and (allowed is None or op in allowed):
+            return op
+    if allowed and len(allowed) == 1:
+        return allowed[0]
+    return None
+
+
+def query_operation(query: Optional[str], params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """The operation name passed to gspatial.operation in a query (literal or $parameter)."""
+    m = OPERATION_CALL.search(query or "")
+    if m is None:
+        return None
+    literal, quoted, param = m.groups()
+    operation = literal or quoted or (params or {}).get(param)
+    return str(operation).upper() if operation else None
+
+
+def _entity_items(entities: Any) -> List[Dict[str, Any]]:
+    # The extraction prompt asks for objects with 'type' and 'value', but the
+    # LLM wraps them in different containers
+    if isinstance(entities, list):
+        items = []
+        for item in entities:
+            items.extend(_entity_items(item))
+        return items
+    if isinstance(entities, dict):
+        if "type" in entities and "value" in entities:
+            return [entities]
+        items = []
+        for key, value in entities.items():
+            if isinstance(value, (list, dict)):
+                items.extend(_entity_items(value))
+            elif isinstance(value, str):
+                items.append({"type": key, "value": value})
+        return items
+    return []
+
+
+def extract_places(entities: Any) -> List[str]:
+    """Place names from the extracted entities, in order of appearance."""
+    places = []
+    for item in _entity_items(entities):
+        if PLACE_TYPES.search(str(item.get("type", ""))):
+            values = item["value"] if isinstance(item["value"], list) else [item["value"]]
+            places.extend(str(v).strip() for v in values if str(v).strip())
+    return list(dict.fromkeys(places))
+
+
+def extract_distance(entities: Any, question: str = "") -> Optional[float]:
+    """Buffer distance as a float, in metres when a unit is given."""
+    candidates = [
+        (str(item["value"]), DISTANCE_VALUE)
+        for item in _entity_items(entities)
+        if DISTANCE_TYPES.search(str(item.get("type", "")))
+    ]
+    if question:
+        candidates.append((question, DISTANCE_IN_TEXT))
+    for text, pattern in candidates:
+        m = pattern.search(text)
+        if m:
+            value = float(m.group(1))
+            unit = (m.group(2) or "").lower()
+            return value * 1000.0 if unit in ("km", "킬로미터", "킬로") else value
+    return None
+
+
+def name_property(schema: Dict[str, Any]) -> Optional[str]:
+    """The name-like property shared by most labels, used to match places."""
+    counts = Counter(
+        prop
+        for props in schema.get("nodeProperties", {}).values()
+        for prop in props
+        if NAME_PROPERTY.search(prop)
+    )
+    if not counts:
+        return None
+    # Prefer plain "name" on ties
+    return max(counts, key=lambda prop: (counts[prop], prop == "name"))
+
+
+def _match_clause(
+    var: str,
+    places: List[str],
+    name_key: str,
+    resolved: Dict[str, Dict[str, Any]]
+) -> Tuple[str, List[str]]:
+    """
+    MATCH clause and name list for one side of the operation. When every place
+    was grounded in the gazetteer to the same label and key, the clause is
+    restricted to that label (so the label index or scan replaces an
+    all-nodes scan) and the canonical stored values are used.
+    """
+    matches = [resolved.get(place) for place in places]
+    if matches and all(is_grounded(m) for m in matches) and len({(m["label"], m["key"]) for m in matches}) == 1:
+        label, key = matches[0]["label"], matches[0]["key"]
+        values = list(dict.fromkeys(m["value"] for m in matches))
+        return f"MATCH ({var}:`{label}`) WHERE {var}.`{key}` IN ${var}_names", values
+    return f"MATCH ({var}) WHERE {var}.`{name_key}` IN ${var}_names", places
+
+
+def compile_cypher(
+    query_type: Optional[str],
+    question: str,
+    entities: Any,
+    schema: Dict[str, Any],
+    resolved_entities: Optional[List[Dict[str, Any]]] = None
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Build the Cypher for a well-formed request from the template of its query
+    type, with place names, distance and operation bound as $parameters.
+    Places grounded by the gazetteer (`resolved_entities`) are matched on
+    their label and key only. Returns None when the inputs cannot be
+    resolved unambiguously.
+    """
+    if query_type not in TEMPLATES:
+        return None
+    operation = detect_operation(question, query_type)
+    if operation is None:
+        return None
+    name_key = name_property(schema)
+    if name_key is None:
+        return None
+
+    places = extract_places(entities)
+    resolved = {item["text"]: item for item in resolved_entities or []}
+    params: Dict[str, Any] = {"operation": operation}
+    clauses = {"m_match": ""}
+    if query_type in BINARY_TYPES:
+        if len(places) != 2:
+            return None
+        clauses["n_match"], params["n_names"] = _match_clause("n", [places[0]], name_key, resolved)
+        clauses["m_match"], params["m_names"] = _match_clause("m", [places[1]], name_key, resolved)
+    else:
+        if not places:
+            return None
+        clauses["n_match"], params["n_names"] = _match_clause("n", places, name_key, resolved)
+    if query_type == "BUFFER":
+        distance = extract_distance(entities, question)
+        if distance is None:
+            return None
+        params["distance"] = float(distance)
+
+    return TEMPLATES[query_type].format(**clauses), params
+
+
+def template_compiler_enabled() -> bool:
+    return os.getenv("TEMPLATE_COMPILER", "true").lower() not in ("0", "false", "no")
@@ -0,0 +1,291 @@
+import os
+import atexit
+import asyncio
+import weakref
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
+
+
+class Neo4jDriverManager:
+    """
+    Process-wide owner of a single pooled Neo4j driver.
+    The driver is created lazily on first use and shared by every caller,
+    so each query reuses pooled Bolt connections instead of reconnecting.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        database: Optional[str] = None,
+        max_pool_size: Optional[int] = None,
+        acquisition_timeout: Optional[float] = None,
+        liveness_check_timeout: Optional[float] = None
+    ):
+        self.uri = uri
+        self.username = username
+        self.password = password
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self.liveness_check_timeout = liveness_check_timeout
+        self._driver = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sessions_opened = 0
+        self._sessions_active = 0
+        self._drivers_created = 0
+
+    def _config(self) -> Dict[str, Any]:
+        # Resolve settings at creation time so load_dotenv() may run after import
+        return {
+            "uri": self.uri or os.getenv("NEO4J_URI"),
+            "auth": (
+                self.username or os.getenv("NEO4J_USERNAME"),
+                self.password or os.getenv("NEO4J_PASSWORD")
+            ),
+            "max_connection_pool_size": self.max_pool_size or _env_int("NEO4J_MAX_POOL_SIZE", 50),
+            "connection_acquisition_timeout": self.acquisition_timeout or _env_float("NEO4J_ACQUISITION_TIMEOUT", 60.0),
+            "liveness_check_timeout": self.liveness_check_timeout or _env_float("NEO4J_LIVENESS_CHECK_TIMEOUT", 30.0)
+        }
+
+    @property
+    def driver(self):
+        """Return the shared driver, creating it on first access."""
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    config = self._config()
+                    uri = config.pop("uri")
+                    # The neo4j package is imported with the first driver, not with the module
+                    from neo4j import GraphDatabase
+                    self._driver = GraphDatabase.driver(uri, **config)
+                    self._drivers_created += 1
+        return self._driver
+
+    @contextmanager
+    def session(self, **kwargs):
+        """Open a session on the shared driver and track pool usage."""
+        if "database" not in kwargs:
+            database = self.database or os.getenv("NEO4J_DATABASE")
+            if database:
+                kwargs["database"] = database
+        with self._stats_lock:
+            self._sessions_opened += 1
+            self._sessions_active += 1
+        try:
+            with self.driver.session(**kwargs) as session:
+                yield session
+        finally:
+            with self._stats_lock:
+                self._sessions_active -= 1
+
+    def is_alive(self) -> bool:
+        """Check that the database is reachable through the shared driver."""
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception:
+            return False
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool statistics for monitoring."""
+        stats = {
+            "initialized": self._driver is not None,
+            "drivers_created": self._drivers_created,
+            "sessions_opened": self._sessions_opened,
+            "sessions_active": self._sessions_active,
+            "max_pool_size": self.max_pool_size or _env_int("NEO4J_MAX_POOL_SIZE", 50),
+            "connections_idle": 0,
+            "connections_in_use": 0
+        }
+        # The driver does not expose pool metrics publicly, so read them defensively
+        pool = getattr(self._driver, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            try:
+                for address in list(connections):
+                    in_use = pool.in_use_connection_count(address)
+                    stats["connections_in_use"] += in_use
+                    stats["connections_idle"] += len(connections.get(address, ())) - in_use
+            except Exception:
+                pass
+        return stats
+
+    def close(self) -> None:
+        """Close the shared driver. A later access creates a new one."""
+        with self._lock:
+            if self._driver is not None:
+                try:
+                    self._driver.close()
+                finally:
+                    self._driver = None
+
+
+class AsyncNeo4jDriverManager(Neo4jDriverManager):
+    """
+    Async counterpart of Neo4jDriverManager built on neo4j.AsyncGraphDatabase.
+    An async driver belongs to the event loop it was created in, so each loop
+    gets its own driver. A driver is closed on its own loop by aclose(), or
+    when the loop shuts down: asyncio.run() cancels the driver's guard task,
+    which closes it before the loop closes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # event loop -> (driver, guard task that closes it)
+        self._drivers = weakref.WeakKeyDictionary()
+
+    @property
+    def driver(self):
+        """Return the async driver of the running event loop."""
+        loop = asyncio.get_running_loop()
+        entry = self._drivers.get(loop)
+        if entry is None:
+            with self._lock:
+                entry = self._drivers.get(loop)
+                if entry is None:
+                    config = self._config()
+                    uri = config.pop("uri")
+                    from neo4j import AsyncGraphDatabase
+                    driver = AsyncGraphDatabase.driver(uri, **config)
+                    guard = loop.create_task(self._close_with_loop(loop, driver), name="neo4j-async-driver")
+                    entry = self._drivers[loop] = (driver, guard)
+                    self._driver = driver
+                    self._drivers_created += 1
+        return entry[0]
+
+    async def _close_with_loop(self, loop, driver) -> None:
+        try:
+            # Runs until cancelled by aclose(), close() or the loop's shutdown
+            await loop.create_future()
+        finally:
+            with self._lock:
+                if self._drivers.get(loop, (None,))[0] is driver:
+                    del self._drivers[loop]
+                if self._driver is driver:
+                    self._driver = next((d for d, _ in self._drivers.values()), None)
+            try:
+                await driver.close()
+            except Exception as e:
+                print(f"Warning: Could not close async Neo4j driver: {str(e)}")
+
+    @asynccontextmanager
+    async def session(self, **kwargs):
+        """Open an async session on the shared driver and track pool usage."""
+        if "database" not in kwargs:
+            database = self.database or os.getenv("NEO4J_DATABASE")
+            if database:
+                kwargs["database"] = database
+        with self._stats_lock:
+            self._sessions_opened += 1
+            self._sessions_active += 1
+        try:
+            async with self.driver.session(**kwargs) as session:
+                yield session
+        finally:
+            with self._stats_lock:
+                self._sessions_active -= 1
+
+    async def is_alive(self) -> bool:
+        """Check that the database is reachable through the shared async driver."""
+        try:
+            await self.driver.verify_connectivity()
+            return True
+        except Exception:
+            return False
+
+    async def aclose(self) -> None:
+        """Close the async driver of the running event loop."""
+        entry = self._drivers.get(asyncio.get_running_loop())
+        if entry is not None:
+            entry[1].cancel()
+            await asyncio.gather(entry[1], return_exceptions=True)
+
+    def close(self) -> None:
+        """Close every async driver on its own loop (scheduled, for loops in other threads)."""
+        with self._lock:
+            entries = list(self._drivers.items())
+        for loop, (_, guard) in entries:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(guard.cancel)
+
+
+_manager: Optional[Neo4jDriverManager] = None
+_async_manager: Optional[AsyncNeo4jDriverManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_driver_manager() -> Neo4jDriverManager:
+    """Return the process-wide driver manager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = Neo4jDriverManager()
+    return _manager
+
+
+def get_driver():
+    """Return the shared, pooled Neo4j driver."""
+    return get_driver_manager().driver
+
+
+def get_session(**kwargs):
+    """Open a session on the shared driver (use as a context manager)."""
+    return get_driver_manager().session(**kwargs)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Return connection pool statistics of the shared driver."""
+    return get_driver_manager().pool_stats()
+
+
+def get_async_driver_manager() -> AsyncNeo4jDriverManager:
+    """Return the process-wide async driver manager."""
+    global _async_manager
+    if _async_manager is None:
+        with _manager_lock:
+            if _async_manager is None:
+                _async_manager = AsyncNeo4jDriverManager()
+    return _async_manager
+
+
+def get_async_session(**kwargs):
+    """Open an async session on the shared async driver (use with `async with`)."""
+    return get_async_driver_manager().session(**kwargs)
+
+
+async def aclose_driver() -> None:
+    """Close the shared async driver from its event loop."""
+    if _async_manager is not None:
+        await _async_manager.aclose()
+
+
+def close_driver() -> None:
+    """Close the shared driver (and schedule closing the async ones). Registered to run at interpreter exit."""
+    if _manager is not None:
+        _manager.close()
+    if _async_manager is not None:
+        _async_manager.close()
+
+
+atexit.register(close_driver)
@@ -0,0 +1,138 @@
+import os
+from typing import Dict, Any, List, Optional
+
+from .compiler import query_operation, extract_places
+from .geometry import parse_wkt, GEOGRAPHIC_SRIDS
+from .schema_render import NAME_PROPERTY
+
+
+# Operations answered with a single number or a single geometry
+SCALAR_OPERATIONS = {"AREA", "LENGTH", "SRID", "DIMENSION", "DISTANCE"}
+GEOMETRY_OPERATIONS = {"CENTROID", "BBOX", "ENVELOPE"}
+DIMENSION_NAMES = {0: "점", 1: "선", 2: "면"}
+
+
+def _has_final_consonant(word: str) -> Optional[bool]:
+    ch = word.rstrip()[-1:] if word.strip() else ""
+    if "가" <= ch <= "힣":
+        return (ord(ch) - ord("가")) % 28 != 0
+    if ch.isdigit():
+        # 0 영, 1 일, 3 삼, 6 육, 7 칠, 8 팔 end in a consonant
+        return ch in "013678"
+    return None
+
+
+def josa(word: str, with_final: str, without_final: str) -> str:
+    """Attach the particle that fits the last syllable, e.g. josa("반포3동", "은", "는") -> "반포3동은"."""
+    final = _has_final_consonant(word)
+    if final is None:
+        return f"{word}{with_final}({without_final})"
+    return word + (with_final if final else without_final)
+
+
+def format_number(value: float) -> str:
+    if float(value).is_integer() and abs(value) < 1e15:
+        return f"{int(value):,}"
+    if abs(value) >= 1000:
+        return f"{value:,.2f}"
+    return f"{value:.6g}"
+
+
+def _node_name(value: Any) -> Optional[str]:
+    if hasattr(value, "items"):
+        for key, prop in value.items():
+            if NAME_PROPERTY.search(key) and isinstance(prop, str):
+                return prop
+    return None
+
+
+def _place(state: Dict[str, Any], index: int = 0) -> Optional[str]:
+    places = extract_places(state.get("entities"))
+    if len(places) > index:
+        return places[index]
+    return None
+
+
+def _geographic(geometry) -> bool:
+    if geometry.srid is not None:
+        return geometry.srid in GEOGRAPHIC_SRIDS
+    bbox = geometry.bbox()
+    return bbox is not None and abs(bbox[0]) <= 180 and abs(bbox[1]) <= 90
+
+
+def _render_scalar(operation: str, subject: str, value: float, state: Dict[str, Any], row: Dict[str, Any]) -> Optional[str]:
+    if operation == "AREA":
+        return f"{subject}의 면적은 {format_number(value)}입니다. (좌표계 단위 기준)"
+    if operation == "LENGTH":
+        return f"{subject}의 길이는 {format_number(value)}입니다. (좌표계 단위 기준)"
+    if operation == "SRID":
+        return f"{subject}의 좌표계(SRID)는 {int(value)}입니다."
+    if operation == "DIMENSION":
+        name = DIMENSION_NAMES.get(int(value))
+        kind = f"{int(value)}차원({name}) 객체" if name else f"{int(value)}차원 객체"
+        return f"{josa(subject, '은', '는')} {kind}입니다."
+    if operation == "DISTANCE":
+        first = _node_name(row.get("n")) or _place(state, 0)
+        second = _node_name(row.get("m")) or _place(state, 1)
+        if not first or not second:
+            return None
+        return f"{josa(first, '과', '와')} {second} 사이의 거리는 {format_number(value)}입니다. (좌표계 단위 기준)"
+    return None
+
+
+def _render_geometry(operation: str, subject: str, wkt: str) -> Optional[str]:
+    geometry = parse_wkt(wkt)
+    if geometry is None:
+        return None
+    bbox = geometry.bbox()
+    if bbox is None:
+        return None
+    if operation == "CENTROID" and geometry.type == "POINT":
+        x, y = bbox[0], bbox[1]
+        if _geographic(geometry):
+            return f"{subject}의 중심점은 경도 {x:.7f}, 위도 {y:.7f} 지점에 위치해 있습니다."
+        return f"{subject}의 중심점은 좌표 ({x:.3f}, {y:.3f})에 위치해 있습니다."
+    if operation in ("BBOX", "ENVELOPE"):
+        label = "최소 경계 사각형" if operation == "BBOX" else "외접 사각형"
+        if _geographic(geometry):
+            return (
+                f"{subject}의 {label}은 경도 {bbox[0]:.7f} ~ {bbox[2]:.7f}, "
+                f"위도 {bbox[1]:.7f} ~ {bbox[3]:.7f} 범위입니다."
+            )
+        return f"{subject}의 {label}은 x {bbox[0]:.3f} ~ {bbox[2]:.3f}, y {bbox[1]:.3f} ~ {bbox[3]:.3f} 범위입니다."
+    return None
+
+
+def render_response(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Korean answer for results that need no interpretation: an empty result,
+    or a single row holding one number (AREA, LENGTH, SRID, DIMENSION, a
+    DISTANCE pair) or one geometry (CENTROID, BBOX, ENVELOPE).
+    Returns None when the result should be phrased by the LLM.
+    """
+    rows: List[Dict[str, Any]] = state.get("query_result") or []
+    total = state.get("row_count")
+    total = len(rows) if total is None else total
+    if total == 0:
+        return "질문의 조건을 만족하는 결과가 없습니다."
+    if total != 1 or len(rows) != 1:
+        return None
+
+    operation = query_operation(state.get("cypher_query"), state.get("cypher_params"))
+    if operation not in SCALAR_OPERATIONS and operation not in GEOMETRY_OPERATIONS:
+        return None
+    row = rows[0]
+    value = row.get("result")
+    subject = _node_name(row.get("n")) or _place(state)
+    if value is None or (operation != "DISTANCE" and not subject):
+        return None
+
+    if operation in SCALAR_OPERATIONS and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _render_scalar(operation, subject, float(value), state, row)
+    if operation in GEOMETRY_OPERATIONS and isinstance(value, str):
+        return _render_geometry(operation, subject, value)
+    return None
+
+
+def fast_response_enabled() -> bool:
+    return os.getenv("FAST_RESPONSE", "true").lower() not in ("0", "false", "no")
@@ -1,62 +1,280 @@
+import asyncio
+import threading
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, TypedDict, Optional, List
+from langchain_core.runnables import RunnableLambda
+from typing import Dict, Any, TypedDict, Optional, List, AsyncIterator
 from .state import AgentState
 from .nodes import (
+    check_cache,
+    store_cache,
     classify_query,
     extract_entities,
+    resolve_entities,
     generate_cypher,
+    parameterize_cypher,
+    validate_cypher,
     execute_cypher,
-    generate_response
+    generate_response,
+    plan_query,
+    remember_turn,
+    can_retry
 )
+from .async_nodes import (
+    aclassify_query,
+    aextract_entities,
+    aresolve_entities,
+    agenerate_cypher,
+    avalidate_cypher,
+    aexecute_cypher,
+    agenerate_response,
+    aplan_query
+)
+from .planner import agent_mode
+from .metrics import instrument_node, metrics_enabled
+
+def _node(name: str, func, afunc=None, instrumented: bool = False):
+    if instrumented:
+        func = instrument_node(name, func)
+        afunc = instrument_node(name, afunc) if afunc else None
+    if afunc is None:
+        return func
+    # invoke()/stream() run the sync node, ainvoke()/astream() the async one
+    return RunnableLambda(func, afunc=afunc, name=name)
+
+def route_after_validation(state: Dict[str, Any]) -> str:
+    """Execute valid queries; send invalid ones back for repair while the budget allows."""
+    if not state.get("error"):
+        return "execute_cypher"
+    return "generate_cypher" if can_retry(state) else "generate_response"
+
+def route_after_execution(state: Dict[str, Any]) -> str:
+    """Repair queries that failed at run time while the budget allows."""
+    if state.get("error") and can_retry(state):
+        return "generate_cypher"
+    return "store_cache"
 
-def create_workflow() -> StateGraph:
-    """Create the workflow for the Neo4j Cypher agent."""
+def create_workflow(
+    parallel: bool = True,
+    mode: Optional[str] = None,
+    instrumented: Optional[bool] = None,
+    checkpointer=None
+) -> StateGraph:
+    """
+    Create the workflow for the Neo4j Cypher agent.
+
+    The question cache is checked first; a hit already carries the query
+    type, entities and Cypher and goes straight to execute_cypher.
+    Extracted place names are grounded in the gazetteer (resolve_entities)
+    so generated queries match only nodes of the resolved labels.
+    Literals of generated queries are lifted into parameters
+    (parameterize_cypher) so Neo4j can reuse cached plans.
+    Generated queries are checked with EXPLAIN in validate_cypher; invalid or
+    failing queries are routed back to generate_cypher until the retry
+    budget in retry_context is spent.
+    
+    With `parallel` (default), classify_query and extract_entities fan out
+    after the cache check and run in the same step, joining before
+    generate_cypher. The two nodes write disjoint state keys (query_type and
+    entities), so the merge at the join is well defined.
+    
+    `mode` selects the planning pipeline (default: AGENT_MODE, "graph").
+    "graph" plans with the separate classify/extract/generate nodes above;
+    "planner" makes one structured-output call (plan_query) returning the
+    query type, operation, entities and Cypher, and falls back to the graph
+    nodes when the plan fails validation.
+    
+    With `instrumented` (default: AGENT_METRICS) every node records its wall
+    time, LLM tokens, retries, row count and Neo4j timings in node_metrics
+    and the metrics registry (agent.metrics). Uninstrumented workflows add
+    the nodes unwrapped, so disabled metrics cost nothing per call.
+    
+    With a `checkpointer` (agent.checkpoint) the workflow keeps a session per
+    thread_id: remember_turn stores the turn's entities, node references and
+    result in session_context, and a follow-up question ("그 면적은?") reuses
+    them instead of extracting and resolving entities again, skipping the
+    planner and the question cache. Run it with run_session().
+    """
+    mode = mode or agent_mode()
+    instrumented = metrics_enabled() if instrumented is None else instrumented
+    if mode not in ("graph", "planner"):
+        raise ValueError(f"Unknown workflow mode: {mode}")
+    
     # Create a new graph
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("classify_query", classify_query)
-    workflow.add_node("extract_entities", extract_entities)
-    workflow.add_node("generate_cypher", generate_cypher)
-    workflow.add_node("execute_cypher", execute_cypher)
-    workflow.add_node("generate_response", generate_response)
+    def node(name, func, afunc=None):
+        return _node(name, func, afunc, instrumented)
     
-    # Define the edges
-    workflow.add_edge("classify_query", "extract_entities")
-    workflow.add_edge("extract_entities", "generate_cypher")
-    workflow.add_edge("generate_cypher", "execute_cypher")
-    workflow.add_edge("execute_cypher", "generate_response")
+    workflow.add_node("check_cache", node("check_cache", check_cache))
+    workflow.add_node("store_cache", node("store_cache", store_cache))
+    workflow.add_node("classify_query", node("classify_query", classify_query, aclassify_query))
+    workflow.add_node("extract_entities", node("extract_entities", extract_entities, aextract_entities))
+    workflow.add_node("resolve_entities", node("resolve_entities", resolve_entities, aresolve_entities))
+    workflow.add_node("generate_cypher", node("generate_cypher", generate_cypher, agenerate_cypher))
+    workflow.add_node("parameterize_cypher", node("parameterize_cypher", parameterize_cypher))
+    workflow.add_node("validate_cypher", node("validate_cypher", validate_cypher, avalidate_cypher))
+    workflow.add_node("execute_cypher", node("execute_cypher", execute_cypher, aexecute_cypher))
+    workflow.add_node("generate_response", node("generate_response", generate_response, agenerate_response))
     
     # Set entry point
-    workflow.set_entry_point("classify_query")
+    workflow.set_entry_point("check_cache")
+    
+    # Define the edges
+    if parallel:
+        # Fan out after the cache check, join before Cypher generation
+        plan_nodes = ["classify_query", "extract_entities"]
+        workflow.add_edge("extract_entities", "resolve_entities")
+        workflow.add_edge(["classify_query", "resolve_entities"], "generate_cypher")
+    else:
+        plan_nodes = ["classify_query"]
+        workflow.add_edge("classify_query", "extract_entities")
+        workflow.add_edge("extract_entities", "resolve_entities")
+        workflow.add_edge("resolve_entities", "generate_cypher")
+    graph_nodes = plan_nodes
+    if mode == "planner":
+        # A valid plan goes straight to parameterization, an invalid one
+        # falls back to the separate planning nodes
+        fallback_nodes = plan_nodes
+        workflow.add_node("plan_query", node("plan_query", plan_query, aplan_query))
+        workflow.add_conditional_edges(
+            "plan_query",
+            lambda state: "parameterize_cypher" if state.get("cypher_query") else fallback_nodes,
+            ["parameterize_cypher"] + fallback_nodes
+        )
+        plan_nodes = ["plan_query"]
+    workflow.add_edge("generate_cypher", "parameterize_cypher")
+    workflow.add_edge("parameterize_cypher", "validate_cypher")
+    
+    # Repair loop: failed queries go back to generate_cypher with the error
+    # context, bounded by max_attempts and the overall latency budget
+    workflow.add_conditional_edges(
+        "validate_cypher",
+        route_after_validation,
+        ["execute_cypher", "generate_cypher", "generate_response"]
+    )
+    workflow.add_conditional_edges(
+        "execute_cypher",
+        route_after_execution,
+        ["generate_cypher", "store_cache"]
+    )
+    workflow.add_edge("store_cache", "generate_response")
     
-    # Set conditional edges (if any)
-    # For example, you could add error handling branches here
+    # Cache hits skip planning and go straight to execution; follow-ups
+    # in a session reuse the previous turn's entities in the graph nodes
+    def route_after_cache(state):
+        if state.get("cache_hit"):
+            return "execute_cypher"
+        return graph_nodes if state.get("followup") else plan_nodes
+    
+    workflow.add_conditional_edges(
+        "check_cache",
+        route_after_cache,
+        ["execute_cypher"] + list(dict.fromkeys(plan_nodes + graph_nodes))
+    )
     
     # Set the final node
-    workflow.add_edge("generate_response", END)
+    if checkpointer is None:
+        workflow.add_edge("generate_response", END)
+    else:
+        workflow.add_node("remember_turn", node("remember_turn", remember_turn))
+        workflow.add_edge("generate_response", "remember_turn")
+        workflow.add_edge("remember_turn", END)
     
     # Compile the workflow
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
-# Create the workflow instance
-neo4j_agent_workflow = create_workflow()
+_workflow = None
+_workflow_lock = threading.Lock()
 
-def run_agent(question: str) -> Dict[str, Any]:
-    """Run the agent with the given question."""
-    # Initialize the state
-    initial_state = {
+def get_workflow():
+    """Return the default compiled workflow, built on first use rather than at import."""
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                _workflow = create_workflow()
+    return _workflow
+
+_session_workflow = None
+
+def get_session_workflow():
+    """Return the default workflow with the session checkpointer (SESSION_STORE)."""
+    global _session_workflow
+    if _session_workflow is None:
+        with _workflow_lock:
+            if _session_workflow is None:
+                from .checkpoint import get_checkpointer
+                _session_workflow = create_workflow(checkpointer=get_checkpointer())
+    return _session_workflow
+
+def session_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+def __getattr__(name):
+    # Backwards-compatible lazy access to the default workflow
+    if name == "neo4j_agent_workflow":
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _initial_state(question: str) -> Dict[str, Any]:
+    return {
         "question": question,
         "query_type": None,
+        "query_type_confidence": None,
+        "query_type_source": None,
+        "plan": None,
         "entities": None,
+        "resolved_entities": None,
+        "place_suggestions": None,
         "cypher_query": None,
+        "cypher_params": None,
+        "cypher_source": None,
+        "raw_cypher_query": None,
         "query_result": None,
+        "row_count": None,
+        "result_truncated": None,
+        "result_path": None,
+        "result_cache_hit": None,
+        "prefilter_stats": None,
+        "db_timings": None,
         "response": None,
-        "error": None
+        "response_source": None,
+        "error": None,
+        "retry_context": None,
+        "error_context": None,
+        "followup": None,
+        "node_metrics": None
     }
+
+def run_agent(question: str, workflow=None) -> Dict[str, Any]:
+    """Run the agent with the given question (on `workflow`, default get_workflow())."""
+    # Initialize the state
+    initial_state = _initial_state(question)
     
     # Execute the workflow
-    result = neo4j_agent_workflow.invoke(initial_state)
+    result = (workflow or get_workflow()).invoke(initial_state)
     
     # Return the final state
-    return result
\ No newline at end of file
+    return result
+
+async def arun_agent(question: str) -> Dict[str, Any]:
+    """Run the agent with the given question on the running event loop."""
+    return await get_workflow().ainvoke(_initial_state(question))
+
+async def astream_agent(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """Yield {node_name: state_update} as each node of the workflow finishes."""
+    async for update in get_workflow().astream(_initial_state(question), stream_mode="updates"):
+        yield update
+
+def run_session(question: str, thread_id: str, workflow=None) -> Dict[str, Any]:
+    """
+    Run the agent as the next turn of session `thread_id` (on `workflow`,
+    default get_session_workflow()), so follow-ups can refer to earlier turns.
+    """
+    return (workflow or get_session_workflow()).invoke(_initial_state(question), session_config(thread_id))
+
+async def arun_session(question: str, thread_id: str, workflow=None) -> Dict[str, Any]:
+    """Run the next turn of session `thread_id` on the running event loop."""
+    workflow = workflow or await asyncio.to_thread(get_session_workflow)
+    return await workflow.ainvoke(_initial_state(question), session_config(thread_id))
@@ -0,0 +1,310 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from .db import get_session
+from .schema import get_schema
+from .schema_render import NAME_PROPERTY
+
+
+# Administrative suffixes dropped for normalized matching (반포3동 == 반포3, 강남구 == 강남)
+ADMIN_SUFFIX = re.compile(r"(동|구|시|군|읍|면)$")
+
+# Match methods that identify the node a place name refers to. Fuzzy matches
+# only look alike (서초구 ~ 서초1동) and "suffix" matches share the name but
+# not the administrative unit (서초구 ~ 서초동); both are offered as
+# suggestions instead. "session" refs were grounded in an earlier turn.
+GROUNDED_METHODS = frozenset({"exact", "normalized", "session"})
+
+
+def is_grounded(match: Optional[Dict[str, Any]]) -> bool:
+    return bool(match) and match.get("method") in GROUNDED_METHODS
+
+
+def _split_suffix(name: str) -> Tuple[str, str]:
+    text = unicodedata.normalize("NFKC", str(name)).lower()
+    text = re.sub(r"\s+", "", text)
+    stripped = ADMIN_SUFFIX.sub("", text)
+    # Keep one-character names such as "중구" intact
+    if len(stripped) < 2:
+        return text, ""
+    return stripped, text[len(stripped):]
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a place name: Unicode form, case, whitespace and administrative suffix."""
+    return _split_suffix(name)[0]
+
+
+def admin_suffix(name: str) -> str:
+    """The administrative suffix normalize_name drops ("구" for 서초구), or ""."""
+    return _split_suffix(name)[1]
+
+
+def _ngrams(text: str, n: int = 2) -> List[str]:
+    if len(text) <= n:
+        return [text]
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class Gazetteer:
+    """
+    In-memory index of the name-like properties of every label.
+
+    Lookups try, in order: the exact value, the normalized value (whitespace
+    and 동/구 suffix insensitive) and a character-bigram fuzzy match scored by
+    Dice similarity. The index is built lazily from Neo4j and refreshed
+    incrementally: after `ttl` seconds only labels whose node count changed
+    are reloaded, in a background thread. The first load runs once for all
+    threads waiting on it; when it fails, lookups go without the index until
+    `retry_interval` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_values_per_label: Optional[int] = None,
+        fuzzy_threshold: Optional[float] = None,
+        retry_interval: float = 30.0,
+        session_factory: Callable = get_session,
+        schema_loader: Callable = get_schema
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("GAZETTEER_TTL", "600"))
+        self.max_values_per_label = max_values_per_label or int(os.getenv("GAZETTEER_MAX_VALUES_PER_LABEL", "200000"))
+        self.fuzzy_threshold = fuzzy_threshold if fuzzy_threshold is not None else float(os.getenv("GAZETTEER_FUZZY_THRESHOLD", "0.5"))
+        self.retry_interval = retry_interval
+        self.session_factory = session_factory
+        self.schema_loader = schema_loader
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = 0.0
+        self._failed_at = 0.0
+        # entries[i] = (label, key, value, normalized)
+        self._entries: List[Tuple[str, str, str, str]] = []
+        self._by_label: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        self._label_counts: Dict[str, int] = {}
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._normalized: Dict[str, List[int]] = defaultdict(list)
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+
+    # Index maintenance
+
+    def _name_keys(self, schema: Dict[str, Any]) -> Dict[str, List[str]]:
+        return {
+            label: [p for p in props if NAME_PROPERTY.search(p)]
+            for label, props in schema.get("nodeProperties", {}).items()
+            if any(NAME_PROPERTY.search(p) for p in props)
+        }
+
+    def _load_label(self, session, label: str, keys: List[str]) -> List[Tuple[str, str, str, str]]:
+        entries = []
+        for key in keys:
+            query = (
+                f"MATCH (n:`{label}`) WHERE n.`{key}` IS NOT NULL "
+                f"RETURN DISTINCT n.`{key}` AS value LIMIT $limit"
+            )
+            for record in session.run(query, limit=self.max_values_per_label):
+                value = record["value"]
+                if isinstance(value, str) and value.strip():
+                    entries.append((label, key, value, normalize_name(value)))
+        return entries
+
+    def _rebuild(self, label_entries_map: Dict[str, List[Tuple[str, str, str, str]]]) -> None:
+        exact, normalized, grams = defaultdict(list), defaultdict(list), defaultdict(list)
+        entries, by_label = [], {}
+        for label, label_entries in label_entries_map.items():
+            start = len(entries)
+            entries.extend(label_entries)
+            by_label[label] = list(range(start, len(entries)))
+        gram_counts = []
+        for i, (_, _, value, norm) in enumerate(entries):
+            exact[value].append(i)
+            normalized[norm].append(i)
+            entry_grams = set(_ngrams(norm))
+            gram_counts.append(len(entry_grams))
+            for gram in entry_grams:
+                grams[gram].append(i)
+        # Swap in the new index in one step so concurrent lookups stay consistent
+        self._entries, self._by_label, self._gram_counts = entries, by_label, gram_counts
+        self._exact, self._normalized, self._grams = exact, normalized, grams
+
+    def refresh(self, full: bool = False) -> bool:
+        """Reload labels whose node count changed (all labels with `full`); False when it failed."""
+        try:
+            name_keys = self._name_keys(self.schema_loader())
+            with self.session_factory() as session:
+                counts = {
+                    label: session.run(f"MATCH (n:`{label}`) RETURN count(n) AS total").single()["total"]
+                    for label in name_keys
+                }
+                current = {
+                    label: [self._entries[i] for i in ids]
+                    for label, ids in self._by_label.items()
+                    if label in name_keys
+                }
+                for label, keys in name_keys.items():
+                    if full or label not in current or counts[label] != self._label_counts.get(label):
+                        current[label] = self._load_label(session, label, keys)
+        except Exception as e:
+            print(f"Warning: Could not refresh gazetteer: {str(e)}")
+            return False
+        with self._lock:
+            self._rebuild(current)
+            self._label_counts = counts
+            self._loaded_at = time.time()
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name="gazetteer-refresh", daemon=True).start()
+
+    def ensure_loaded(self) -> bool:
+        """Build the index on first use; schedule an incremental refresh when stale."""
+        if not self._loaded_at:
+            if time.time() - self._failed_at < self.retry_interval:
+                return False
+            with self._load_lock:
+                # Threads that waited for the lock find the index built (or just failed)
+                if not self._loaded_at and time.time() - self._failed_at >= self.retry_interval:
+                    if not self.refresh(full=True):
+                        self._failed_at = time.time()
+        elif self.ttl >= 0 and time.time() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+        return bool(self._loaded_at)
+
+    def load_entries(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Replace the index with (label, key, value) entries, e.g. from a snapshot."""
+        current: Dict[str, List[Tuple[str, str, str, str]]] = defaultdict(list)
+        for label, key, value in entries:
+            current[label].append((label, key, value, normalize_name(value)))
+        with self._lock:
+            self._rebuild(current)
+            self._label_counts = {label: len(items) for label, items in current.items()}
+            self._loaded_at = time.time()
+
+    def add(self, label: str, key: str, value: str) -> None:
+        """Add a single entry (e.g. after a write) without reloading the label."""
+        with self._lock:
+            i = len(self._entries)
+            norm = normalize_name(value)
+            self._entries.append((label, key, value, norm))
+            self._by_label.setdefault(label, []).append(i)
+            self._exact[value].append(i)
+            self._normalized[norm].append(i)
+            entry_grams = set(_ngrams(norm))
+            self._gram_counts.append(len(entry_grams))
+            for gram in entry_grams:
+                self._grams[gram].append(i)
+
+    # Lookups
+
+    def _matches(self, ids: List[int], method: str, score: float) -> List[Dict[str, Any]]:
+        return [
+            {
+                "label": self._entries[i][0],
+                "key": self._entries[i][1],
+                "value": self._entries[i][2],
+                "method": method,
+                "score": score
+            }
+            for i in ids
+        ]
+
+    def lookup(self, name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Return the best matches for a place name, best first."""
+        ids = self._exact.get(name)
+        if ids:
+            return self._matches(ids[:limit], "exact", 1.0)
+        norm, suffix = _split_suffix(name)
+        ids = self._normalized.get(norm)
+        if ids:
+            # 반포3 == 반포3동, but 서초구 is not 서초동: differing suffixes name another unit
+            agreeing = [i for i in ids if not suffix or admin_suffix(self._entries[i][2]) in ("", suffix)]
+            if agreeing:
+                return self._matches(agreeing[:limit], "normalized", 0.95)
+            return self._matches(ids[:limit], "suffix", 0.9)
+
+        query_grams = set(_ngrams(norm))
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for i in self._grams.get(gram, ()):
+                shared[i] += 1
+        scored = []
+        gram_counts = self._gram_counts
+        for i, count in shared.items():
+            score = 2 * count / (len(query_grams) + gram_counts[i])
+            if score >= self.fuzzy_threshold:
+                scored.append((score, i))
+        scored.sort(key=lambda item: -item[0])
+        matches = []
+        for score, i in scored[:limit]:
+            matches.extend(self._matches([i], "fuzzy", round(score, 3)))
+        return matches
+
+    def resolve(self, names: List[str]) -> List[Dict[str, Any]]:
+        """
+        Resolve each name to its exact or normalized match (with the same
+        administrative suffix, when both names have one). Names with only
+        fuzzy or suffix matches, or none, are left out.
+        """
+        resolved = []
+        for name in names:
+            matches = self.lookup(name, limit=1)
+            if matches and is_grounded(matches[0]):
+                resolved.append({"text": name, **matches[0]})
+        return resolved
+
+    def suggest(self, names: List[str], limit: int = 3) -> Dict[str, List[str]]:
+        """Similar stored names for the names resolve() could not ground ("did you mean")."""
+        suggestions = {}
+        for name in names:
+            matches = self.lookup(name, limit=limit)
+            if matches and not is_grounded(matches[0]):
+                suggestions[name] = list(dict.fromkeys(match["value"] for match in matches))
+        return suggestions
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._loaded_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": bool(self._loaded_at),
+            "entries": len(self._entries),
+            "labels": {label: len(ids) for label, ids in self._by_label.items()},
+            "age_seconds": time.time() - self._loaded_at if self._loaded_at else None
+        }
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+def gazetteer_enabled() -> bool:
+    return os.getenv("GAZETTEER_ENABLED", "true").lower() not in ("0", "false", "no")
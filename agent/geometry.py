@@ -0,0 +1,313 @@
+import os
+import re
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+WKT_HEADER = re.compile(
+    r"^\s*(?:SRID=(\d+);)?\s*(POINT|LINESTRING|POLYGON|MULTIPOINT|MULTILINESTRING|MULTIPOLYGON|GEOMETRYCOLLECTION)"
+    r"\s*(ZM|Z|M)?\s*(?:(EMPTY)\b|(?=\())",
+    re.IGNORECASE
+)
+_PARENS = re.compile(r"[()]")
+_COMMA_TO_SPACE = str.maketrans(",", " ")
+
+METRES_PER_DEGREE = 111320.0
+# WGS84, Korea 2000 and ETRS89 geographic coordinate systems
+GEOGRAPHIC_SRIDS = {4326, 4737, 4258, 4019}
+
+
+class Geometry:
+    """
+    Parsed WKT: the geometry type and its coordinate sequences as (k, 2)
+    arrays. `parts[i]` lists the sequences of the i-th polygon (shell first,
+    then holes) or the i-th line / point group.
+    """
+
+    __slots__ = ("type", "srid", "parts")
+
+    def __init__(self, geometry_type: str, srid: Optional[int], parts: List[List[np.ndarray]]):
+        self.type = geometry_type
+        self.srid = srid
+        self.parts = parts
+
+    def sequences(self) -> List[np.ndarray]:
+        return [seq for part in self.parts for seq in part]
+
+    @property
+    def vertex_count(self) -> int:
+        return sum(len(seq) for seq in self.sequences())
+
+    def bbox(self) -> Optional[Tuple[float, float, float, float]]:
+        sequences = [seq for seq in self.sequences() if len(seq)]
+        if not sequences:
+            return None
+        return (
+            min(float(seq[:, 0].min()) for seq in sequences),
+            min(float(seq[:, 1].min()) for seq in sequences),
+            max(float(seq[:, 0].max()) for seq in sequences),
+            max(float(seq[:, 1].max()) for seq in sequences)
+        )
+
+
+def parse_wkt(text: str) -> Optional[Geometry]:
+    """
+    Parse a WKT / EWKT string, or return None if it is not one (including
+    text that only starts like one, e.g. "Point of interest (see notes)").
+
+    Only parenthesis positions are scanned in Python; each innermost
+    coordinate list is converted in one np.fromstring call on its slice, so
+    large geometries are not split into per-number Python objects.
+    """
+    header = WKT_HEADER.match(text)
+    if header is None:
+        return None
+    srid = int(header.group(1)) if header.group(1) else None
+    geometry_type = header.group(2).upper()
+    stride = {"ZM": 4, "Z": 3, "M": 3}.get((header.group(3) or "").upper(), 2)
+    if header.group(4):
+        return Geometry(geometry_type, srid, [])
+
+    # Depth at which a new part (polygon / line / point group) starts
+    part_depth = {"POLYGON": 1, "MULTIPOLYGON": 2, "MULTILINESTRING": 2, "MULTIPOINT": 2}.get(geometry_type, 1)
+    parts: List[List[np.ndarray]] = []
+    depth = 0
+    start = None
+    for m in _PARENS.finditer(text, header.end()):
+        if m.group() == "(":
+            depth += 1
+            start = m.end()
+            if depth == part_depth:
+                parts.append([])
+        else:
+            if start is not None:
+                # Innermost list: "x y, x y, ..."
+                coordinates = text[start:m.start()].translate(_COMMA_TO_SPACE)
+                if not coordinates.strip():
+                    # np.fromstring reads a blank string as [-1.]
+                    return None
+                try:
+                    values = np.fromstring(coordinates, sep=" ")
+                except ValueError:
+                    # Not numbers: prose in parentheses, not a coordinate list
+                    return None
+                if values.size % stride:
+                    return None
+                if not parts:
+                    parts.append([])
+                parts[-1].append(values.reshape(-1, stride)[:, :2])
+                start = None
+            depth -= 1
+    if geometry_type == "MULTIPOINT" and parts and all(len(part) == 1 and len(part[0]) > 1 for part in parts):
+        # MULTIPOINT (1 2, 3 4) without inner parentheses
+        parts = [[point[None, :]] for point in parts[0][0]]
+    return Geometry(geometry_type, srid, parts)
+
+
+def _ring_area(ring: np.ndarray) -> Tuple[float, float, float]:
+    """Signed area and area-weighted centroid sums of a closed ring (shoelace)."""
+    x, y = ring[:, 0], ring[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area = cross.sum() / 2
+    return area, float(((x + x1) * cross).sum() / 6), float(((y + y1) * cross).sum() / 6)
+
+
+def _project(geometry: Geometry) -> Tuple[Geometry, bool]:
+    """Equirectangular projection to metres around the geometry for lon/lat input."""
+    bbox = geometry.bbox()
+    if geometry.srid is not None:
+        geographic = bbox is not None and geometry.srid in GEOGRAPHIC_SRIDS
+    else:
+        geographic = bbox is not None and max(abs(bbox[0]), abs(bbox[2])) <= 180 and max(abs(bbox[1]), abs(bbox[3])) <= 90
+    if not geographic:
+        return geometry, False
+    scale = np.array([METRES_PER_DEGREE * math.cos(math.radians((bbox[1] + bbox[3]) / 2)), METRES_PER_DEGREE])
+    return Geometry(geometry.type, geometry.srid, [[seq * scale for seq in part] for part in geometry.parts]), True
+
+
+def measure(geometry: Geometry) -> Dict[str, Any]:
+    """Centroid and area (polygons) or length (lines); metres for lon/lat coordinates."""
+    projected, geographic = _project(geometry)
+    result: Dict[str, Any] = {}
+    sequences = geometry.sequences()
+    if not sequences or not any(len(seq) for seq in sequences):
+        return result
+
+    if "POLYGON" in geometry.type:
+        area, cx, cy = 0.0, 0.0, 0.0
+        for part, projected_part in zip(geometry.parts, projected.parts):
+            for k, (ring, projected_ring) in enumerate(zip(part, projected_part)):
+                # Shells count positive and holes negative, whatever the ring orientation
+                sign = 1.0 if k == 0 else -1.0
+                a, x, y = _ring_area(ring)
+                flip = sign if a >= 0 else -sign
+                area += flip * _ring_area(projected_ring)[0]
+                cx, cy = cx + flip * x, cy + flip * y
+        planar_area = sum(
+            (1.0 if k == 0 else -1.0) * abs(_ring_area(ring)[0])
+            for part in geometry.parts for k, ring in enumerate(part)
+        )
+        if planar_area:
+            result["centroid"] = [cx / planar_area, cy / planar_area]
+        result["area_m2" if geographic else "area"] = float(abs(area))
+    elif "LINESTRING" in geometry.type:
+        length, cx, cy = 0.0, 0.0, 0.0
+        for seq, projected_seq in zip(sequences, projected.sequences()):
+            if len(seq) < 2:
+                continue
+            segments = np.hypot(*np.diff(projected_seq, axis=0).T)
+            mids = (seq[:-1] + seq[1:]) / 2
+            length += segments.sum()
+            cx, cy = cx + (mids[:, 0] * segments).sum(), cy + (mids[:, 1] * segments).sum()
+        if length:
+            result["centroid"] = [cx / length, cy / length]
+        result["length_m" if geographic else "length"] = float(length)
+    if "centroid" not in result:
+        points = np.concatenate([seq for seq in sequences if len(seq)])
+        result["centroid"] = points.mean(axis=0).tolist()
+    result["centroid"] = [float(v) for v in result["centroid"]]
+    return result
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of one coordinate sequence (endpoints kept)."""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        segment = b - a
+        inner = points[first + 1:last]
+        norm = math.hypot(*segment)
+        if norm == 0:
+            distances = np.hypot(*(inner - a).T)
+        else:
+            distances = np.abs(segment[0] * (inner[:, 1] - a[1]) - segment[1] * (inner[:, 0] - a[0])) / norm
+        index = int(distances.argmax())
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def _format_number(value: float, digits: int) -> str:
+    return f"{value:.{digits}f}".rstrip("0").rstrip(".")
+
+
+def _format_sequence(seq: np.ndarray, digits: int) -> str:
+    return "(" + ", ".join(f"{_format_number(x, digits)} {_format_number(y, digits)}" for x, y in seq) + ")"
+
+
+def simplified_wkt(geometry: Geometry, max_vertices: int, digits: int = 6) -> Optional[str]:
+    """A WKT with at most about `max_vertices` vertices, or None if it cannot be reduced that far."""
+    bbox = geometry.bbox()
+    if bbox is None or geometry.type in ("POINT", "MULTIPOINT", "GEOMETRYCOLLECTION"):
+        return None
+    diagonal = math.hypot(bbox[2] - bbox[0], bbox[3] - bbox[1]) or 1.0
+    # Thin very long sequences first so the cost of Douglas-Peucker stays bounded
+    limit = 16 * max_vertices
+    thinned = [
+        [np.vstack([seq[:-1:math.ceil(len(seq) / limit)], seq[-1:]]) if len(seq) > limit else seq for seq in part]
+        for part in geometry.parts
+    ]
+    # Start near the deviation a max_vertices outline would have, then coarsen
+    tolerance = diagonal / (8 * max_vertices)
+    for _ in range(12):
+        parts = [[simplify(seq, tolerance) for seq in part] for part in thinned]
+        vertices = sum(len(seq) for part in parts for seq in part)
+        if vertices <= max_vertices:
+            break
+        tolerance *= 2
+    else:
+        return None
+    if vertices >= geometry.vertex_count:
+        # Nothing to simplify, the descriptor already says enough
+        return None
+
+    def polygon(part):
+        return "(" + ", ".join(_format_sequence(ring, digits) for ring in part) + ")"
+
+    if geometry.type == "POLYGON":
+        body = polygon(parts[0])
+    elif geometry.type == "MULTIPOLYGON":
+        body = "(" + ", ".join(polygon(part) for part in parts) + ")"
+    elif geometry.type == "LINESTRING":
+        body = _format_sequence(parts[0][0], digits)
+    else:
+        body = "(" + ", ".join(_format_sequence(seq, digits) for part in parts for seq in part) + ")"
+    return f"{geometry.type} {body}"
+
+
+def describe_geometry(text: str, simplified_vertices: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Compact descriptor of a WKT geometry: type, vertex count, bbox, centroid, area / length."""
+    geometry = parse_wkt(text)
+    if geometry is None:
+        return None
+    if simplified_vertices is None:
+        simplified_vertices = int(os.getenv("GEOMETRY_SIMPLIFIED_VERTICES", "32"))
+    bbox = geometry.bbox()
+    descriptor: Dict[str, Any] = {
+        "type": geometry.type,
+        "vertices": geometry.vertex_count
+    }
+    if geometry.srid is not None:
+        descriptor["srid"] = geometry.srid
+    if "MULTI" in geometry.type:
+        descriptor["parts"] = len(geometry.parts)
+    if bbox is not None:
+        descriptor["bbox"] = [round(v, 7) for v in bbox]
+        descriptor.update({
+            key: [round(v, 7) for v in value] if isinstance(value, list) else round(value, 3)
+            for key, value in measure(geometry).items()
+        })
+    if simplified_vertices:
+        wkt = simplified_wkt(geometry, simplified_vertices)
+        if wkt is not None:
+            descriptor["simplified_wkt"] = wkt
+    return descriptor
+
+
+def _summarize_value(value: Any, min_chars: int) -> Any:
+    if isinstance(value, str):
+        if len(value) >= min_chars and WKT_HEADER.match(value):
+            try:
+                return describe_geometry(value) or value
+            except Exception:
+                # Looked like WKT but is not: the text itself is what the answer needs
+                return value
+        return value
+    if hasattr(value, "labels") and hasattr(value, "items"):
+        # neo4j Node: its str() would carry every geometry property verbatim
+        return {
+            "labels": sorted(value.labels),
+            "properties": {k: _summarize_value(v, min_chars) for k, v in value.items()}
+        }
+    if isinstance(value, dict):
+        return {k: _summarize_value(v, min_chars) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_summarize_value(v, min_chars) for v in value]
+    return value
+
+
+def summarize_rows(rows: List[Any], min_chars: Optional[int] = None) -> List[Any]:
+    """
+    Copy of result rows with every WKT of at least `min_chars` characters
+    replaced by its descriptor. The rows themselves are not modified.
+    """
+    if min_chars is None:
+        min_chars = int(os.getenv("GEOMETRY_SUMMARY_MIN_CHARS", "200"))
+    return [_summarize_value(row, min_chars) for row in rows]
+
+
+def result_summary_enabled() -> bool:
+    return os.getenv("RESULT_SUMMARY", "true").lower() not in ("0", "false", "no")
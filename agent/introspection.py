@@ -0,0 +1,187 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+from .db import get_session
+
+
+# SKIP still walks the skipped rows, so the random offset of a sample is capped
+MAX_SAMPLE_SKIP = 1000
+
+def _strip_type(value: str) -> str:
+    # db.schema.relTypeProperties() reports types as ":`TYPE`"
+    return value.lstrip(":").strip("`")
+
+
+class SchemaIntrospector:
+    """
+    Schema introspection engine that avoids full label scans.
+
+    In "catalog" mode it reads db.schema.nodeTypeProperties() and
+    db.schema.relTypeProperties(). In "sample" mode (or when the catalog
+    procedures are unavailable) it inspects a window of `sample_size`
+    entities per label and relationship type, at a random offset of at most
+    MAX_SAMPLE_SKIP so each sample reads a bounded number of rows, with one
+    session per worker so labels are processed in parallel. Property types
+    and the existing indexes are collected in both modes.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        sample_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        session_factory: Callable = get_session
+    ):
+        self.mode = (mode or os.getenv("NEO4J_SCHEMA_INTROSPECTION", "auto")).lower()
+        self.sample_size = sample_size or int(os.getenv("NEO4J_SCHEMA_SAMPLE_SIZE", "1000"))
+        self.max_workers = max_workers or int(os.getenv("NEO4J_SCHEMA_WORKERS", "4"))
+        self.session_factory = session_factory
+
+    def __call__(self, session=None) -> Dict[str, Any]:
+        return self.introspect(session)
+
+    def introspect(self, session=None) -> Dict[str, Any]:
+        """Return the schema dictionary, including property types and indexes."""
+        if session is None:
+            with self.session_factory() as session:
+                return self.introspect(session)
+
+        schema = {
+            "labels": [record["label"] for record in session.run("CALL db.labels()")],
+            "relationshipTypes": [record["relationshipType"] for record in session.run("CALL db.relationshipTypes()")],
+            "propertyKeys": [record["propertyKey"] for record in session.run("CALL db.propertyKeys()")],
+            "nodeProperties": {},
+            "relProperties": {},
+            "nodePropertyTypes": {},
+            "relPropertyTypes": {},
+            "indexes": []
+        }
+
+        catalog = None
+        if self.mode in ("auto", "catalog"):
+            try:
+                catalog = self._read_catalog(session)
+            except Exception as e:
+                if self.mode == "catalog":
+                    raise
+                print(f"Warning: Schema catalog procedures unavailable, falling back to sampling: {str(e)}")
+
+        if catalog is not None:
+            node_types, rel_types = catalog
+        else:
+            node_types, rel_types = self._sample(schema["labels"], schema["relationshipTypes"])
+
+        for label in schema["labels"]:
+            types = node_types.get(label, {})
+            schema["nodeProperties"][label] = sorted(types)
+            schema["nodePropertyTypes"][label] = types
+        for rel_type in schema["relationshipTypes"]:
+            types = rel_types.get(rel_type, {})
+            schema["relProperties"][rel_type] = sorted(types)
+            schema["relPropertyTypes"][rel_type] = types
+
+        schema["indexes"] = self._read_indexes(session)
+        return schema
+
+    def _read_catalog(self, session):
+        node_types: Dict[str, Dict[str, List[str]]] = {}
+        for record in session.run(
+            "CALL db.schema.nodeTypeProperties() "
+            "YIELD nodeLabels, propertyName, propertyTypes "
+            "RETURN nodeLabels, propertyName, propertyTypes"
+        ):
+            for label in record["nodeLabels"] or []:
+                props = node_types.setdefault(label, {})
+                if record["propertyName"]:
+                    merged = set(props.get(record["propertyName"], [])) | set(record["propertyTypes"] or [])
+                    props[record["propertyName"]] = sorted(merged)
+
+        rel_types: Dict[str, Dict[str, List[str]]] = {}
+        for record in session.run(
+            "CALL db.schema.relTypeProperties() "
+            "YIELD relType, propertyName, propertyTypes "
+            "RETURN relType, propertyName, propertyTypes"
+        ):
+            props = rel_types.setdefault(_strip_type(record["relType"]), {})
+            if record["propertyName"]:
+                merged = set(props.get(record["propertyName"], [])) | set(record["propertyTypes"] or [])
+                props[record["propertyName"]] = sorted(merged)
+
+        return node_types, rel_types
+
+    def _sample(self, labels: List[str], rel_types: List[str]):
+        jobs = [("node", label) for label in labels] + [("rel", rel_type) for rel_type in rel_types]
+        node_types: Dict[str, Dict[str, List[str]]] = {}
+        rel_result: Dict[str, Dict[str, List[str]]] = {}
+        if not jobs:
+            return node_types, rel_result
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            results = executor.map(lambda job: self._sample_one(*job), jobs)
+            for (kind, name), types in zip(jobs, results):
+                (node_types if kind == "node" else rel_result)[name] = types
+        return node_types, rel_result
+
+    def _sample_one(self, kind: str, name: str) -> Dict[str, List[str]]:
+        if kind == "node":
+            count_query = f"MATCH (n:`{name}`) RETURN count(n) AS total"
+            match = f"MATCH (n:`{name}`)"
+        else:
+            count_query = f"MATCH ()-[n:`{name}`]->() RETURN count(n) AS total"
+            match = f"MATCH ()-[n:`{name}`]->()"
+
+        with self.session_factory() as session:
+            # Counts come from the count store, so this does not scan
+            total = session.run(count_query).single()["total"]
+            skip = random.randint(0, min(max(total - self.sample_size, 0), MAX_SAMPLE_SKIP))
+            params = {"skip": skip, "limit": self.sample_size}
+            try:
+                query = (
+                    f"{match} WITH n SKIP $skip LIMIT $limit "
+                    "UNWIND keys(n) AS key "
+                    "RETURN key, collect(DISTINCT valueType(n[key])) AS types"
+                )
+                records = list(session.run(query, params))
+            except Exception:
+                # valueType() requires Neo4j 5.13+, collect keys only
+                query = (
+                    f"{match} WITH n SKIP $skip LIMIT $limit "
+                    "UNWIND keys(n) AS key "
+                    "RETURN DISTINCT key, [] AS types"
+                )
+                records = list(session.run(query, params))
+
+        return {
+            record["key"]: sorted(t.replace(" NOT NULL", "") for t in record["types"])
+            for record in records
+        }
+
+    def _read_indexes(self, session) -> List[Dict[str, Any]]:
+        try:
+            records = session.run(
+                "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state"
+            )
+            return [dict(record) for record in records]
+        except Exception:
+            pass
+        try:
+            return [
+                {
+                    "name": record.get("name"),
+                    "type": record.get("type"),
+                    "labelsOrTypes": record.get("labelsOrTypes", record.get("tokenNames")),
+                    "properties": record.get("properties"),
+                    "state": record.get("state")
+                }
+                for record in session.run("CALL db.indexes()")
+            ]
+        except Exception as e:
+            print(f"Warning: Could not retrieve index information: {str(e)}")
+            return []
+
+
+def introspect_schema_fast(session=None, **kwargs) -> Dict[str, Any]:
+    """Introspect the schema with catalog procedures, falling back to sampling."""
+    return SchemaIntrospector(**kwargs).introspect(session)
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import inspect
+import tempfile
+import functools
+import threading
+import contextvars
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "agent_node_calls_total": ("counter", "Workflow node executions by node and status"),
+    "agent_node_duration_seconds": ("histogram", "Wall time of workflow nodes"),
+    "agent_llm_calls_total": ("counter", "Chat model calls by node"),
+    "agent_llm_tokens_total": ("counter", "Chat model tokens by node and kind (input, output)"),
+    "agent_cypher_retries_total": ("counter", "Cypher regenerations after a failed validation or execution"),
+    "agent_query_rows_total": ("counter", "Rows returned by executed Cypher queries"),
+    "agent_db_result_available_seconds": ("histogram", "Neo4j result_available_after (server time to first record)"),
+    "agent_db_result_consumed_seconds": ("histogram", "Neo4j result_consumed_after (server time to consume the result)"),
+    "agent_service_requests_total": ("counter", "HTTP service requests by endpoint and status"),
+    "agent_service_request_duration_seconds": ("histogram", "HTTP service request latency by endpoint")
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = [
+        (key, value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for key, value in items
+    ]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process counters and histograms, exported as Prometheus
+    text (to_prometheus) or JSON (to_json).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [per-bucket counts (+Inf last), sum, count]
+        self._histograms: Dict[str, Dict[LabelKey, List[Any]]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = []
+                for key, (counts, total, count) in series.items():
+                    cumulative, buckets = 0, {}
+                    for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                        cumulative += bucket_count
+                        buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+                    histograms[name].append({"labels": dict(key), "count": count, "sum": total, "buckets": buckets})
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        snapshot = self.to_json()
+        lines = []
+        for kind, metrics in (("counter", snapshot["counters"]), ("histogram", snapshot["histograms"])):
+            for name in sorted(metrics):
+                help_text = METRIC_HELP.get(name, (kind, name))[1]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for sample in metrics[name]:
+                    labels = _label_key(sample["labels"])
+                    if kind == "counter":
+                        lines.append(f"{name}{_format_labels(labels)} {sample['value']:g}")
+                        continue
+                    for bound, count in sample["buckets"].items():
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {sample['sum']:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("AGENT_METRICS", "false").lower() in ("1", "true", "yes")
+
+
+def write_metrics(path: str, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Write the registry to `path`: JSON for *.json, Prometheus text otherwise
+    (e.g. for the node_exporter textfile collector). The file is replaced
+    atomically.
+    """
+    registry = registry or get_metrics_registry()
+    if path.endswith(".json"):
+        content = json.dumps(registry.to_json(), ensure_ascii=False, indent=2)
+    else:
+        content = registry.to_prometheus()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # A temp file of its own, so concurrent writers never interleave in one
+    fd, tmp_path = tempfile.mkstemp(prefix=".metrics_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        # mkstemp creates 0600; collectors such as node_exporter read the file as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "0.0.0.0", registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+    registry = registry or get_metrics_registry()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics.json":
+                body, content_type = json.dumps(registry.to_json()).encode("utf-8"), "application/json"
+            elif self.path.split("?")[0] == "/metrics":
+                body, content_type = registry.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port if port is not None else int(os.getenv("METRICS_PORT", "9464"))), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# Token usage of the node currently running (set by instrument_node)
+_llm_usage: contextvars.ContextVar[Optional[Counter]] = contextvars.ContextVar("agent_llm_usage", default=None)
+
+
+def record_llm_usage(message: Any) -> None:
+    """Add the usage_metadata of a chat model reply to the running node, if instrumented."""
+    usage = _llm_usage.get()
+    if usage is None:
+        return
+    metadata = getattr(message, "usage_metadata", None) or {}
+    usage.update({
+        "llm_calls": 1,
+        "input_tokens": metadata.get("input_tokens", 0),
+        "output_tokens": metadata.get("output_tokens", 0)
+    })
+
+
+def _node_record(node: str, state: Dict[str, Any], update: Optional[Dict[str, Any]], seconds: float, usage: Counter) -> Dict[str, Any]:
+    update = update or {}
+    record = {
+        "node": node,
+        "seconds": round(seconds, 6),
+        "status": "error" if update.get("error") else "ok",
+        "llm_calls": usage["llm_calls"],
+        "input_tokens": usage["input_tokens"],
+        "output_tokens": usage["output_tokens"],
+        # Cypher generation with an error context is a repair of a failed query
+        "retry": node == "generate_cypher" and bool(state.get("error_context"))
+    }
+    if update.get("row_count") is not None and not update.get("result_cache_hit"):
+        record["rows"] = update["row_count"]
+    if update.get("db_timings"):
+        record["db_timings"] = update["db_timings"]
+
+    registry = get_metrics_registry()
+    registry.inc("agent_node_calls_total", node=node, status=record["status"])
+    registry.observe("agent_node_duration_seconds", seconds, node=node)
+    if record["llm_calls"]:
+        registry.inc("agent_llm_calls_total", record["llm_calls"], node=node)
+        registry.inc("agent_llm_tokens_total", record["input_tokens"], node=node, kind="input")
+        registry.inc("agent_llm_tokens_total", record["output_tokens"], node=node, kind="output")
+    if record["retry"]:
+        registry.inc("agent_cypher_retries_total")
+    if "rows" in record:
+        registry.inc("agent_query_rows_total", record["rows"])
+    db_timings = record.get("db_timings") or {}
+    if db_timings.get("available_after_ms") is not None:
+        registry.observe("agent_db_result_available_seconds", db_timings["available_after_ms"] / 1000)
+    if db_timings.get("consumed_after_ms") is not None:
+        registry.observe("agent_db_result_consumed_seconds", db_timings["consumed_after_ms"] / 1000)
+    return record
+
+
+def instrument_node(node: str, func: Callable) -> Callable:
+    """
+    Wrap a (sync or async) workflow node so each call records its wall time,
+    chat model tokens, retries, row count and Neo4j timings in the metrics
+    registry and appends the record to the state's node_metrics.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+            usage = Counter()
+            token = _llm_usage.set(usage)
+            start = time.perf_counter()
+            try:
+                update = await func(state)
+            except Exception:
+                get_metrics_registry().inc("agent_node_calls_total", node=node, status="exception")
+                raise
+            finally:
+                _llm_usage.reset(token)
+            record = _node_record(node, state, update, time.perf_counter() - start, usage)
+            return {**(update or {}), "node_metrics": [record]}
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        usage = Counter()
+        token = _llm_usage.set(usage)
+        start = time.perf_counter()
+        try:
+            update = func(state)
+        except Exception:
+            get_metrics_registry().inc("agent_node_calls_total", node=node, status="exception")
+            raise
+        finally:
+            _llm_usage.reset(token)
+        record = _node_record(node, state, update, time.perf_counter() - start, usage)
+        return {**(update or {}), "node_metrics": [record]}
+    return wrapper
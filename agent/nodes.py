@@ -1,135 +1,112 @@
-from typing import Dict, Any, TypedDict
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, TypedDict, Optional, Tuple
 import os
 import re
 import json
-from neo4j import GraphDatabase
+import time
+import threading
+from .db import get_driver, get_session
+from .schema import get_schema, get_schema_cache
+from .cache import (
+    get_question_cache,
+    question_cache_enabled,
+    get_result_cache,
+    result_cache_enabled,
+    is_write_query
+)
+from .schema_render import render_schema_for_prompt
+from .results import RowCollector, result_settings
+from .compiler import compile_cypher, extract_places, extract_distance, template_compiler_enabled
+from .parameterize import lift_literals
+from .gazetteer import get_gazetteer, gazetteer_enabled, is_grounded
+from .geometry import summarize_rows, result_summary_enabled
+from .fast_response import render_response, fast_response_enabled
+from .classifier import classify_locally
+from .planner import PLAN_RESPONSE_FORMAT, parse_plan
+from .metrics import record_llm_usage
+from .session import is_followup, followup_entities, previous_result, turn_context
+from .spatial_index import get_envelope_index, spatial_prefilter_enabled, prefilter_plan, apply_prefilter
 
 # Import prompts from the local prompts module
 from .prompts import (
     classification_prompt,
     entity_extraction_prompt,
     cypher_generation_prompt,
+    planner_prompt,
     response_generation_prompt
 )
 
-# Initialize LLM
-llm = ChatOpenAI(
-    model_name=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
-    temperature=0,
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
-
-# Initialize Neo4j connection
-def get_neo4j_connection():
-    return GraphDatabase.driver(
-        os.getenv("NEO4J_URI"),
-        auth=(
-            os.getenv("NEO4J_USERNAME"),
-            os.getenv("NEO4J_PASSWORD")
-        )
-    )
+_llm_lock = threading.Lock()
 
-def get_neo4j_schema():
+def get_llm():
     """
-    Retrieve schema information from Neo4j including labels, relationship types, and properties.
-    Returns a dictionary with schema information.
+    Return the shared chat model, created on first use so importing the
+    package does not construct an OpenAI client. Assigning nodes.llm
+    (e.g. a stub model) replaces it.
     """
-    schema = {
-        "labels": [],
-        "relationshipTypes": [],
-        "propertyKeys": [],
-        "nodeProperties": {},
-        "relProperties": {}
-    }
-    
-    try:
-        driver = get_neo4j_connection()
-        with driver.session() as session:
-            # Get basic schema info
-            schema["labels"] = [record["label"] for record in session.run("CALL db.labels()")]
-            schema["relationshipTypes"] = [record["relationshipType"] for record in session.run("CALL db.relationshipTypes()")]
-            schema["propertyKeys"] = [record["propertyKey"] for record in session.run("CALL db.propertyKeys()")]
-            
-            # Get node properties
-            for label in schema["labels"]:
-                query = f"""
-                MATCH (n:`{label}`)
-                WITH DISTINCT keys(n) as keys
-                UNWIND keys as key
-                RETURN collect(distinct key) as properties
-                """
-                result = session.run(query)
-                schema["nodeProperties"][label] = result.single()["properties"] if result.peek() else []
-            
-            # Get relationship properties
-            for rel_type in schema["relationshipTypes"]:
-                query = f"""
-                MATCH ()-[r:`{rel_type}`]->()
-                WITH DISTINCT keys(r) as keys
-                UNWIND keys as key
-                RETURN collect(distinct key) as properties
-                """
-                result = session.run(query)
-                schema["relProperties"][rel_type] = result.single()["properties"] if result.peek() else []
-                
-        return schema
-        
-    except Exception as e:
-        print(f"Warning: Could not retrieve schema information: {str(e)}")
-        return schema
-    finally:
-        if 'driver' in locals():
-            driver.close()
+    global llm
+    model = globals().get("llm")
+    if model is None:
+        with _llm_lock:
+            model = globals().get("llm")
+            if model is None:
+                # langchain_openai is slow to import, load it only when needed
+                from langchain_openai import ChatOpenAI
+                model = llm = ChatOpenAI(
+                    model_name=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
+                    temperature=0,
+                    openai_api_key=os.getenv("OPENAI_API_KEY")
+                )
+    return model
 
-# Cache the schema at module level
-neo4j_schema = get_neo4j_schema()
+# Neo4j connection (shared, pooled driver managed in db.py)
+def get_neo4j_connection():
+    return get_driver()
 
-def classify_query(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Classify the type of the user's query."""
-    chain = classification_prompt | llm
-    result = chain.invoke({
-        "input": state["question"],
-        "schema": ""  # Add schema if needed
-    })
-    
+def __getattr__(name):
+    # Backwards-compatible lazy access to the cached schema and the chat model
+    if name == "neo4j_schema":
+        return get_schema()
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+VALID_QUERY_TYPES = {"TOPOLOGICAL", "SET", "BUFFER", "SINGLE", "DISTANCE"}
+
+def _invoke(prompt, prompt_input: Dict[str, Any], **bind_kwargs):
+    model = get_llm()
+    chain = prompt | (model.bind(**bind_kwargs) if bind_kwargs else model)
+    result = chain.invoke(prompt_input)
+    # Token usage is attributed to the running node when metrics are enabled
+    record_llm_usage(result)
+    return result
+
+def _parse_query_type(content: str) -> str:
     # Clean and standardize the query type
-    query_type = result.content.strip().upper()
-    valid_types = {"TOPOLOGICAL", "SET", "BUFFER", "SINGLE", "DISTANCE"}
+    query_type = content.strip().upper()
     
     # Default to TOPOLOGICAL if the response is not a valid type
-    if query_type not in valid_types:
+    if query_type not in VALID_QUERY_TYPES:
         query_type = "TOPOLOGICAL"
-        
-    return {"query_type": query_type}
+    return query_type
 
-def extract_entities(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract entities from the user's query."""
-    chain = entity_extraction_prompt | llm
-    result = chain.invoke({"input": state["question"]})
-    
+def _parse_entities(content: str) -> Any:
     # Try to parse the JSON response, fallback to raw text if parsing fails
     try:
-        entities = json.loads(result.content.strip())
+        return json.loads(content.strip())
     except json.JSONDecodeError:
-        entities = result.content.strip()
-        
-    return {"entities": entities}
+        return content.strip()
 
-def generate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate a Cypher query based on the query type and entities with retry context."""
-    # Prepare the input for the Cypher generation prompt
-    chain = cypher_generation_prompt | llm
-    
+def _cypher_prompt_input(state: Dict[str, Any]) -> Dict[str, Any]:
     # Convert entities to string if it's a dictionary
     entities_str = state["entities"]
     if isinstance(entities_str, dict):
         entities_str = json.dumps(entities_str, ensure_ascii=False, indent=2)
     
-    # Prepare the prompt input with schema
-    schema_str = json.dumps(neo4j_schema, ensure_ascii=False, indent=2)
+    # Prepare the prompt input with the relevant part of the schema
+    if os.getenv("SCHEMA_PROMPT_MODE", "compact") == "full":
+        schema_str = json.dumps(get_schema(), ensure_ascii=False, indent=2)
+    else:
+        schema_str = render_schema_for_prompt(get_schema(), state)
     prompt_input = {
         "query_type": state["query_type"],
         "entities": entities_str,
@@ -137,6 +114,17 @@ def generate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
         "schema": schema_str
     }
     
+    # Places grounded in the gazetteer, so the query can match on label and key
+    grounded = [item for item in state.get("resolved_entities") or [] if is_grounded(item)]
+    if grounded:
+        prompt_input["resolved_entities"] = (
+            "- 확인된 위치 (MATCH에 라벨과 속성을 지정하세요):\n" +
+            "\n".join([
+                f"  - {item['text']} → (:`{item['label']}` {{`{item['key']}`: '{item['value']}'}})"
+                for item in grounded
+            ])
+        )
+    
     # Add error context if this is a retry
     if state.get("error_context"):
         error_ctx = state["error_context"]
@@ -147,19 +135,296 @@ def generate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
             "Previous queries that failed:\n" + 
             "\n".join([f"- {q}" for q in error_ctx.get('previous_queries', [])[-3:]])
         )
+    return prompt_input
+
+def _compile_template(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Retries always go to the LLM, which sees the error context
+    if not template_compiler_enabled() or state.get("error_context"):
+        return None
+    compiled = compile_cypher(
+        state["query_type"], state["question"], state["entities"], get_schema(),
+        state.get("resolved_entities")
+    )
+    if compiled is None:
+        return None
+    cypher, params = compiled
+    return {
+        "cypher_query": cypher,
+        "cypher_params": params,
+        "cypher_source": "template",
+        "raw_cypher_query": None,
+        "error": None
+    }
+
+def _cypher_generated(state: Dict[str, Any], content: str) -> Dict[str, Any]:
+    update = {
+        "cypher_query": _parse_cypher(content),
+        "cypher_params": {},
+        "cypher_source": "llm",
+        "raw_cypher_query": None,
+        "error": None
+    }
+    if state.get("cache_hit"):
+        # A cached query failed and was regenerated; the new one may be cached
+        update["cache_hit"] = False
+    return update
+
+def _parse_cypher(content: str) -> str:
+    # Extract the Cypher query from markdown code blocks
+    m = re.search(r"```(?:cypher)?\n([\s\S]*?)```$", content, re.MULTILINE)
+    cypher = m.group(1).strip() if m else content.strip()
+    
+    # Clean up the query
+    return cypher.replace("```", "").strip()
+
+def _new_retry_context() -> Dict[str, Any]:
+    return {
+        "attempts": 0,
+        "max_attempts": int(os.getenv("CYPHER_MAX_ATTEMPTS", "5")),
+        "budget_seconds": float(os.getenv("CYPHER_RETRY_BUDGET", "60")),
+        "started_at": time.time(),
+        "last_error": None,
+        "previous_queries": [],
+        "status": "PENDING"
+    }
+
+def _start_execution(state: Dict[str, Any]) -> Dict[str, Any]:
+    # Initialize retry context if not exists (copied, never mutated in place)
+    retry_context = dict(state.get("retry_context") or _new_retry_context())
+    retry_context["previous_queries"] = list(retry_context["previous_queries"])
+    
+    # Add current query to history before validation / execution (with its
+    # literals, so a regeneration prompt shows the actual values)
+    query = state.get("raw_cypher_query") or state.get("cypher_query")
+    if query and (not retry_context["previous_queries"] or retry_context["previous_queries"][-1] != query):
+        retry_context["previous_queries"].append(query)
+    return retry_context
+
+# Questions that bound the distance ("1km 이내"), so DISTANCE pairs can be prefiltered
+DISTANCE_BOUND = re.compile(r"이내|이하|미만|안에|안쪽|within", re.IGNORECASE)
+
+def _prefilter_plan(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not spatial_prefilter_enabled() or not state.get("cypher_query"):
+        return None
+    max_distance = None
+    if state.get("query_type") == "DISTANCE" and DISTANCE_BOUND.search(state["question"]):
+        max_distance = extract_distance(state.get("entities"), state["question"])
+    return prefilter_plan(state["cypher_query"], state.get("cypher_params") or {}, max_distance)
+
+def _apply_prefilter(state: Dict[str, Any], plan: Dict[str, Any], record) -> Dict[str, Any]:
+    """Split the pairwise comparison into envelope-candidate groups; returns query, params and stats."""
+    query, params = state["cypher_query"], state.get("cypher_params") or {}
+    index = get_envelope_index()
+    if record is None or not index.ensure_loaded():
+        return {"query": query, "params": params, "stats": None}
+    query, params, stats = apply_prefilter(plan, query, params, record["n_ids"], record["m_ids"], index)
+    return {"query": query, "params": params, "stats": stats}
+
+def _cached_result(state: Dict[str, Any], row_cap: int) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Result cache key of a read query (None for writes or when disabled) and the cached result."""
+    if is_write_query(state["cypher_query"]):
+        return None, None
+    # A follow-up running the previous turn's query again reuses its rows
+    reused = previous_result(state)
+    if reused is not None:
+        return None, reused
+    if not result_cache_enabled():
+        return None, None
+    cache = get_result_cache()
+    key = cache.make_key(state["cypher_query"], state.get("cypher_params"), row_cap)
+    cached = cache.get(key)
+    if cached is None:
+        return key, None
+    return key, {**cached, "prefilter_stats": None, "result_cache_hit": True}
+
+def _store_result(state: Dict[str, Any], cache_key: Optional[str], result_update: Dict[str, Any], summary) -> None:
+    counters = getattr(summary, "counters", None)
+    if (counters is not None and counters.contains_updates) or is_write_query(state["cypher_query"]):
+        # The graph changed, every cached result may be stale
+        if result_cache_enabled():
+            get_result_cache().invalidate()
+    elif cache_key is not None:
+        get_result_cache().put(cache_key, result_update)
+
+def _db_timings(summary) -> Optional[Dict[str, Any]]:
+    # Server-side milliseconds until the first record was available and until the result was consumed
+    if summary is None:
+        return None
+    return {
+        "available_after_ms": getattr(summary, "result_available_after", None),
+        "consumed_after_ms": getattr(summary, "result_consumed_after", None)
+    }
+
+def _execution_succeeded(retry_context: Dict[str, Any], result_update: Dict[str, Any]) -> Dict[str, Any]:
+    # Update retry context on success
+    retry_context["status"] = "SUCCESS"
+    retry_context["last_error"] = None
+    return {
+        **result_update,
+        "error": None,
+        "retry_context": retry_context
+    }
+
+def _execution_failed(retry_context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    error_msg = str(error)
+    retry_context["status"] = "ERROR"
+    retry_context["last_error"] = error_msg
+    retry_context["attempts"] += 1
+    return {
+        "query_result": None, 
+        "row_count": None,
+        "result_path": None,
+        "error": error_msg,
+        "retry_context": retry_context,
+        # Read by generate_cypher when the query is regenerated
+        "error_context": {
+            "last_error": error_msg,
+            "attempts": retry_context["attempts"],
+            "previous_queries": retry_context["previous_queries"]
+        }
+    }
+
+def can_retry(state: Dict[str, Any]) -> bool:
+    """Whether a failed query may be regenerated within the attempt and latency budget."""
+    retry_context = state.get("retry_context") or {}
+    if retry_context.get("status") != "ERROR" or not state.get("cypher_query"):
+        return False
+    if retry_context["attempts"] >= retry_context["max_attempts"]:
+        return False
+    return time.time() - retry_context["started_at"] < retry_context["budget_seconds"]
+
+def _explain_query(query: str) -> str:
+    if re.match(r"^\s*(EXPLAIN|PROFILE)\b", query, re.IGNORECASE):
+        return query
+    return f"EXPLAIN {query}"
+
+def _error_response(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {"response": f"죄송합니다. 쿼리 실행 중 오류가 발생했습니다: {state['error']}"}
+
+def _fast_response(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not fast_response_enabled():
+        return None
+    response = render_response(state)
+    if response is None:
+        return None
+    return {"response": response, "response_source": "template"}
+
+def _response_prompt_input(state: Dict[str, Any]) -> Dict[str, Any]:
+    rows = state["query_result"]
+    total = state.get("row_count") or len(rows)
+    # Large WKT geometries are replaced by compact descriptors in the prompt;
+    # query_result itself keeps the full geometries
+    shown = summarize_rows(rows[:5]) if result_summary_enabled() else rows[:5]
+    result = str(shown)
+    if total > 5:
+        result += f"... (총 {total}개 중 5개)"
+    return {
+        "question": state["question"],
+        "query": state["cypher_query"],
+        "result": result
+    }
+
+def check_cache(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Look up a cached query type, entities and Cypher for the question."""
+    # Follow-ups depend on the session, not only on the question text
+    if is_followup(state["question"], state.get("session_context")):
+        return {"cache_key": None, "cache_hit": False, "followup": True}
+    if not question_cache_enabled():
+        return {"cache_key": None, "cache_hit": False, "followup": False}
+    
+    schema_cache = get_schema_cache()
+    schema_cache.get()  # make sure the fingerprint is loaded
+    cache = get_question_cache()
+    key = cache.make_key(state["question"], schema_cache.fingerprint)
+    cached = cache.get(key)
+    if cached is None:
+        return {"cache_key": key, "cache_hit": False, "followup": False}
+    
+    return {
+        "cache_key": key,
+        "cache_hit": True,
+        "followup": False,
+        "query_type": cached["query_type"],
+        "entities": cached["entities"],
+        # Resolution is skipped on a hit; the session context still needs its labels
+        "resolved_entities": cached.get("resolved_entities"),
+        "place_suggestions": cached.get("place_suggestions"),
+        "cypher_query": cached["cypher_query"],
+        "cypher_params": cached.get("cypher_params") or {},
+        "cypher_source": cached.get("cypher_source")
+    }
+
+def store_cache(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Remember the plan of a freshly generated query that executed successfully."""
+    if state.get("cache_key") and not state.get("cache_hit") and not state.get("error"):
+        get_question_cache().put(state["cache_key"], {
+            "query_type": state["query_type"],
+            "entities": state["entities"],
+            "resolved_entities": state.get("resolved_entities"),
+            "place_suggestions": state.get("place_suggestions"),
+            "cypher_query": state["cypher_query"],
+            "cypher_params": state.get("cypher_params") or {},
+            "cypher_source": state.get("cypher_source")
+        })
+    return {}
+
+def classify_query(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Classify the type of the user's query. The local classifier answers when
+    it is confident enough, otherwise the LLM is asked.
+    """
+    local = classify_locally(state["question"])
+    if local is not None:
+        return {**local, "query_type_source": "classifier"}
+    
+    result = _invoke(classification_prompt, {
+        "input": state["question"],
+        "schema": ""  # Add schema if needed
+    })
+    return {"query_type": _parse_query_type(result.content), "query_type_confidence": None, "query_type_source": "llm"}
+
+def extract_entities(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract entities from the user's query."""
+    if state.get("followup"):
+        return followup_entities(state["session_context"])
+    result = _invoke(entity_extraction_prompt, {"input": state["question"]})
+    return {"entities": _parse_entities(result.content)}
+
+def resolve_entities(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ground the extracted place names in the gazetteer, mapping each one to
+    the label, key and stored value of the node it names.
+    """
+    if state.get("followup"):
+        # Carried over from the previous turn by extract_entities
+        return {}
+    if not gazetteer_enabled():
+        return {"resolved_entities": None}
+    places = extract_places(state.get("entities"))
+    if not places:
+        return {"resolved_entities": [], "place_suggestions": None}
+    
+    gazetteer = get_gazetteer()
+    if not gazetteer.ensure_loaded():
+        return {"resolved_entities": None}
+    resolved = gazetteer.resolve(places)
+    # Names that only look like stored ones are matched as written, never swapped
+    unresolved = [place for place in places if place not in {item["text"] for item in resolved}]
+    return {"resolved_entities": resolved, "place_suggestions": gazetteer.suggest(unresolved) or None}
+
+def generate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a Cypher query based on the query type and entities with retry context."""
+    # Well-formed requests are compiled from templates without an LLM call
+    compiled = _compile_template(state)
+    if compiled is not None:
+        return compiled
+    
+    # Prepare the input for the Cypher generation prompt
+    prompt_input = _cypher_prompt_input(state)
     
     try:
-        result = chain.invoke(prompt_input)
-        
-        # Extract the Cypher query from markdown code blocks
-        cypher_raw = result.content
-        m = re.search(r"```(?:cypher)?\n([\s\S]*?)```$", cypher_raw, re.MULTILINE)
-        cypher = m.group(1).strip() if m else cypher_raw.strip()
-        
-        # Clean up the query
-        cypher = cypher.replace("```", "").strip()
-        
-        return {"cypher_query": cypher, "error": None}
+        result = _invoke(cypher_generation_prompt, prompt_input)
+        return _cypher_generated(state, result.content)
         
     except Exception as e:
         return {
@@ -167,63 +432,129 @@ def generate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
             "error": f"Failed to generate Cypher query: {str(e)}"
         }
 
+def _planner_prompt_input(state: Dict[str, Any]) -> Dict[str, Any]:
+    if os.getenv("SCHEMA_PROMPT_MODE", "compact") == "full":
+        schema_str = json.dumps(get_schema(), ensure_ascii=False, indent=2)
+    else:
+        schema_str = render_schema_for_prompt(get_schema(), state)
+    return {"input": state["question"], "schema": schema_str}
+
+def _plan_update(state: Dict[str, Any], content: str) -> Dict[str, Any]:
+    try:
+        plan = parse_plan(content)
+    except ValueError as e:
+        print(f"Warning: Invalid plan, falling back to separate calls: {e}")
+        return {"plan": None, "cypher_query": None}
+    
+    update = _cypher_generated(state, plan["cypher"])
+    update.update({
+        "plan": plan,
+        "query_type": plan["query_type"],
+        "query_type_confidence": None,
+        "query_type_source": "planner",
+        "entities": {"entities": plan["entities"]},
+        "cypher_source": "planner"
+    })
+    return update
+
+def plan_query(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Planner mode: one structured-output call returns the query type,
+    operation, entities and Cypher together, validated against PLAN_SCHEMA.
+    An invalid plan leaves cypher_query empty so the workflow falls back to
+    the separate classify/extract/generate calls.
+    """
+    try:
+        result = _invoke(planner_prompt, _planner_prompt_input(state), response_format=PLAN_RESPONSE_FORMAT)
+    except Exception as e:
+        print(f"Warning: Planner call failed, falling back to separate calls: {e}")
+        return {"plan": None, "cypher_query": None}
+    return _plan_update(state, result.content)
+
+def parameterize_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Lift string and numeric literals of the generated query into parameters,
+    so structurally identical questions share one query text and Neo4j can
+    reuse the cached plan.
+    """
+    query = state.get("cypher_query")
+    if not query or os.getenv("CYPHER_PARAMETERIZE", "true").lower() in ("0", "false", "no"):
+        return {}
+    
+    lifted, params = lift_literals(query, state.get("cypher_params"))
+    if lifted == query:
+        return {}
+    return {"cypher_query": lifted, "cypher_params": params, "raw_cypher_query": query}
+
+def validate_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check the generated query with EXPLAIN, which plans it without touching
+    data, so syntax and semantic errors are caught before a full execution.
+    """
+    retry_context = _start_execution(state)
+    if not state.get("cypher_query") or os.getenv("CYPHER_VALIDATE", "true").lower() in ("0", "false", "no"):
+        return {"retry_context": retry_context}
+    
+    try:
+        with get_session() as session:
+            session.run(_explain_query(state["cypher_query"]), state.get("cypher_params") or {}).consume()
+        return {"retry_context": retry_context, "error": None}
+    
+    except Exception as e:
+        return _execution_failed(retry_context, e)
+
 def execute_cypher(state: Dict[str, Any]) -> Dict[str, Any]:
     """Execute the generated Cypher query against Neo4j."""
-    # Initialize retry context if not exists
-    if "retry_context" not in state:
-        state["retry_context"] = {
-            "attempts": 0,
-            "max_attempts": 5,
-            "last_error": None,
-            "previous_queries": [],
-            "status": "PENDING"
-        }
+    retry_context = _start_execution(state)
+    fetch_size, row_cap, spill_dir = result_settings()
     
-    # Add current query to history before execution
-    if state["cypher_query"]:
-        state["retry_context"]["previous_queries"].append(state["cypher_query"])
+    # Identical read queries are served from the result cache
+    cache_key, cached = _cached_result(state, row_cap)
+    if cached is not None:
+        return _execution_succeeded(retry_context, {**cached, "db_timings": None})
+    collector = RowCollector(row_cap, spill_dir)
     
-    driver = get_neo4j_connection()
     try:
-        with driver.session() as session:
-            result = session.run(state["cypher_query"])
-            records = [dict(record) for record in result]
-            
-            # Update retry context on success
-            state["retry_context"]["status"] = "SUCCESS"
-            state["retry_context"]["last_error"] = None
+        with get_session(fetch_size=fetch_size) as session:
+            query, params, prefilter_stats = state["cypher_query"], state.get("cypher_params") or {}, None
+            # Pairwise operations: drop nodes without an envelope-intersecting
+            # partner before the procedure compares every pair
+            plan = _prefilter_plan(state)
+            if plan is not None:
+                try:
+                    prefiltered = _apply_prefilter(state, plan, session.run(plan["id_query"], params).single())
+                    query, params, prefilter_stats = prefiltered["query"], prefiltered["params"], prefiltered["stats"]
+                except Exception as e:
+                    print(f"Warning: Spatial prefilter skipped: {str(e)}")
             
-            return {
-                "query_result": records, 
-                "error": None,
-                "retry_context": state["retry_context"]
-            }
+            # Records are pulled lazily in batches of fetch_size; only the first
+            # row_cap rows are kept in memory, the rest are counted (and spilled)
+            result = session.run(query, params)
+            for record in result:
+                collector.add(record)
+            summary = result.consume()
+        result_update = {**collector.finish(), "prefilter_stats": prefilter_stats, "result_cache_hit": False}
+        _store_result(state, cache_key, result_update, summary)
+        return _execution_succeeded(retry_context, {**result_update, "db_timings": _db_timings(summary)})
             
     except Exception as e:
-        error_msg = str(e)
-        state["retry_context"]["status"] = "ERROR"
-        state["retry_context"]["last_error"] = error_msg
-        state["retry_context"]["attempts"] += 1
-        
-        return {
-            "query_result": None, 
-            "error": error_msg,
-            "retry_context": state["retry_context"]
-        }
-    finally:
-        driver.close()
+        collector.abort()
+        return _execution_failed(retry_context, e)
 
 def generate_response(state: Dict[str, Any]) -> Dict[str, Any]:
     """Generate a natural language response based on the query results."""
     if state.get("error"):
-        return {"response": f"죄송합니다. 쿼리 실행 중 오류가 발생했습니다: {state['error']}"}
+        return _error_response(state)
     
-    chain = response_generation_prompt | llm
+    # Empty, scalar and single-geometry results are rendered without the LLM
+    fast = _fast_response(state)
+    if fast is not None:
+        return fast
     
-    result = chain.invoke({
-        "question": state["question"],
-        "query": state["cypher_query"],
-        "result": str(state["query_result"][:5]) + ("..." if len(state["query_result"]) > 5 else "")
-    })
+    result = _invoke(response_generation_prompt, _response_prompt_input(state))
     
-    return {"response": result.content.strip()}
\ No newline at end of file
+    return {"response": result.content.strip(), "response_source": "llm"}
+
+def remember_turn(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep what the next turn of the session needs (checkpointed workflows only)."""
+    return {"session_context": turn_context(state)}
@@ -0,0 +1,128 @@
+import re
+from typing import Dict, Any, Tuple, Optional
+
+
+# Cypher identifiers may use any Unicode letter (n.행정동명2)
+_IDENTIFIER_CHAR = re.compile(r"[\w$]")
+# Hexadecimal, octal and decimal literals, including a leading dot (.5)
+_NUMBER = re.compile(r"0[xX][0-9A-Fa-f]+|0[oO][0-7]+|(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def _string_end(query: str, start: int) -> int:
+    """Index just past the string literal starting at `start` (quote included)."""
+    quote = query[start]
+    i = start + 1
+    while i < len(query):
+        if query[i] == "\\":
+            i += 2
+            continue
+        if query[i] == quote:
+            return i + 1
+        i += 1
+    return len(query)
+
+
+def _unescape(literal: str) -> str:
+    body = literal[1:-1]
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t", "r": "\r"}.get(m.group(1), m.group(1)), body)
+
+
+def lift_literals(
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    prefix: str = "p"
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Lift string and numeric literals out of a Cypher query into parameters.
+
+    Identifiers (including `backticked` names), comments, existing $params and
+    the bounds of variable-length patterns (`*1..3`, where parameters are not
+    allowed) are left untouched. Returns the rewritten query and the
+    parameter map merged with `params`. Structurally identical queries with
+    different values therefore produce the same query text.
+    """
+    params = dict(params or {})
+    out = []
+    index = 0
+    i = 0
+    n = len(query)
+
+    def next_name() -> str:
+        nonlocal index
+        while f"{prefix}{index}" in params:
+            index += 1
+        name = f"{prefix}{index}"
+        index += 1
+        return name
+
+    while i < n:
+        ch = query[i]
+
+        # Comments
+        if query.startswith("//", i):
+            end = query.find("\n", i)
+            end = n if end == -1 else end
+            out.append(query[i:end])
+            i = end
+            continue
+        if query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(query[i:end])
+            i = end
+            continue
+
+        # Quoted identifiers
+        if ch == "`":
+            end = query.find("`", i + 1)
+            end = n if end == -1 else end + 1
+            out.append(query[i:end])
+            i = end
+            continue
+
+        # String literals
+        if ch in ("'", '"'):
+            end = _string_end(query, i)
+            name = next_name()
+            params[name] = _unescape(query[i:end])
+            out.append(f"${name}")
+            i = end
+            continue
+
+        # Identifiers, keywords and existing parameters
+        if _IDENTIFIER_CHAR.match(ch) and not ch.isdigit():
+            j = i + 1
+            while j < n and _IDENTIFIER_CHAR.match(query[j]):
+                j += 1
+            out.append(query[i:j])
+            i = j
+            continue
+
+        # Numeric literals; a dot starts one only where no property or range dot can be
+        if ch.isdigit() or (
+            ch == "." and i + 1 < n and query[i + 1].isdigit()
+            and not (i > 0 and (_IDENTIFIER_CHAR.match(query[i - 1]) or query[i - 1] in ".)]}`"))
+        ):
+            m = _NUMBER.match(query, i)
+            literal = m.group(0)
+            # Range bounds like 1..3 must not swallow the dots
+            if query.startswith("..", i + len(literal.split(".")[0])) and "." in literal:
+                literal = literal.split(".")[0]
+            preceding = "".join(out[-4:]).rstrip()
+            if preceding.endswith("*") or preceding.endswith(".."):
+                # Variable-length pattern bounds cannot be parameters
+                out.append(literal)
+            else:
+                name = next_name()
+                if literal[:2].lower() in ("0x", "0o"):
+                    params[name] = int(literal, 0)
+                else:
+                    params[name] = float(literal) if ("." in literal or "e" in literal.lower()) else int(literal)
+                out.append(f"${name}")
+            i += len(literal)
+            continue
+
+        out.append(ch)
+        i += 1
+
+    return "".join(out), params
@@ -0,0 +1,98 @@
+import os
+import re
+import json
+from typing import Dict, Any, List
+
+from .compiler import OPERATIONS, query_operation
+
+
+OPERATION_NAMES = sorted({op for ops in OPERATIONS.values() for op in ops})
+
+# JSON schema of the planner's structured output
+PLAN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "query_type": {"type": "string", "enum": list(OPERATIONS)},
+        "operation": {"type": "string", "enum": OPERATION_NAMES},
+        "entities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "value": {"type": "string"}
+                },
+                "required": ["type", "value"],
+                "additionalProperties": False
+            }
+        },
+        "cypher": {"type": "string"}
+    },
+    "required": ["query_type", "operation", "entities", "cypher"],
+    "additionalProperties": False
+}
+
+# OpenAI structured outputs: the model is constrained to PLAN_SCHEMA
+PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "query_plan", "strict": True, "schema": PLAN_SCHEMA}
+}
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str}
+
+
+class PlanError(ValueError):
+    """The planner output is not a valid plan."""
+
+
+def schema_errors(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Check value against the subset of JSON schema used by PLAN_SCHEMA."""
+    expected = _JSON_TYPES[schema["type"]]
+    if not isinstance(value, expected):
+        return [f"{path}: expected {schema['type']}"]
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if schema["type"] == "object":
+        properties = schema.get("properties", {})
+        errors += [f"{path}: missing {key!r}" for key in schema.get("required", []) if key not in value]
+        if schema.get("additionalProperties") is False:
+            errors += [f"{path}: unexpected {key!r}" for key in value if key not in properties]
+        for key, item in value.items():
+            if key in properties:
+                errors += schema_errors(item, properties[key], f"{path}.{key}")
+    if schema["type"] == "array":
+        for i, item in enumerate(value):
+            errors += schema_errors(item, schema["items"], f"{path}[{i}]")
+    return errors
+
+
+def parse_plan(content: str) -> Dict[str, Any]:
+    """
+    Parse and validate the planner output. Beyond the schema, the operation
+    must belong to the query type and the Cypher must call it.
+    Raises PlanError on invalid output.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
+    try:
+        plan = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise PlanError(f"planner output is not JSON: {e}")
+
+    errors = schema_errors(plan, PLAN_SCHEMA)
+    if not errors:
+        if plan["operation"] not in OPERATIONS[plan["query_type"]]:
+            errors.append(f"operation {plan['operation']} is not a {plan['query_type']} operation")
+        called = query_operation(plan["cypher"])
+        if called is None:
+            errors.append("cypher does not call gspatial.operation")
+        elif called != plan["operation"]:
+            errors.append(f"cypher calls {called}, plan says {plan['operation']}")
+    if errors:
+        raise PlanError("; ".join(errors))
+    return plan
+
+
+def agent_mode() -> str:
+    """Pipeline mode used by create_workflow() when none is given: "graph" or "planner"."""
+    return os.getenv("AGENT_MODE", "graph").lower()
@@ -53,6 +53,46 @@ gspatial_summary = """
    - 출력: n(node), m(node), result(double)
 """
 
+# 유형별 Cypher 구조 예시 (Cypher 생성, 쿼리 계획 프롬프트에서 공유)
+cypher_examples = """1) Topological
+MATCH (n)
+WITH collect(n) AS n_list
+MATCH (m)
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation('WITHIN', [n_list, m_list]) YIELD n, m, result
+WHERE result = true
+RETURN n, m
+
+2) Set
+MATCH (n)
+WITH collect(n) AS n_list
+MATCH (m)
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation('UNION', [n_list, m_list]) YIELD result
+RETURN result
+
+3) Buffer
+MATCH (n)
+WITH collect(n) AS n_list
+CALL gspatial.operation('BUFFER', [n_list, [distance]]) YIELD n, result
+RETURN result
+* distance는 항상 소수점 형식(예: 5.0)으로 표현해야 함. 정수 입력 시에도 반드시 .0을 붙이세요.
+
+4) Single
+MATCH (n)
+WITH collect(n) AS n_list
+CALL gspatial.operation('AREA', [n_list]) YIELD n, result
+RETURN result
+
+5) Distance
+MATCH (n)
+WITH collect(n) AS n_list
+MATCH (m)
+WITH n_list, collect(m) AS m_list
+CALL gspatial.operation('DISTANCE', [n_list, m_list]) YIELD n, m, result
+RETURN n, m, result
+"""
+
 # 1) 유형 분류 프롬프트
 classification_prompt = PromptTemplate(
     input_variables=["input", "schema"],
@@ -87,55 +127,44 @@ JSON 형식으로 출력하세요. 각 엔티티는 'type'과 'value' 필드를
 # 3) Cypher 생성 프롬프트
 cypher_generation_prompt = PromptTemplate(
     input_variables=["query_type", "entities", "schema", "input"],
+    partial_variables={"error_context": "", "resolved_entities": ""},
     template="""
 주어진 정보를 바탕으로 gSpatial operation 프로시저를 호출하는 Cypher 쿼리를 작성하세요.
 - 질문: {input}
 - 유형: {query_type}
 - 엔티티: {entities}
 - 스키마: {schema}
+{resolved_entities}
 
 각 유형별 구조 예시를 참고하세요:
 
-1) Topological
-MATCH (n)
-WITH collect(n) AS n_list
-MATCH (m)
-WITH n_list, collect(m) AS m_list
-CALL gspatial.operation('WITHIN', [n_list, m_list]) YIELD n, m, result
-WHERE result = true
-RETURN n, m
+{cypher_examples}
+{error_context}
+위 예시 패턴을 따라, Cypher 쿼리만 출력하세요.
+""".replace("{cypher_examples}", cypher_examples)
+)
 
-2) Set
-MATCH (n)
-WITH collect(n) AS n_list
-MATCH (m)
-WITH n_list, collect(m) AS m_list
-CALL gspatial.operation('UNION', [n_list, m_list]) YIELD result
-RETURN result
+# 3-1) 쿼리 계획 프롬프트 (planner 모드: 분류, 엔티티 추출, Cypher 생성을 한 번에)
+planner_prompt = PromptTemplate(
+    input_variables=["input", "schema"],
+    template="""
+아래 질문을 분석하여 gSpatial 쿼리 계획을 한 번에 작성하세요.
+{gspatial_summary}
+스키마:
+{schema}
 
-3) Buffer
-MATCH (n)
-WITH collect(n) AS n_list
-CALL gspatial.operation('BUFFER', [n_list, [distance]]) YIELD n, result
-RETURN result
-* distance는 항상 소수점 형식(예: 5.0)으로 표현해야 함. 정수 입력 시에도 반드시 .0을 붙이세요.
+질문: {input}
 
-4) Single
-MATCH (n)
-WITH collect(n) AS n_list
-CALL gspatial.operation('AREA', [n_list]) YIELD n, result
-RETURN result
+다음 필드를 가진 JSON 객체 하나만 출력하세요:
+- query_type: TOPOLOGICAL, SET, BUFFER, SINGLE, DISTANCE 중 하나
+- operation: 위 유형에서 사용 가능한 operation 이름 중 하나
+- entities: 질문의 엔티티 목록. 각 항목은 'type'(위치명, 거리, 공간 관계 등)과 'value' 필드를 가짐
+- cypher: gspatial.operation 프로시저를 호출하는 Cypher 쿼리 (아래 구조 예시를 따름)
 
-5) Distance
-MATCH (n)
-WITH collect(n) AS n_list
-MATCH (m)
-WITH n_list, collect(m) AS m_list
-CALL gspatial.operation('DISTANCE', [n_list, m_list]) YIELD n, m, result
-RETURN n, m, result
+각 유형별 구조 예시:
 
-위 예시 패턴을 따라, Cypher 쿼리만 출력하세요.
-"""
+{cypher_examples}
+""".replace("{gspatial_summary}", gspatial_summary).replace("{cypher_examples}", cypher_examples)
 )
 
 # 4) 응답 생성 프롬프트
@@ -162,5 +191,6 @@ __all__ = [
     'classification_prompt',
     'entity_extraction_prompt',
     'cypher_generation_prompt',
+    'planner_prompt',
     'response_generation_prompt'
 ]
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+
+def to_jsonable(value: Any) -> Any:
+    """JSON fallback for neo4j values (Node / Relationship are not serializable)."""
+    if hasattr(value, "labels") and hasattr(value, "items"):
+        return {"labels": sorted(value.labels), "properties": dict(value.items())}
+    if hasattr(value, "type") and hasattr(value, "items"):
+        return {"type": value.type, "properties": dict(value.items())}
+    return str(value)
+
+
+class ResultRows(list):
+    """
+    Rows of a query result (query_result). A plain list, marked so that
+    session checkpoints store the rows once by reference (`ref`, set by the
+    checkpoint serializer) instead of serializing them into every checkpoint.
+    `expired` marks rows restored from a checkpoint after the result store
+    dropped them: the list is empty because the rows are gone, not because
+    the query returned none.
+    """
+    ref: Optional[str] = None
+    expired: bool = False
+
+
+# spill_dir -> time of its last sweep
+_swept_at: Dict[str, float] = {}
+_sweep_lock = threading.Lock()
+
+
+def sweep_spill_dir(spill_dir: str, ttl: Optional[float] = None, interval: float = 60.0) -> int:
+    """
+    Delete spill files older than `ttl` seconds (RESULT_SPILL_TTL, default a
+    day; 0 keeps them). Runs at most once per `interval` seconds per
+    directory; returns the number of files removed.
+    """
+    if ttl is None:
+        ttl = float(os.getenv("RESULT_SPILL_TTL", "86400"))
+    now = time.time()
+    with _sweep_lock:
+        if ttl <= 0 or now - _swept_at.get(spill_dir, 0.0) < interval:
+            return 0
+        _swept_at[spill_dir] = now
+    removed = 0
+    try:
+        entries = list(os.scandir(spill_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not (entry.name.startswith("result_") and entry.name.endswith(".jsonl")):
+            continue
+        try:
+            if now - entry.stat().st_mtime > ttl:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            # Removed by another process, or still being written elsewhere
+            continue
+    return removed
+
+
+def result_settings() -> Tuple[int, int, Optional[str]]:
+    """Return (fetch_size, row_cap, spill_dir) from the environment."""
+    fetch_size = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+    row_cap = int(os.getenv("RESULT_ROW_CAP", "100"))
+    spill_dir = os.getenv("RESULT_SPILL_DIR") or None
+    return fetch_size, row_cap, spill_dir
+
+
+class RowCollector:
+    """
+    Consumes records one at a time, keeping only the first `row_cap` rows in
+    memory while counting the rest. With `spill_dir`, every row is also
+    written to a JSONL file so the full result can be iterated later, so
+    peak memory does not grow with the result size. Spill files are kept
+    for RESULT_SPILL_TTL seconds (see sweep_spill_dir) unless the caller
+    removes them sooner with remove_query_result.
+    """
+
+    def __init__(self, row_cap: int, spill_dir: Optional[str] = None):
+        self.row_cap = row_cap
+        self.rows: List[Dict[str, Any]] = []
+        self.total = 0
+        self.spill_path: Optional[str] = None
+        self._spill = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            sweep_spill_dir(spill_dir)
+            fd, self.spill_path = tempfile.mkstemp(prefix="result_", suffix=".jsonl", dir=spill_dir)
+            self._spill = os.fdopen(fd, "w", encoding="utf-8")
+
+    def add(self, record) -> None:
+        row = dict(record)
+        self.total += 1
+        if self.total <= self.row_cap:
+            self.rows.append(row)
+        if self._spill is not None:
+            self._spill.write(json.dumps(row, ensure_ascii=False, default=to_jsonable) + "\n")
+
+    def finish(self) -> Dict[str, Any]:
+        """Close the spill file and return the state update for the result."""
+        if self._spill is not None:
+            self._spill.close()
+            if self.total <= self.row_cap:
+                # Everything fits in memory, no need to keep the file
+                os.remove(self.spill_path)
+                self.spill_path = None
+        return {
+            "query_result": ResultRows(self.rows),
+            "row_count": self.total,
+            "result_truncated": self.total > len(self.rows),
+            "result_path": self.spill_path
+        }
+
+    def abort(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            os.remove(self.spill_path)
+            self.spill_path = None
+
+
+def iter_query_result(state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Iterate over every result row: from the spill file when present, else from query_result."""
+    if state.get("result_path") and os.path.exists(state["result_path"]):
+        with open(state["result_path"], "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+    else:
+        yield from state.get("query_result") or []
+
+
+def remove_query_result(state: Dict[str, Any]) -> bool:
+    """Delete the spill file of a result once the caller is done with it; False if there was none."""
+    path = state.get("result_path")
+    if not path:
+        return False
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Callable
+
+from .db import get_session, _env_float
+from .introspection import introspect_schema_fast
+
+
+def empty_schema() -> Dict[str, Any]:
+    """Return an empty schema dictionary."""
+    return {
+        "labels": [],
+        "relationshipTypes": [],
+        "propertyKeys": [],
+        "nodeProperties": {},
+        "relProperties": {}
+    }
+
+
+def introspect_schema(session) -> Dict[str, Any]:
+    """
+    Retrieve schema information from Neo4j including labels, relationship types, and properties.
+    This is the original full-scan implementation, kept as the reference for
+    benchmarks; the cache uses introspect_schema_fast. Raises on database errors.
+    """
+    schema = empty_schema()
+
+    # Get basic schema info
+    schema["labels"] = [record["label"] for record in session.run("CALL db.labels()")]
+    schema["relationshipTypes"] = [record["relationshipType"] for record in session.run("CALL db.relationshipTypes()")]
+    schema["propertyKeys"] = [record["propertyKey"] for record in session.run("CALL db.propertyKeys()")]
+
+    # Get node properties
+    for label in schema["labels"]:
+        query = f"""
+        MATCH (n:`{label}`)
+        WITH DISTINCT keys(n) as keys
+        UNWIND keys as key
+        RETURN collect(distinct key) as properties
+        """
+        result = session.run(query)
+        schema["nodeProperties"][label] = result.single()["properties"] if result.peek() else []
+
+    # Get relationship properties
+    for rel_type in schema["relationshipTypes"]:
+        query = f"""
+        MATCH ()-[r:`{rel_type}`]->()
+        WITH DISTINCT keys(r) as keys
+        UNWIND keys as key
+        RETURN collect(distinct key) as properties
+        """
+        result = session.run(query)
+        schema["relProperties"][rel_type] = result.single()["properties"] if result.peek() else []
+
+    return schema
+
+
+def get_neo4j_schema() -> Dict[str, Any]:
+    """
+    Retrieve schema information from Neo4j including labels, relationship types, and properties.
+    Returns a dictionary with schema information (empty if the database is unreachable).
+    """
+    try:
+        with get_session() as session:
+            return introspect_schema_fast(session)
+    except Exception as e:
+        print(f"Warning: Could not retrieve schema information: {str(e)}")
+        return empty_schema()
+
+
+def database_fingerprint(session) -> str:
+    """
+    Cheap fingerprint of the database schema, built from the label,
+    relationship type and property key catalogs (no data scans).
+    """
+    labels = sorted(record["label"] for record in session.run("CALL db.labels()"))
+    rel_types = sorted(record["relationshipType"] for record in session.run("CALL db.relationshipTypes()"))
+    keys = sorted(record["propertyKey"] for record in session.run("CALL db.propertyKeys()"))
+    payload = json.dumps([labels, rel_types, keys], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def schema_version(schema: Dict[str, Any]) -> str:
+    """Stable hash of a schema dictionary, used to key derived caches."""
+    payload = json.dumps(schema, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _default_cache_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".cache", "gspatial-agent", "neo4j_schema.json")
+
+
+class SchemaCache:
+    """
+    Lazily built Neo4j schema cache.
+
+    The schema is loaded on first use, from disk when a persisted copy exists
+    for the same database, otherwise by introspection. Entries older than the
+    TTL are served while a background thread re-checks the database
+    fingerprint and re-introspects only when it has changed. Failed
+    introspection is never persisted, and is retried after `retry_interval`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        retry_interval: float = 30.0,
+        introspect: Callable = introspect_schema_fast,
+        fingerprint: Callable = database_fingerprint
+    ):
+        self.path = path if path is not None else os.getenv("NEO4J_SCHEMA_CACHE_PATH", _default_cache_path())
+        self.ttl = ttl if ttl is not None else _env_float("NEO4J_SCHEMA_TTL", 3600.0)
+        self.retry_interval = retry_interval
+        self._introspect = introspect
+        self._fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._schema: Optional[Dict[str, Any]] = None
+        self._fingerprint_value: Optional[str] = None
+        self._loaded_at = 0.0
+        self._failed_at = 0.0
+        self._source: Optional[str] = None
+
+    def _database_key(self) -> str:
+        return f"{os.getenv('NEO4J_URI', '')}/{os.getenv('NEO4J_DATABASE', '')}"
+
+    def _read_disk(self) -> Optional[Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("database") != self._database_key() or "schema" not in data:
+            return None
+        return data
+
+    def _write_disk(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "database": self._database_key(),
+            "fingerprint": self._fingerprint_value,
+            "created_at": self._loaded_at,
+            "schema": self._schema
+        }
+        tmp_path = None
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # A temp file of its own, so concurrent processes never write the same one
+            fd, tmp_path = tempfile.mkstemp(prefix=".schema_", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not persist schema cache: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load(self, force: bool = False) -> None:
+        """Introspect the database, reusing the current schema if the fingerprint is unchanged."""
+        try:
+            with get_session() as session:
+                fingerprint = self._fingerprint(session)
+                if force or self._schema is None or fingerprint != self._fingerprint_value:
+                    schema = self._introspect(session)
+                    source = "database"
+                else:
+                    schema = self._schema
+                    source = self._source
+        except Exception as e:
+            print(f"Warning: Could not retrieve schema information: {str(e)}")
+            self._failed_at = time.time()
+            return
+
+        self._schema = schema
+        self._fingerprint_value = fingerprint
+        self._loaded_at = time.time()
+        self._failed_at = 0.0
+        self._source = source
+        self._write_disk()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                with self._lock:
+                    self._load()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name="schema-cache-refresh", daemon=True).start()
+
+    def get(self) -> Dict[str, Any]:
+        """Return the cached schema, building it on first use."""
+        if self._schema is None:
+            with self._lock:
+                if self._schema is None:
+                    data = self._read_disk()
+                    if data is not None:
+                        self._schema = data["schema"]
+                        self._fingerprint_value = data.get("fingerprint")
+                        self._loaded_at = data.get("created_at", 0.0)
+                        self._source = "disk"
+                    elif time.time() - self._failed_at >= self.retry_interval:
+                        self._load()
+            if self._schema is None:
+                # Database unreachable: do not cache the empty result
+                return empty_schema()
+
+        now = time.time()
+        # After a failed refresh, serve the stale schema until retry_interval has passed
+        if self.ttl >= 0 and now - self._loaded_at > self.ttl and now - self._failed_at >= self.retry_interval:
+            self._refresh_in_background()
+        return self._schema
+
+    def refresh(self, force: bool = True) -> Dict[str, Any]:
+        """Synchronously re-introspect the database and return the new schema."""
+        with self._lock:
+            self._load(force=force)
+        return self._schema if self._schema is not None else empty_schema()
+
+    def invalidate(self, remove_file: bool = True) -> None:
+        """Drop the in-memory schema (and the persisted copy) so the next use rebuilds it."""
+        with self._lock:
+            self._schema = None
+            self._fingerprint_value = None
+            self._loaded_at = 0.0
+            self._failed_at = 0.0
+            self._source = None
+            if remove_file and self.path and os.path.exists(self.path):
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self._fingerprint_value
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache state for health checks and debugging."""
+        return {
+            "loaded": self._schema is not None,
+            "source": self._source,
+            "fingerprint": self._fingerprint_value,
+            "age_seconds": time.time() - self._loaded_at if self._schema is not None else None,
+            "ttl_seconds": self.ttl,
+            "refreshing": self._refreshing,
+            "path": self.path
+        }
+
+
+_schema_cache: Optional[SchemaCache] = None
+_schema_cache_lock = threading.Lock()
+
+
+def get_schema_cache() -> SchemaCache:
+    """Return the process-wide schema cache."""
+    global _schema_cache
+    if _schema_cache is None:
+        with _schema_cache_lock:
+            if _schema_cache is None:
+                _schema_cache = SchemaCache()
+    return _schema_cache
+
+
+def get_schema() -> Dict[str, Any]:
+    """Return the cached Neo4j schema, building it on first use."""
+    return get_schema_cache().get()
+
+
+def invalidate_schema(remove_file: bool = True) -> None:
+    """Invalidate the cached Neo4j schema."""
+    get_schema_cache().invalidate(remove_file=remove_file)
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Property names that gspatial operations and place matching depend on
+GEOMETRY_PROPERTY = re.compile(r"geom|wkt|shape|polygon|coord", re.IGNORECASE)
+NAME_PROPERTY = re.compile(r"name|nm$|^nm|title|label|이름|명$|명칭", re.IGNORECASE)
+MAX_PROPERTIES_PER_LABEL = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count without a tokenizer: about 4 UTF-8 bytes per token,
+    which holds for both ASCII identifiers and Hangul (3 bytes, ~1 token per 1-2 chars).
+    """
+    return max(1, len(text.encode("utf-8")) // 4) if text else 0
+
+
+def _collect_terms(value: Any, terms: List[str]) -> None:
+    if isinstance(value, str):
+        terms.extend(t for t in re.split(r"[\s,.;:()\[\]{}'\"]+", value.lower()) if len(t) >= 2)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_terms(item, terms)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_terms(item, terms)
+
+
+class _TermMatcher:
+    """Matches names that contain, or are contained in, any question/entity term."""
+
+    def __init__(self, terms: List[str]):
+        self.joined = "\x00".join(terms)
+        self.pattern = re.compile("|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True))) if terms else None
+
+    def __bool__(self) -> bool:
+        return self.pattern is not None
+
+    def __call__(self, name: str) -> bool:
+        if self.pattern is None:
+            return False
+        name = name.lower()
+        return name in self.joined or self.pattern.search(name) is not None
+
+
+class SchemaRenderer:
+    """
+    Renders the Neo4j schema for the Cypher generation prompt.
+
+    The compact, indentation-free lines for every label and relationship type
+    are built once per schema object. Each call then keeps only the labels
+    relevant to the extracted entities and question, ordered by relevance and
+    cut off at `token_budget`.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv("SCHEMA_TOKEN_BUDGET", "800"))
+        self._lock = threading.Lock()
+        self._schema = None
+        self._rendered: Dict[str, Any] = {}
+        self.last_stats: Dict[str, Any] = {}
+
+    def _prepare(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        # The schema cache hands out the same dict until it refreshes
+        if self._schema is schema:
+            return self._rendered
+        with self._lock:
+            if self._schema is not schema:
+                full = json.dumps(schema, ensure_ascii=False, indent=2)
+                labels = {}
+                for label in schema.get("labels", []):
+                    props = list(schema.get("nodeProperties", {}).get(label, []))
+                    labels[label] = {
+                        "properties": props,
+                        # Lower-cased blob lets one regex scan score every property
+                        "blob": "\x00".join(p.lower() for p in props),
+                        "pinned": [p for p in props if GEOMETRY_PROPERTY.search(p) or NAME_PROPERTY.search(p)],
+                        "has_geometry": any(GEOMETRY_PROPERTY.search(p) for p in props)
+                    }
+                self._rendered = {
+                    "labels": labels,
+                    "relationships": {
+                        rel_type: list(schema.get("relProperties", {}).get(rel_type, []))
+                        for rel_type in schema.get("relationshipTypes", [])
+                    },
+                    "full_tokens": estimate_tokens(full)
+                }
+                self._schema = schema
+        return self._rendered
+
+    @staticmethod
+    def _select_properties(entry: Dict[str, Any], matches: _TermMatcher) -> List[str]:
+        properties = entry["properties"]
+        if len(properties) <= MAX_PROPERTIES_PER_LABEL:
+            return properties
+        keep = list(entry["pinned"])
+        if matches.pattern is not None and matches.pattern.search(entry["blob"]):
+            keep += [p for p in properties if p not in keep and matches.pattern.search(p.lower())]
+        keep = keep[:MAX_PROPERTIES_PER_LABEL]
+        return keep + ["…"] if len(keep) < len(properties) else keep
+
+    @staticmethod
+    def _relevance(label: str, entry: Dict[str, Any], matches: _TermMatcher, resolved_labels: set) -> int:
+        score = 0
+        # The gazetteer grounded a place of the question to this label
+        if label in resolved_labels:
+            score += 100
+        if matches(label):
+            score += 10
+        if matches.pattern is not None:
+            score += 3 * len(matches.pattern.findall(entry["blob"]))
+        return score
+
+    def render(
+        self,
+        schema: Dict[str, Any],
+        entities: Any = None,
+        question: str = "",
+        query_type: Optional[str] = None,
+        token_budget: Optional[int] = None,
+        resolved: Any = None
+    ) -> str:
+        """
+        Return the compact schema text for the prompt. Labels the gazetteer
+        resolved places to (`resolved`, resolved_entities) come first; once
+        any label is relevant to the question, the unrelated ones are left out.
+        """
+        prepared = self._prepare(schema)
+        budget = token_budget or self.token_budget
+        terms: List[str] = []
+        _collect_terms(entities, terms)
+        _collect_terms(question, terms)
+        matches = _TermMatcher(terms)
+        resolved_labels = {item["label"] for item in resolved or [] if isinstance(item, dict) and item.get("label")}
+
+        ranked: List[Tuple[int, int, int, str]] = []
+        for index, (label, entry) in enumerate(prepared["labels"].items()):
+            relevance = self._relevance(label, entry, matches, resolved_labels)
+            # Spatial operations need geometry-bearing labels
+            bonus = 2 if query_type and entry["has_geometry"] else 0
+            ranked.append((relevance + bonus, relevance, index, label))
+        if any(relevance for _, relevance, _, _ in ranked):
+            ranked = [item for item in ranked if item[1]]
+        ranked.sort(key=lambda item: (-item[0], item[2]))
+
+        lines = ["Labels:"]
+        used = estimate_tokens(lines[0])
+        included = 0
+        for _, _, _, label in ranked:
+            props = self._select_properties(prepared["labels"][label], matches)
+            line = f":{label}({', '.join(props)})"
+            cost = estimate_tokens(line)
+            if used + cost > budget and included:
+                break
+            lines.append(line)
+            used += cost
+            included += 1
+        if included < len(prepared["labels"]):
+            lines.append(f"(+{len(prepared['labels']) - included} more labels)")
+
+        rel_lines = [
+            f":{rel_type}({', '.join(props)})" if props else f":{rel_type}"
+            for rel_type, props in prepared["relationships"].items()
+            if matches(rel_type) or not matches
+        ]
+        rel_cost = sum(estimate_tokens(line) for line in rel_lines)
+        if rel_lines and used + rel_cost <= budget:
+            lines.append("Relationships:")
+            lines.extend(rel_lines)
+
+        text = "\n".join(lines)
+        self.last_stats = {
+            "full_tokens": prepared["full_tokens"],
+            "rendered_tokens": estimate_tokens(text),
+            "labels_total": len(prepared["labels"]),
+            "labels_included": included
+        }
+        return text
+
+
+_renderer: Optional[SchemaRenderer] = None
+
+
+def get_schema_renderer() -> SchemaRenderer:
+    """Return the process-wide schema renderer."""
+    global _renderer
+    if _renderer is None:
+        _renderer = SchemaRenderer()
+    return _renderer
+
+
+def render_schema_for_prompt(schema: Dict[str, Any], state: Dict[str, Any]) -> str:
+    """Render the schema for the Cypher generation prompt of the given state."""
+    return get_schema_renderer().render(
+        schema,
+        entities=state.get("entities"),
+        question=state.get("question", ""),
+        query_type=state.get("query_type"),
+        resolved=state.get("resolved_entities")
+    )
@@ -0,0 +1,555 @@
+"""
+ASGI service around the compiled workflow.
+
+    POST /v1/ask          {"question": ..., "timeout": seconds,  -> final answer (JSON)
+                           "thread_id": optional session}
+    POST /v1/ask/stream   same body                              -> node updates (server-sent events)
+    POST /v1/batch        {"questions": [...], "timeout": ...}   -> one answer per question
+    GET  /healthz         process is up
+    GET  /readyz          workflow built and Neo4j reachable (pool and schema cache state)
+    GET  /metrics         Prometheus text of the metrics registry
+
+Every question runs on the shared workflow (flow.get_workflow) through one
+AdmissionController: at most SERVICE_MAX_CONCURRENCY questions run at once,
+at most SERVICE_MAX_QUEUE wait, and the rest are shed with 503. Each request
+has a deadline (queue wait included) after which it fails with 504.
+Questions with a thread_id are turns of that session (flow.get_session_workflow,
+SESSION_STORE); turns of one session run one at a time, in arrival order.
+
+    uvicorn agent.service:app --host 0.0.0.0 --port 8000
+    python -m agent.service --port 8000
+"""
+import os
+import json
+import time
+import asyncio
+import weakref
+import argparse
+import contextlib
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from .results import to_jsonable
+from .metrics import get_metrics_registry
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Overloaded(Exception):
+    """Every worker is busy and the queue is full; the request is shed."""
+
+
+class AdmissionController:
+    """
+    Bounded in-flight concurrency with a bounded FIFO queue in front of it.
+    acquire() runs at once while fewer than `max_in_flight` questions run,
+    waits in the queue while it has room, and raises Overloaded otherwise.
+    A released slot is handed directly to the oldest waiter.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_in_flight = max_in_flight or _env_int("SERVICE_MAX_CONCURRENCY", 16)
+        self.max_queue = max_queue if max_queue is not None else _env_int("SERVICE_MAX_QUEUE", 64)
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.shed = 0
+        self.queue_timeouts = 0
+
+    async def acquire(self, timeout: float) -> None:
+        """Take a slot within `timeout` seconds; raises Overloaded or asyncio.TimeoutError."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(f"{self.in_flight} questions running and {len(self._waiters)} queued")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.queue_timeouts += 1
+            raise
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the wait ended; pass it on
+            self.release()
+            return
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter, in_flight is unchanged
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "queue_timeouts": self.queue_timeouts
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+def answer(state: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    """The part of the final state returned to clients (same fields as batch records)."""
+    rows = state.get("query_result")
+    return {
+        "question": state.get("question"),
+        "query_type": state.get("query_type"),
+        "query_type_source": state.get("query_type_source"),
+        "entities": state.get("entities"),
+        "place_suggestions": state.get("place_suggestions"),
+        "cypher_query": state.get("cypher_query"),
+        "cypher_params": state.get("cypher_params"),
+        "row_count": state.get("row_count", len(rows) if isinstance(rows, list) else None),
+        "rows": rows,
+        "result_truncated": state.get("result_truncated"),
+        "response": state.get("response"),
+        "response_source": state.get("response_source"),
+        "error": state.get("error"),
+        "elapsed_ms": round(elapsed * 1000, 3)
+    }
+
+
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=to_jsonable).encode("utf-8")
+
+
+async def _send_json(send, status: int, payload: Any, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = _dumps(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode())
+        ] + (headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_json(receive) -> Dict[str, Any]:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "client disconnected")
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    try:
+        payload = json.loads(b"".join(chunks) or b"{}")
+    except ValueError:
+        raise HTTPError(400, "request body is not JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return payload
+
+
+def _question(payload: Dict[str, Any]) -> str:
+    question = payload.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise HTTPError(400, "'question' must be a non-empty string")
+    return question
+
+
+def _thread_id(payload: Dict[str, Any]) -> Optional[str]:
+    thread_id = payload.get("thread_id")
+    if thread_id is not None and (not isinstance(thread_id, str) or not thread_id.strip()):
+        raise HTTPError(400, "'thread_id' must be a non-empty string")
+    return thread_id
+
+
+class AgentService:
+    """
+    ASGI application. Nothing is built at construction; the workflow, the
+    chat model and the schema are warmed at lifespan startup (or on the first
+    request when the server does not send lifespan events).
+    """
+
+    def __init__(
+        self,
+        workflow=None,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self._workflow = workflow
+        self._session_workflow = None
+        # One lock per active session, dropped once no turn holds or waits for it
+        self._turn_locks = weakref.WeakValueDictionary()
+        self.admission = AdmissionController(max_in_flight, max_queue)
+        self.default_timeout = timeout or _env_float("SERVICE_TIMEOUT", 60.0)
+        self.max_timeout = _env_float("SERVICE_MAX_TIMEOUT", 300.0)
+        self.max_batch = _env_int("SERVICE_MAX_BATCH", 100)
+        self.batch_concurrency = _env_int("SERVICE_BATCH_CONCURRENCY", 4)
+        self.started_at = time.time()
+        self.deadline_exceeded = 0
+        self._warmup: Optional[asyncio.Task] = None
+
+    @property
+    def workflow(self):
+        if self._workflow is None:
+            from .flow import get_workflow
+            self._workflow = get_workflow()
+        return self._workflow
+
+    @property
+    def session_workflow(self):
+        if self._session_workflow is None:
+            from .flow import get_session_workflow
+            self._session_workflow = get_session_workflow()
+        return self._session_workflow
+
+    async def _target(self, question: str, thread_id: Optional[str]):
+        """Workflow, input and config of a question: a turn of session `thread_id` if given."""
+        from .flow import _initial_state, session_config
+        if thread_id is None:
+            return self.workflow, _initial_state(question), None
+        workflow = await asyncio.to_thread(lambda: self.session_workflow)
+        return workflow, _initial_state(question), session_config(thread_id)
+
+    @contextlib.asynccontextmanager
+    async def _turn(self, thread_id: Optional[str], deadline: float):
+        """Hold session `thread_id` so its turns see each other's context."""
+        if thread_id is None:
+            yield
+            return
+        lock = self._turn_locks.get(thread_id)
+        if lock is None:
+            lock = self._turn_locks[thread_id] = asyncio.Lock()
+        try:
+            await asyncio.wait_for(lock.acquire(), deadline - asyncio.get_running_loop().time())
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            raise HTTPError(504, "deadline exceeded while waiting for the previous turn of the session")
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def startup(self) -> None:
+        from . import nodes
+        await asyncio.to_thread(lambda: self.workflow)
+        await asyncio.to_thread(nodes.get_llm)
+
+        async def warm_schema():
+            try:
+                await asyncio.to_thread(nodes.get_schema)
+            except Exception as e:
+                print(f"Warning: schema warm-up failed: {e}")
+
+        # Readiness does not wait for the schema; the first question would load it anyway
+        self._warmup = asyncio.create_task(warm_schema())
+
+    async def shutdown(self) -> None:
+        from .db import aclose_driver, close_driver
+        await aclose_driver()
+        await asyncio.to_thread(close_driver)
+
+    def _timeout(self, payload: Dict[str, Any]) -> float:
+        timeout = payload.get("timeout", self.default_timeout)
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise HTTPError(400, "'timeout' must be a positive number of seconds")
+        return min(float(timeout), self.max_timeout)
+
+    async def _admit(self, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await self.admission.acquire(deadline - loop.time())
+        except Overloaded as e:
+            raise HTTPError(503, f"overloaded: {e}", [(b"retry-after", b"1")])
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            raise HTTPError(504, "deadline exceeded while queued")
+
+    async def run_question(self, question: str, deadline: float, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        """Admit and run one question (a turn of session `thread_id` if given) before `deadline` (loop time)."""
+        loop = asyncio.get_running_loop()
+        workflow, state, config = await self._target(question, thread_id)
+        async with self._turn(thread_id, deadline):
+            await self._admit(deadline)
+            start = time.perf_counter()
+            try:
+                state = await asyncio.wait_for(workflow.ainvoke(state, config), deadline - loop.time())
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                raise HTTPError(504, "deadline exceeded")
+            finally:
+                self.admission.release()
+        result = answer(state, time.perf_counter() - start)
+        return {**result, "thread_id": thread_id} if thread_id is not None else result
+
+    async def ask(self, receive, send) -> int:
+        payload = await _read_json(receive)
+        question, timeout, thread_id = _question(payload), self._timeout(payload), _thread_id(payload)
+        deadline = asyncio.get_running_loop().time() + timeout
+        await _send_json(send, 200, await self.run_question(question, deadline, thread_id))
+        return 200
+
+    async def ask_stream(self, receive, send) -> int:
+        """Server-sent events: one "node" event per finished node, then "result" (or "error")."""
+        payload = await _read_json(receive)
+        question, timeout, thread_id = _question(payload), self._timeout(payload), _thread_id(payload)
+        deadline = asyncio.get_running_loop().time() + timeout
+        workflow, initial, config = await self._target(question, thread_id)
+        async with self._turn(thread_id, deadline):
+            return await self._stream(workflow, initial, config, send, deadline)
+
+    async def _stream(self, workflow, initial: Dict[str, Any], config, send, deadline: float) -> int:
+        loop = asyncio.get_running_loop()
+        # Shedding and queue timeouts are still plain HTTP errors, sent before the stream starts
+        await self._admit(deadline)
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache")]
+            })
+
+            async def event(name: str, data: Any) -> None:
+                body = b"event: " + name.encode() + b"\ndata: " + _dumps(data) + b"\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+
+            start = time.perf_counter()
+            state = {}
+            stream = workflow.astream(initial, config, stream_mode=["updates", "values"]).__aiter__()
+            try:
+                while True:
+                    try:
+                        mode, chunk = await asyncio.wait_for(stream.__anext__(), deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    if mode == "values":
+                        state = chunk
+                        continue
+                    for node, update in chunk.items():
+                        await event("node", {
+                            "node": node,
+                            "update": update,
+                            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+                        })
+                result = answer(state, time.perf_counter() - start)
+                if config is not None:
+                    result["thread_id"] = config["configurable"]["thread_id"]
+                await event("result", result)
+                status = 200
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                await event("error", {"error": "deadline exceeded"})
+                status = 504
+            except Exception as e:
+                # The status line is already sent, report the failure in the stream
+                print(f"Warning: streamed question failed: {e}")
+                await event("error", {"error": str(e)})
+                status = 500
+            finally:
+                await stream.aclose()
+            await send({"type": "http.response.body", "body": b""})
+            return status
+        finally:
+            self.admission.release()
+
+    async def batch(self, receive, send) -> int:
+        """
+        Run a list of questions ("..." or {"id": ..., "question": ...}) under one
+        deadline. A batch holds at most SERVICE_BATCH_CONCURRENCY admission slots
+        at a time, so it cannot take over the queue; questions that are shed or
+        run out of time are reported per item.
+        """
+        payload = await _read_json(receive)
+        items = payload.get("questions")
+        if not isinstance(items, list) or not items:
+            raise HTTPError(400, "'questions' must be a non-empty list")
+        if len(items) > self.max_batch:
+            raise HTTPError(413, f"at most {self.max_batch} questions per batch")
+        questions = []
+        for i, item in enumerate(items):
+            if isinstance(item, dict):
+                questions.append((str(item.get("id", i)), _question(item)))
+            else:
+                questions.append((str(i), _question({"question": item})))
+        deadline = asyncio.get_running_loop().time() + self._timeout(payload)
+        limit = asyncio.Semaphore(self.batch_concurrency)
+
+        async def one(item_id: str, question: str) -> Dict[str, Any]:
+            async with limit:
+                try:
+                    return {"id": item_id, "status": "ok", **await self.run_question(question, deadline)}
+                except HTTPError as e:
+                    status = {503: "overloaded", 504: "timeout"}.get(e.status, "failed")
+                    return {"id": item_id, "status": status, "question": question, "error": e.message}
+                except Exception as e:
+                    return {"id": item_id, "status": "failed", "question": question, "error": str(e)}
+
+        results = await asyncio.gather(*(one(item_id, question) for item_id, question in questions))
+        summary = {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "overloaded", "timeout", "failed")}
+        await _send_json(send, 200, {"results": results, "summary": summary})
+        return 200
+
+    async def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        from .db import get_async_driver_manager, get_pool_stats
+        from .schema import get_schema_cache
+        manager = get_async_driver_manager()
+        try:
+            neo4j_ok = await asyncio.wait_for(manager.is_alive(), _env_float("SERVICE_READY_TIMEOUT", 2.0))
+        except asyncio.TimeoutError:
+            neo4j_ok = False
+        try:
+            # Built here when the server sent no lifespan startup
+            await asyncio.to_thread(lambda: self.workflow)
+            workflow_ok = True
+        except Exception as e:
+            print(f"Warning: workflow is not available: {e}")
+            workflow_ok = False
+        report = {
+            "status": "ready" if neo4j_ok and workflow_ok else "not ready",
+            "checks": {"workflow": workflow_ok, "neo4j": neo4j_ok},
+            "pool": {"sync": get_pool_stats(), "async": manager.pool_stats()},
+            "schema_cache": get_schema_cache().stats(),
+            "admission": self.admission.stats(),
+            "deadline_exceeded": self.deadline_exceeded,
+            "uptime_seconds": round(time.time() - self.started_at, 3)
+        }
+        return neo4j_ok and workflow_ok, report
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        routes = {
+            ("POST", "/v1/ask"): self.ask,
+            ("POST", "/v1/ask/stream"): self.ask_stream,
+            ("POST", "/v1/batch"): self.batch
+        }
+        known = {path for _, path in routes} | {"/healthz", "/readyz", "/metrics"}
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        endpoint = path if path in known else "other"
+        start = time.perf_counter()
+        status = 500
+        try:
+            if (method, path) in routes:
+                status = await routes[(method, path)](receive, send)
+            elif method == "GET" and path == "/healthz":
+                status = 200
+                await _send_json(send, status, {"status": "ok"})
+            elif method == "GET" and path == "/readyz":
+                ready, report = await self.readiness()
+                status = 200 if ready else 503
+                await _send_json(send, status, report)
+            elif method == "GET" and path == "/metrics":
+                body = get_metrics_registry().to_prometheus().encode("utf-8")
+                status = 200
+                await send({
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4"), (b"content-length", str(len(body)).encode())]
+                })
+                await send({"type": "http.response.body", "body": body})
+            else:
+                raise HTTPError(405, "method not allowed") if path in known else HTTPError(404, "not found")
+        except HTTPError as e:
+            status = e.status
+            await _send_json(send, status, {"error": e.message}, e.headers)
+        except Exception as e:
+            status = 500
+            print(f"Warning: {method} {path} failed: {e}")
+            await _send_json(send, status, {"error": str(e)})
+        finally:
+            registry = get_metrics_registry()
+            registry.inc("agent_service_requests_total", endpoint=endpoint, status=status)
+            registry.observe("agent_service_request_duration_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+
+_app: Optional[AgentService] = None
+
+
+def get_app() -> AgentService:
+    """Return the process-wide service (settings are read from the environment on first use)."""
+    global _app
+    if _app is None:
+        _app = AgentService()
+    return _app
+
+
+def __getattr__(name):
+    # `uvicorn agent.service:app` resolves the app lazily, after the environment is set up
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gSpatial agent HTTP service")
+    parser.add_argument("--host", default=os.getenv("SERVICE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("SERVICE_PORT", 8000))
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to serve the ASGI app (pip install uvicorn)")
+    from dotenv import load_dotenv
+    load_dotenv()
+    uvicorn.run(get_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import re
+from typing import Dict, Any, List, Optional
+
+from .compiler import extract_places
+from .gazetteer import get_gazetteer, gazetteer_enabled, is_grounded
+from .results import ResultRows
+from .schema_render import NAME_PROPERTY
+
+
+# Anaphora that refer back to the previous turn: a demonstrative before a
+# noun ("그 면적은?", "이 동네"), a demonstrative pronoun ("거기서", "그중")
+# or an English pronoun. Words that also have other meanings (해당, 위의,
+# 이전, that, there) are left out.
+FOLLOWUP_PATTERN = re.compile(
+    r"(?<![가-힣])(?:그|이|저)\s+[가-힣]"
+    r"|(?<![가-힣])(?:그곳|그것|그거|그중|그들|이곳|이것|저곳|저것|거기|여기)"
+    r"|\b(?:it|its|them|those)\b",
+    re.IGNORECASE
+)
+
+# Words of three or more characters ending in an administrative suffix,
+# before a particle or the end ("서초구의", "반포3동"), so "다시", "연구" or
+# "활동" do not count
+PLACE_PATTERN = re.compile(
+    r"(?<![가-힣0-9])(?:[가-힣][가-힣0-9]+(?:동|구|시|군|읍)|[중동서남북]구)"
+    r"(?=$|[^가-힣]|[은는이가을를의에와과도로])"
+)
+
+# Particles stripped from a word before it is looked up in the gazetteer
+PARTICLE = re.compile(r"(?:에서|으로|까지|부터|은|는|이|가|을|를|의|에|와|과|도|로)$")
+
+
+def session_settings() -> Dict[str, Any]:
+    return {
+        # Node references carried to the next turn
+        "max_node_refs": int(os.getenv("SESSION_MAX_NODE_REFS", "100")),
+        # Serve an identical read query of a follow-up from the previous turn's rows
+        "reuse_results": os.getenv("SESSION_REUSE_RESULTS", "true").lower() not in ("0", "false", "no")
+    }
+
+
+def names_place(question: str) -> bool:
+    """
+    Whether the question names a place of its own: a word with an
+    administrative suffix, or a word the (already loaded) gazetteer grounds.
+    """
+    if PLACE_PATTERN.search(question):
+        return True
+    if not gazetteer_enabled():
+        return False
+    gazetteer = get_gazetteer()
+    if not gazetteer.loaded:
+        return False
+    words = {form for word in re.findall(r"[\w-]+", question) for form in (word, PARTICLE.sub("", word))}
+    return any(len(word) >= 2 and is_grounded(next(iter(gazetteer.lookup(word, limit=1)), None)) for word in words)
+
+
+def is_followup(question: str, context: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether the question refers back to the previous turn of its session:
+    it has an anaphor and names no place, so the previous turn's places
+    are the only ones it can mean.
+    """
+    question = question or ""
+    return bool(context) and FOLLOWUP_PATTERN.search(question) is not None and not names_place(question)
+
+
+def _node_ref(value: Any) -> Optional[Dict[str, Any]]:
+    # neo4j Node, or its to_jsonable form after a checkpoint round trip
+    if hasattr(value, "labels") and hasattr(value, "items"):
+        labels, properties = sorted(value.labels), dict(value.items())
+    elif isinstance(value, dict) and isinstance(value.get("labels"), list) and isinstance(value.get("properties"), dict):
+        labels, properties = value["labels"], value["properties"]
+    else:
+        return None
+    keys = [key for key in properties if NAME_PROPERTY.search(key) and isinstance(properties[key], str)]
+    if not labels or not keys:
+        return None
+    key = "name" if "name" in keys else keys[0]
+    return {"text": properties[key], "label": labels[0], "key": key, "value": properties[key], "method": "session"}
+
+
+def node_refs(state: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """
+    Nodes a follow-up can refer to, as gazetteer-style matches (text, label,
+    key, value): the nodes returned by the query if any, otherwise the
+    places of the question.
+    """
+    refs = {}
+    for row in state.get("query_result") or []:
+        for value in (row.values() if isinstance(row, dict) else ()):
+            ref = _node_ref(value)
+            if ref is not None:
+                refs.setdefault((ref["label"], ref["key"], ref["value"]), ref)
+        if len(refs) >= limit:
+            break
+    if refs:
+        return list(refs.values())[:limit]
+
+    resolved = {item["text"]: item for item in state.get("resolved_entities") or []}
+    return [
+        {**resolved[place], "method": "session"} if place in resolved else {"text": place}
+        for place in extract_places(state.get("entities"))
+    ][:limit]
+
+
+def turn_context(state: Dict[str, Any]) -> Dict[str, Any]:
+    """What the next turn of the session keeps from this one."""
+    rows = state.get("query_result")
+    return {
+        "question": state.get("question"),
+        "query_type": state.get("query_type"),
+        "entities": state.get("entities"),
+        "node_refs": node_refs(state, session_settings()["max_node_refs"]),
+        "cypher_query": state.get("cypher_query"),
+        "cypher_params": state.get("cypher_params"),
+        # The same ResultRows object as query_result, so checkpoints store the rows once
+        "query_result": rows if state.get("error") is None else None,
+        "row_count": state.get("row_count"),
+        "result_truncated": state.get("result_truncated"),
+        "result_path": state.get("result_path"),
+        "response": state.get("response")
+    }
+
+
+def followup_entities(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entities of a follow-up: the previous turn's node references, already
+    grounded, so neither the extraction LLM nor the gazetteer is needed.
+    """
+    refs = context.get("node_refs") or []
+    return {
+        "entities": [{"type": "place", "value": ref["text"]} for ref in refs],
+        "resolved_entities": [ref for ref in refs if ref.get("label")]
+    }
+
+
+def previous_result(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The previous turn's result when this turn runs the same query with the same parameters."""
+    context = state.get("session_context")
+    if not context or not session_settings()["reuse_results"]:
+        return None
+    rows = context.get("query_result")
+    # Rows the result store no longer has are fetched again
+    if rows is None or getattr(rows, "expired", False) or context.get("cypher_query") != state.get("cypher_query"):
+        return None
+    if (context.get("cypher_params") or {}) != (state.get("cypher_params") or {}):
+        return None
+    return {
+        "query_result": rows if isinstance(rows, ResultRows) else ResultRows(rows),
+        "row_count": context.get("row_count"),
+        "result_truncated": context.get("result_truncated"),
+        "result_path": context.get("result_path"),
+        "prefilter_stats": None,
+        "result_cache_hit": True
+    }
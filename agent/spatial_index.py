@@ -0,0 +1,395 @@
+import os
+import re
+import math
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable
+
+import numpy as np
+
+from .db import get_session
+from .schema import get_schema
+from .schema_render import GEOMETRY_PROPERTY
+from .geometry import parse_wkt
+from .compiler import OPERATION_CALL, query_operation
+
+
+# Topological operations that are false for pairs with disjoint envelopes
+ENVELOPE_OPERATIONS = {"CONTAINS", "COVERED_BY", "CROSSES", "EQUALS", "INTERSECTS", "OVERLAPS", "TOUCHES", "WITHIN"}
+_LISTS_COLLECTED = re.compile(r"WITH\s+n_list\s*,\s*collect\(\s*m\s*\)\s+AS\s+m_list\s*\n?", re.IGNORECASE)
+_CALL = re.compile(r"CALL\s+gspatial\.operation\(", re.IGNORECASE)
+_TRUE_ONLY = re.compile(r"WHERE\s+result\s*=\s*true", re.IGNORECASE)
+# DISTANCE pairs yielded straight into RETURN, so a distance predicate can be added
+_YIELD_PAIRS = re.compile(r"YIELD\s+n\s*,\s*m\s*,\s*result\b(?=\s*RETURN\b)", re.IGNORECASE)
+
+METRES_PER_DEGREE = 111320.0
+
+
+def wkt_envelope(geometry: Any) -> Optional[Tuple[float, float, float, float]]:
+    """(minx, miny, maxx, maxy) of a WKT / EWKT string or a neo4j Point, None if unparseable."""
+    if geometry is None:
+        return None
+    if hasattr(geometry, "x") and hasattr(geometry, "y"):
+        return (geometry.x, geometry.y, geometry.x, geometry.y)
+    parsed = parse_wkt(str(geometry))
+    return parsed.bbox() if parsed is not None else None
+
+
+class STRTree:
+    """
+    Packed, read-only R-tree of envelopes built with Sort-Tile-Recursive
+    bulk loading. Every level is a (k, 4) NumPy array of boxes; the children
+    of box i on one level are boxes i*capacity .. (i+1)*capacity-1 of the
+    level below, so queries are a few vectorized comparisons per level.
+    """
+
+    def __init__(self, envelopes: np.ndarray, node_capacity: int = 16):
+        self.envelopes = np.asarray(envelopes, dtype=np.float64).reshape(-1, 4)
+        self.node_capacity = node_capacity
+        self.order = self._str_order(self.envelopes, node_capacity)
+        boxes = self.envelopes[self.order]
+        self.levels = [boxes]
+        while len(boxes) > node_capacity:
+            starts = np.arange(0, len(boxes), node_capacity)
+            boxes = np.column_stack([
+                np.minimum.reduceat(boxes[:, 0], starts),
+                np.minimum.reduceat(boxes[:, 1], starts),
+                np.maximum.reduceat(boxes[:, 2], starts),
+                np.maximum.reduceat(boxes[:, 3], starts)
+            ])
+            self.levels.append(boxes)
+
+    @staticmethod
+    def _str_order(envelopes: np.ndarray, capacity: int) -> np.ndarray:
+        count = len(envelopes)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        cx = (envelopes[:, 0] + envelopes[:, 2]) / 2
+        cy = (envelopes[:, 1] + envelopes[:, 3]) / 2
+        slices = math.ceil(math.sqrt(math.ceil(count / capacity)))
+        by_x = np.argsort(cx, kind="stable")
+        slice_of = np.empty(count, dtype=np.int64)
+        slice_of[by_x] = np.arange(count) // (slices * capacity)
+        # Vertical slices by x, sorted by y within each slice
+        return np.lexsort((cy, slice_of))
+
+    def __len__(self) -> int:
+        return len(self.envelopes)
+
+    def query(self, box: Tuple[float, float, float, float]) -> np.ndarray:
+        """Indices (into the envelopes passed at build time) of boxes intersecting `box`."""
+        if not len(self.envelopes):
+            return np.empty(0, dtype=np.int64)
+        minx, miny, maxx, maxy = box
+        capacity = self.node_capacity
+        candidates = np.arange(len(self.levels[-1]))
+        for depth in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[depth][candidates]
+            hit = candidates[
+                (level[:, 0] <= maxx) & (level[:, 2] >= minx) &
+                (level[:, 1] <= maxy) & (level[:, 3] >= miny)
+            ]
+            if depth == 0 or not len(hit):
+                candidates = hit
+                break
+            children = (hit[:, None] * capacity + np.arange(capacity)).ravel()
+            candidates = children[children < len(self.levels[depth - 1])]
+        return self.order[candidates]
+
+
+class EnvelopeIndex:
+    """
+    Envelopes of every node with a geometry property, keyed by elementId and
+    held in an STRTree. Built lazily from Neo4j; after `ttl` seconds labels
+    whose node count changed are reloaded in a background thread and the
+    tree is repacked. The first load runs once for all threads waiting on
+    it; when it fails, queries go unfiltered until `retry_interval` seconds
+    have passed.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        node_capacity: int = 16,
+        retry_interval: float = 30.0,
+        session_factory: Callable = get_session,
+        schema_loader: Callable = get_schema
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("SPATIAL_INDEX_TTL", "600"))
+        self.node_capacity = node_capacity
+        self.retry_interval = retry_interval
+        self.session_factory = session_factory
+        self.schema_loader = schema_loader
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = 0.0
+        self._failed_at = 0.0
+        self._by_label: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._label_counts: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.tree = STRTree(np.empty((0, 4)))
+        self.geographic = True
+
+    def _geometry_keys(self, schema: Dict[str, Any]) -> Dict[str, List[str]]:
+        return {
+            label: [p for p in props if GEOMETRY_PROPERTY.search(p)]
+            for label, props in schema.get("nodeProperties", {}).items()
+            if any(GEOMETRY_PROPERTY.search(p) for p in props)
+        }
+
+    def _load_label(self, session, label: str, keys: List[str]) -> Tuple[List[str], np.ndarray]:
+        ids, boxes = [], []
+        geometry = "coalesce(" + ", ".join(f"n.`{key}`" for key in keys) + ")"
+        query = f"MATCH (n:`{label}`) RETURN elementId(n) AS id, {geometry} AS geometry"
+        for record in session.run(query):
+            box = wkt_envelope(record["geometry"])
+            if box is not None:
+                ids.append(record["id"])
+                boxes.append(box)
+        return ids, np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def _rebuild(self, by_label: Dict[str, Tuple[List[str], np.ndarray]]) -> None:
+        ids = [node_id for label_ids, _ in by_label.values() for node_id in label_ids]
+        boxes = [label_boxes for _, label_boxes in by_label.values()]
+        envelopes = np.concatenate(boxes) if boxes else np.empty((0, 4))
+        tree = STRTree(envelopes, self.node_capacity)
+        geographic = bool(
+            not len(envelopes) or
+            (np.abs(envelopes[:, [0, 2]]).max() <= 180 and np.abs(envelopes[:, [1, 3]]).max() <= 90)
+        )
+        # Swap in one step so concurrent queries see a consistent index
+        self._by_label, self._ids, self._rows = by_label, ids, {node_id: i for i, node_id in enumerate(ids)}
+        self.tree, self.geographic = tree, geographic
+
+    def load_envelopes(self, entries: Dict[str, Tuple[List[str], np.ndarray]]) -> None:
+        """Replace the index with {label: (element ids, (k, 4) envelopes)}."""
+        with self._lock:
+            self._rebuild(entries)
+            self._label_counts = {label: len(ids) for label, (ids, _) in entries.items()}
+            self._loaded_at = time.time()
+
+    def refresh(self, full: bool = False) -> bool:
+        """Reload labels whose node count changed (all labels with `full`); False when it failed."""
+        try:
+            geometry_keys = self._geometry_keys(self.schema_loader())
+            with self.session_factory() as session:
+                counts = {
+                    label: session.run(f"MATCH (n:`{label}`) RETURN count(n) AS total").single()["total"]
+                    for label in geometry_keys
+                }
+                current = {label: entry for label, entry in self._by_label.items() if label in geometry_keys}
+                for label, keys in geometry_keys.items():
+                    if full or label not in current or counts[label] != self._label_counts.get(label):
+                        current[label] = self._load_label(session, label, keys)
+        except Exception as e:
+            print(f"Warning: Could not refresh spatial index: {str(e)}")
+            return False
+        with self._lock:
+            self._rebuild(current)
+            self._label_counts = counts
+            self._loaded_at = time.time()
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name="spatial-index-refresh", daemon=True).start()
+
+    def ensure_loaded(self) -> bool:
+        """Build the index on first use; schedule an incremental refresh when stale."""
+        if not self._loaded_at:
+            if time.time() - self._failed_at < self.retry_interval:
+                return False
+            with self._load_lock:
+                # Threads that waited for the lock find the index built (or just failed)
+                if not self._loaded_at and time.time() - self._failed_at >= self.retry_interval:
+                    if not self.refresh(full=True):
+                        self._failed_at = time.time()
+        elif self.ttl >= 0 and time.time() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+        return bool(self._loaded_at)
+
+    def _search_margin(self, distance: float, box: np.ndarray) -> float:
+        if not self.geographic:
+            return distance
+        # Metres to degrees; a degree of longitude shrinks with latitude, so
+        # use the widest latitude of the box to stay conservative
+        latitude = min(max(abs(box[1]), abs(box[3])), 89.0)
+        return distance / (METRES_PER_DEGREE * math.cos(math.radians(latitude)))
+
+    def candidate_groups(
+        self,
+        n_ids: Iterable[str],
+        m_ids: Iterable[str],
+        distance: Optional[float] = None,
+        group_size: int = 16
+    ) -> Tuple[List[Dict[str, List[str]]], int]:
+        """
+        Split the n x m comparison into groups {"n": [...], "m": [...]} that
+        together cover every pair whose envelopes intersect (or lie within
+        `distance`). The smaller side is probed against the tree in runs of
+        `group_size` spatially adjacent nodes (STR order), each paired with
+        the union of their hits. Ids missing from the index are compared with
+        everything. Returns (groups, pairs compared by the groups).
+        """
+        n_ids, m_ids = list(dict.fromkeys(n_ids)), list(dict.fromkeys(m_ids))
+        rows, ids, tree = self._rows, self._ids, self.tree
+        envelopes = tree.envelopes
+        groups = []
+        n_unknown = [i for i in n_ids if i not in rows]
+        m_unknown = [i for i in m_ids if i not in rows]
+        if n_unknown and m_ids:
+            groups.append({"n": n_unknown, "m": m_ids})
+        n_known = [i for i in n_ids if i in rows]
+        if m_unknown and n_known:
+            groups.append({"n": n_known, "m": m_unknown})
+
+        # Probe the tree with the smaller side, keep hits that belong to the other side
+        m_known = [i for i in m_ids if i in rows]
+        swap = len(n_known) > len(m_known)
+        probe, other = (m_known, n_known) if swap else (n_known, m_known)
+        other_mask = np.zeros(len(envelopes), dtype=bool)
+        other_mask[[rows[i] for i in other]] = True
+        rank = np.empty(len(tree.order), dtype=np.int64)
+        rank[tree.order] = np.arange(len(tree.order))
+        probe = sorted(probe, key=lambda i: rank[rows[i]])
+
+        for start in range(0, len(probe), group_size):
+            chunk, hits = [], set()
+            for node_id in probe[start:start + group_size]:
+                box = envelopes[rows[node_id]]
+                if distance:
+                    margin = self._search_margin(distance, box)
+                    box = (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+                found = tree.query(box)
+                found = found[other_mask[found]]
+                if len(found):
+                    chunk.append(node_id)
+                    hits.update(found.tolist())
+            if chunk:
+                partners = [ids[row] for row in sorted(hits)]
+                groups.append({"n": partners, "m": chunk} if swap else {"n": chunk, "m": partners})
+        return groups, sum(len(g["n"]) * len(g["m"]) for g in groups)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": bool(self._loaded_at),
+            "nodes": len(self._ids),
+            "labels": {label: len(ids) for label, (ids, _) in self._by_label.items()},
+            "tree_levels": len(self.tree.levels),
+            "age_seconds": time.time() - self._loaded_at if self._loaded_at else None
+        }
+
+
+def prefilter_plan(
+    query: str,
+    params: Dict[str, Any],
+    max_distance: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Describe how to prefilter a pairwise gspatial.operation query, or return
+    None when it does not apply. Only the canonical template shape (n_list
+    and m_list collected right before the CALL) is recognised. Topological
+    operations must keep only true results (WHERE result = true); DISTANCE
+    queries need a distance bound and then return only the pairs within it,
+    otherwise dropping distant pairs would change the answer.
+    """
+    call = OPERATION_CALL.search(query)
+    collected = _LISTS_COLLECTED.search(query)
+    if call is None or collected is None or collected.end() > call.start():
+        return None
+    head = query[:_CALL.search(query).start()]
+    if query[collected.end():len(head)].strip():
+        # The rewritten query rebuilds n_list and m_list only
+        return None
+    operation = query_operation(query, params)
+    if operation == "DISTANCE":
+        if not max_distance or not _YIELD_PAIRS.search(query, call.end()):
+            return None
+    elif operation not in ENVELOPE_OPERATIONS or not _TRUE_ONLY.search(query, call.end()):
+        return None
+
+    return {
+        "operation": operation,
+        "distance": max_distance if operation == "DISTANCE" else None,
+        "head": head,
+        "id_query": head + "RETURN [x IN n_list | elementId(x)] AS n_ids, [x IN m_list | elementId(x)] AS m_ids"
+    }
+
+
+def apply_prefilter(
+    plan: Dict[str, Any],
+    query: str,
+    params: Dict[str, Any],
+    n_ids: List[str],
+    m_ids: List[str],
+    index: EnvelopeIndex
+) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """
+    Rewrite the query to run the procedure once per candidate group instead
+    of on the full n_list x m_list; returns (query, params, stats). The
+    groups are rebuilt from the ids the id query returned, so the MATCH /
+    collect head is not run again; DISTANCE queries also drop the pairs
+    farther apart than the plan's distance.
+    """
+    start = time.perf_counter()
+    groups, pairs = index.candidate_groups(n_ids, m_ids, plan["distance"])
+    stats = {
+        "operation": plan["operation"],
+        "n": len(n_ids),
+        "m": len(m_ids),
+        "groups": len(groups),
+        "pairs_before": len(n_ids) * len(m_ids),
+        "pairs_after": pairs,
+        "seconds": round(time.perf_counter() - start, 6)
+    }
+    tail = query[len(plan["head"]):]
+    params = {**params, "prefilter_groups": groups}
+    if plan["distance"]:
+        tail = _YIELD_PAIRS.sub(lambda m: m.group() + "\nWHERE result <= $prefilter_distance", tail, count=1)
+        params["prefilter_distance"] = float(plan["distance"])
+    filtered = (
+        "UNWIND $prefilter_groups AS prefilter_group\n"
+        "CALL {\n"
+        "  WITH prefilter_group\n"
+        "  MATCH (x) WHERE elementId(x) IN prefilter_group.n\n"
+        "  RETURN collect(x) AS n_list\n"
+        "}\n"
+        "CALL {\n"
+        "  WITH prefilter_group\n"
+        "  MATCH (x) WHERE elementId(x) IN prefilter_group.m\n"
+        "  RETURN collect(x) AS m_list\n"
+        "}\n"
+        "WITH n_list, m_list\n" +
+        tail
+    )
+    return filtered, params, stats
+
+
+_envelope_index: Optional[EnvelopeIndex] = None
+_envelope_index_lock = threading.Lock()
+
+
+def get_envelope_index() -> EnvelopeIndex:
+    """Return the process-wide envelope index."""
+    global _envelope_index
+    if _envelope_index is None:
+        with _envelope_index_lock:
+            if _envelope_index is None:
+                _envelope_index = EnvelopeIndex()
+    return _envelope_index
+
+
+def spatial_prefilter_enabled() -> bool:
+    return os.getenv("SPATIAL_PREFILTER", "false").lower() in ("1", "true", "yes")
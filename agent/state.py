@@ -1,22 +1,59 @@
-from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import StateGraph
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from typing import TypedDict, List, Dict, Any, Optional, Annotated
+
+
+def add_or_reset(current: Optional[List[Any]], update: Optional[List[Any]]) -> List[Any]:
+    """Append a node's records; None (the initial state of a turn) starts over."""
+    return [] if update is None else (current or []) + update
+
 
 class AgentState(TypedDict):
     """State for the Neo4j Cypher agent"""
     # User input
     question: str
     
+    # Question cache (key of the cached plan, and whether it was a hit)
+    cache_key: Optional[str]
+    cache_hit: Optional[bool]
+    
     # Query processing
     query_type: Optional[str]
+    query_type_confidence: Optional[float]  # local classifier confidence, None when the LLM classified
+    query_type_source: Optional[str]  # "classifier", "llm" or "planner"
+    plan: Optional[Dict[str, Any]]  # validated planner output (planner mode)
     entities: Optional[Dict[str, Any]]
+    resolved_entities: Optional[List[Dict[str, Any]]]  # places grounded in the gazetteer (label, key, value)
+    place_suggestions: Optional[Dict[str, List[str]]]  # similar stored names of places that could not be grounded
     cypher_query: Optional[str]
+    cypher_params: Optional[Dict[str, Any]]
+    raw_cypher_query: Optional[str]  # generated text before literals were lifted into cypher_params
+    cypher_source: Optional[str]  # "template", "llm" or "planner"
     
-    # Execution results
+    # Execution results (query_result holds at most RESULT_ROW_CAP rows;
+    # row_count is the full size, result_path the spilled full result if any)
     query_result: Optional[Any]
+    row_count: Optional[int]
+    result_truncated: Optional[bool]
+    result_path: Optional[str]
+    result_cache_hit: Optional[bool]  # served from the result cache without running the query
+    prefilter_stats: Optional[Dict[str, Any]]  # candidate narrowing by the envelope index, if applied
+    db_timings: Optional[Dict[str, Any]]  # Neo4j result_available_after / result_consumed_after (ms)
     
     # Final response
     response: Optional[str]
+    response_source: Optional[str]  # "template" (rendered without the LLM) or "llm"
+    
+    # Sessions (checkpointed workflows, agent.session): whether the question
+    # refers back to the previous turn, and what that turn left for it
+    followup: Optional[bool]
+    session_context: Optional[Dict[str, Any]]
     
     # Error handling
-    error: Optional[str]
\ No newline at end of file
+    error: Optional[str]
+    
+    # Repair loop: attempts, budget and query history; error details for regeneration
+    retry_context: Optional[Dict[str, Any]]
+    error_context: Optional[Dict[str, Any]]
+    
+    # Instrumentation (AGENT_METRICS): one record per node call, appended by
+    # each node, so parallel nodes can write in the same step; reset per turn
+    node_metrics: Annotated[List[Dict[str, Any]], add_or_reset]
\ No newline at end of file
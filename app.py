@@ -1,17 +1,83 @@
+import uuid
 import streamlit as st
-from agent.flow import create_workflow
-import os
-import json
+from agent.flow import get_session_workflow, session_config, _initial_state
+from agent.nodes import get_llm
+from agent.db import get_driver, get_pool_stats
+import time
 from dotenv import load_dotenv
 import traceback
 
 # 환경 변수 로드
 load_dotenv()
 
+# 노드 이름 -> 진행 상황 표시 문구
+NODE_LABELS = {
+    "check_cache": "캐시 조회",
+    "classify_query": "질문 유형 분석",
+    "extract_entities": "엔티티 추출",
+    "resolve_entities": "위치 확인",
+    "plan_query": "쿼리 계획",
+    "generate_cypher": "Cypher 쿼리 생성",
+    "parameterize_cypher": "쿼리 파라미터화",
+    "validate_cypher": "쿼리 검증",
+    "execute_cypher": "쿼리 실행",
+    "store_cache": "캐시 저장",
+    "generate_response": "응답 생성",
+    "remember_turn": "대화 맥락 저장"
+}
+
+
+# The LLM client, the Neo4j driver and the compiled workflow are created once
+# per server process and shared by every session (rerun) and every user.
+# All three are thread-safe; each browser session is its own conversation
+# thread in the workflow's checkpointer.
+@st.cache_resource
+def load_llm():
+    return get_llm()
+
+
+@st.cache_resource
+def load_driver():
+    return get_driver()
+
+
+@st.cache_resource
+def load_workflow():
+    load_llm()
+    load_driver()
+    return get_session_workflow()
+
+
+def show_update(node, update):
+    """Show the part of a node's state update worth seeing while the workflow runs."""
+    if node == "check_cache" and update.get("cache_hit"):
+        st.caption("캐시된 Cypher 쿼리를 사용합니다")
+    elif node == "classify_query":
+        st.json({key: update.get(key) for key in ("query_type", "query_type_source", "query_type_confidence")})
+    elif node == "extract_entities":
+        st.json({"entities": update.get("entities")})
+    elif node == "resolve_entities" and (update.get("resolved_entities") or update.get("place_suggestions")):
+        st.json({key: update.get(key) for key in ("resolved_entities", "place_suggestions")})
+    elif node in ("plan_query", "generate_cypher", "parameterize_cypher") and update.get("cypher_query"):
+        st.code(update["cypher_query"], language="cypher")
+        if update.get("cypher_params"):
+            st.json({"cypher_params": update["cypher_params"]})
+    elif node == "check_cache" and update.get("followup"):
+        st.caption("이전 질문의 맥락을 이어서 사용합니다")
+    elif node == "execute_cypher" and not update.get("error"):
+        st.caption(f"{update.get('row_count') or 0}개 행")
+    if node in ("validate_cypher", "execute_cypher") and update.get("error"):
+        st.error(f"❌ {update['error']}")
+
+
 # 페이지 설정
 st.set_page_config(layout="wide")
 st.title("gSpatial LangGraph Agent")
 
+# 브라우저 세션마다 하나의 대화 (후속 질문이 이전 답변을 참조)
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = uuid.uuid4().hex
+
 # 상태 메시지를 위한 컨테이너
 status_container = st.container()
 
@@ -23,11 +89,13 @@ with st.container():
     with cols[1]:
         st.write("")
         run_btn = st.button("실행", type="primary", use_container_width=True)
-    
+        if st.button("새 대화", use_container_width=True):
+            st.session_state.thread_id = uuid.uuid4().hex
+
     user_input = st.text_area(
-        "공간 쿼리를 입력하세요:", 
-        "", 
-        height=100, 
+        "공간 쿼리를 입력하세요:",
+        "",
+        height=100,
         label_visibility="collapsed",
         placeholder="예: 서울시 강남구의 공원을 찾아줘"
     )
@@ -38,139 +106,61 @@ if run_btn:
         st.warning("질문을 입력해주세요.")
     else:
         try:
-            # Clear previous results
-            for key in st.session_state.keys():
-                if key.startswith('expand_'):
-                    del st.session_state[key]
-            
-            # Initialize workflow
+            workflow = load_workflow()
+
             with status_container:
                 st.subheader("실행 결과")
                 with st.status("워크플로우 실행 중...", expanded=True) as status:
-                    status.write("워크플로우를 초기화하는 중...")
-                    workflow = create_workflow()
-                    
-                    # Initialize state
-                    state = {
-                        "question": user_input,
-                        "query_type": None,
-                        "entities": None,
-                        "cypher_query": None,
-                        "query_result": None,
-                        "response": None,
-                        "error": None
-                    }
-                    
-                    # Run workflow steps
-                    steps = [
-                        ("classify_query", "1. 질문 유형 분석 중..."),
-                        ("extract_entities", "2. 엔티티 추출 중..."),
-                        ("generate_cypher", "3. Cypher 쿼리 생성 중..."),
-                        ("execute_cypher", "4. 쿼리 실행 중..."),
-                        ("generate_response", "5. 응답 생성 중...")
-                    ]
-                    
-                    for step, message in steps:
-                        status.write(f"### {message}")
-                        
-                        # Execute the step
-                        if step == "classify_query":
-                            from agent.nodes import classify_query
-                            result = classify_query(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 질문 유형 분석 결과", expanded=True):
-                                st.json({"query_type": state["query_type"]})
-                        
-                        elif step == "extract_entities":
-                            from agent.nodes import extract_entities
-                            result = extract_entities(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 추출된 엔티티", expanded=True):
-                                st.json({"entities": state["entities"]})
-                        
-                        elif step == "generate_cypher":
-                            from agent.nodes import generate_cypher
-                            result = generate_cypher(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 생성된 Cypher 쿼리", expanded=True):
-                                st.code(state["cypher_query"], language="cypher")
-                        
-                        elif step == "execute_cypher":
-                            from agent.nodes import execute_cypher
-                            result = execute_cypher(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 쿼리 실행 결과", expanded=True):
-                                if state.get("error"):
-                                    st.error(f"❌ 쿼리 실행 오류: {state['error']}")
-                                else:
-                                    st.json(state["query_result"])
-                        
-                        elif step == "generate_response":
-                            from agent.nodes import generate_response
-                            result = generate_response(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 질문 유형 분석 결과", expanded=True):
-                                st.json({"query_type": state["query_type"]})
-                        
-                        elif step == "extract_entities":
-                            from agent.nodes import extract_entities
-                            result = extract_entities(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 추출된 엔티티", expanded=True):
-                                st.json({"entities": state["entities"]})
-                        
-                        elif step == "generate_cypher":
-                            from agent.nodes import generate_cypher
-                            result = generate_cypher(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 생성된 Cypher 쿼리", expanded=True):
-                                st.code(state["cypher_query"], language="cypher")
-                        
-                        elif step == "execute_cypher":
-                            from agent.nodes import execute_cypher
-                            result = execute_cypher(state)
-                            state.update(result)
-                            
-                            with st.expander("🔍 쿼리 실행 결과", expanded=True):
-                                if state.get("error"):
-                                    st.error(f"❌ 쿼리 실행 오류: {state['error']}")
-                                else:
-                                    st.json(state["query_result"])
-                        
-                        elif step == "generate_response":
-                            from agent.nodes import generate_response
-                            result = generate_response(state)
-                            state.update(result)
-                    
-                    # Display final results
-                    status.write("### ✅ 처리 완료!")
-                    
-                    # Show final response in a nice card
-                    st.divider()
-                    st.subheader("💬 최종 응답")
-                    st.info(state.get("response", "응답을 생성할 수 없습니다."), icon="💡")
-                    
-                    # Show debug info in an expander
-                    with st.expander("🔧 최종 상태 (디버그)", expanded=False):
-                        st.write("#### 상태 요약")
-                        st.json({k: v for k, v in state.items() if k != "query_result"})
-                        
-                        if state.get("query_result"):
-                            st.write("#### 쿼리 결과 샘플 (첫 번째 항목)")
-                            sample = (state["query_result"][:1] 
-                                     if isinstance(state["query_result"], list) and len(state["query_result"]) > 0 
-                                     else state["query_result"])
-                            st.json(sample)
-        
+                    # Progress comes from the node updates of the compiled graph
+                    state = {}
+                    start = time.perf_counter()
+                    stream = workflow.stream(
+                        _initial_state(user_input),
+                        session_config(st.session_state.thread_id),
+                        stream_mode=["updates", "values"]
+                    )
+                    for mode, chunk in stream:
+                        if mode == "values":
+                            state = chunk
+                            continue
+                        for node, update in chunk.items():
+                            label = NODE_LABELS.get(node, node)
+                            status.update(label=f"{label} 완료")
+                            with st.expander(f"🔍 {label} ({time.perf_counter() - start:.2f}초)", expanded=False):
+                                show_update(node, update or {})
+
+                    status.update(
+                        label=f"처리 완료 ({time.perf_counter() - start:.2f}초)",
+                        state="error" if state.get("error") else "complete",
+                        expanded=False
+                    )
+
+            # Show final response in a nice card
+            st.divider()
+            st.subheader("💬 최종 응답")
+            st.info(state.get("response") or "응답을 생성할 수 없습니다.", icon="💡")
+
+            if state.get("cypher_query"):
+                with st.expander("🔍 실행된 Cypher 쿼리", expanded=False):
+                    st.code(state["cypher_query"], language="cypher")
+
+            # Show debug info in an expander
+            with st.expander("🔧 최종 상태 (디버그)", expanded=False):
+                st.write("#### 상태 요약")
+                st.json({k: v for k, v in state.items() if k not in ("query_result", "session_context")})
+
+                st.write("#### Neo4j 커넥션 풀")
+                st.json(get_pool_stats())
+
+                if state.get("query_result"):
+                    st.write("#### 쿼리 결과 샘플 (첫 번째 항목)")
+                    sample = (state["query_result"][:1]
+                             if isinstance(state["query_result"], list) and len(state["query_result"]) > 0
+                             else state["query_result"])
+                    st.json(sample)
+
         except Exception as e:
             with status_container:
                 st.error(f"❌ 오류 발생: {str(e)}")
                 with st.expander("자세한 오류 정보", expanded=False):
-                    st.text(traceback.format_exc())
\ No newline at end of file
+                    st.text(traceback.format_exc())
@@ -0,0 +1,93 @@
+"""
+Time gazetteer index builds and exact / normalized / fuzzy place lookups on
+a synthetic set of Korean administrative names, and check that the places
+of the labelled corpus are grounded.
+
+    python benchmarks/bench_gazetteer.py --names 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.gazetteer import Gazetteer
+from agent.compiler import extract_places
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+SYLLABLES = "가나다라마바사아자차카타파하강남북서동신정반포역삼청송미래한"
+
+
+def synthetic_entries(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    entries = set()
+    while len(entries) < count:
+        stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        kind = rng.random()
+        if kind < 0.6:
+            entries.add(("AdminDong", "name", f"{stem}{rng.randint(1, 9)}동"))
+        elif kind < 0.8:
+            entries.add(("District", "name", f"{stem}구"))
+        else:
+            entries.add(("Station", "name", f"{stem}역"))
+    return sorted(entries)
+
+
+def time_lookups(gazetteer: Gazetteer, names, repeat: int = 3):
+    samples = []
+    for _ in range(repeat):
+        for name in names:
+            start = time.perf_counter()
+            gazetteer.lookup(name, limit=1)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6, sorted(samples)[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    entries = synthetic_entries(args.names)
+    gazetteer = Gazetteer(ttl=-1)
+    start = time.perf_counter()
+    gazetteer.load_entries(entries)
+    print(f"index build: {len(entries)} names in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(1)
+    sample = [value for _, _, value in rng.sample(entries, min(args.queries, len(entries)))]
+    cases = {
+        "exact": sample,
+        # "반포3동" -> "반포 3", whitespace and suffix differ
+        "normalized": [f"{v[:-2]} {v[-2:-1]}" if v.endswith("동") else v[:-1] for v in sample],
+        # one syllable replaced
+        "fuzzy": [v[:1] + "X" + v[2:] if len(v) > 3 else v + "X" for v in sample]
+    }
+    for kind, names in cases.items():
+        median_us, p99_us = time_lookups(gazetteer, names)
+        found = sum(1 for name in names if gazetteer.lookup(name, limit=1))
+        # Fuzzy matches are suggestions only, resolve() does not ground them
+        grounded = len(gazetteer.resolve(names))
+        print(f"{kind:<11} median {median_us:7.1f} us   p99 {p99_us:7.1f} us   "
+              f"matched {found}/{len(names)}   grounded {grounded}/{len(names)}")
+
+    if os.path.exists(args.corpus):
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [json.loads(line) for line in f if line.strip()]
+        places = sorted({place for item in corpus for place in extract_places(item["entities"])})
+        corpus_gazetteer = Gazetteer(ttl=-1)
+        # Stored without whitespace; spellings with spaces must resolve through normalization
+        corpus_gazetteer.load_entries([("Place", "name", place.replace(" ", "")) for place in places])
+        grounded = sum(1 for place in places if corpus_gazetteer.lookup(place, limit=1))
+        print(f"\ncorpus places grounded: {grounded}/{len(places)}")
+
+
+if __name__ == "__main__":
+    main()
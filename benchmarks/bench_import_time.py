@@ -0,0 +1,123 @@
+"""
+Measure the import cost of the agent package with `python -X importtime`
+and check it against a budget. Each target is imported in a fresh
+interpreter (no OpenAI key and no Neo4j needed); the median over --runs
+of the cumulative import time is compared with its budget.
+
+`import agent` must stay side-effect-free: the check also fails if it loads
+LangGraph, LangChain or the Neo4j driver, or creates a chat model, a driver,
+a schema or the workflow.
+
+    python benchmarks/bench_import_time.py --runs 5
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target module -> import budget in milliseconds
+BUDGETS = {
+    "agent": 50.0,
+    "agent.db": 100.0,
+    # LangGraph and langchain_core are the floor here; no LLM client, no driver
+    "agent.flow": 1500.0
+}
+
+# Must not be loaded by `import agent`
+HEAVY_MODULES = ("langgraph", "langchain_core", "langchain_openai", "openai", "neo4j", "numpy")
+
+SIDE_EFFECT_CHECK = """
+import sys, agent, agent.db, agent.schema
+heavy = [m for m in {heavy!r} if m in sys.modules]
+created = [name for name, value in (
+    ("driver", agent.db._manager is not None and agent.db._manager._driver is not None),
+    ("schema", agent.schema._schema_cache is not None),
+    ("llm", "agent.nodes" in sys.modules and "llm" in vars(sys.modules["agent.nodes"])),
+    ("workflow", "agent.flow" in sys.modules and sys.modules["agent.flow"]._workflow is not None)
+) if value]
+print(",".join(heavy) + "|" + ",".join(created))
+"""
+
+
+def import_times(module: str):
+    """
+    Return (cumulative us of `module`, {module: self us} of the modules it
+    pulled in) from one fresh interpreter.
+    """
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting depth is the indentation of the name
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(self_us), int(cumulative_us)))
+    # A module is reported after everything it imported, which is indented deeper
+    end = max(i for i, entry in enumerate(entries) if entry[1] == module)
+    depth, _, _, total = entries[end]
+    start = end
+    while start > 0 and entries[start - 1][0] > depth:
+        start -= 1
+    return total, {name: self_us for _, name, self_us, _ in entries[start:end + 1]}
+
+
+def side_effects():
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    proc = subprocess.run(
+        [sys.executable, "-c", SIDE_EFFECT_CHECK.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"side effect check failed:\n{proc.stderr[-2000:]}")
+    heavy, created = proc.stdout.strip().split("|")
+    return [m for m in heavy.split(",") if m], [c for c in created.split(",") if c]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="show the N slowest modules (self time) per target")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS.items():
+        budget *= args.budget_scale
+        totals, slowest = [], {}
+        for _ in range(args.runs):
+            total, self_times = import_times(module)
+            totals.append(total / 1000)
+            slowest = self_times
+        median = statistics.median(totals)
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print(f"import {module:<12} median {median:8.1f} ms  min {min(totals):8.1f} ms  budget {budget:8.1f} ms  {status}")
+        for name, self_us in sorted(slowest.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {name}")
+        if median > budget:
+            failures.append(f"import {module} took {median:.1f} ms (budget {budget:.1f} ms)")
+
+    heavy, created = side_effects()
+    print(f"\nimport agent loads heavy modules: {', '.join(heavy) or 'none'}")
+    print(f"import agent creates: {', '.join(created) or 'nothing'}")
+    if heavy:
+        failures.append(f"import agent loads {', '.join(heavy)}")
+    if created:
+        failures.append(f"import agent creates {', '.join(created)}")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nwithin budget")
+
+
+if __name__ == "__main__":
+    main()
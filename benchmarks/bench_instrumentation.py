@@ -0,0 +1,53 @@
+"""
+Measure the per-run cost of node instrumentation: the same workflow with
+zero-delay stub model and driver, built without and with instrumentation.
+
+    python benchmarks/bench_instrumentation.py --runs 200
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+
+from stubs import install_stubs
+
+
+def measure(workflow, runs: int):
+    from agent.flow import _initial_state
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        workflow.invoke(_initial_state("반포3동의 중심점을 구해줘"))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    install_stubs(llm_delay=0.0)
+    from agent.flow import create_workflow
+    from agent.metrics import get_metrics_registry
+
+    workflows = {"disabled": create_workflow(instrumented=False), "enabled": create_workflow(instrumented=True)}
+    for workflow in workflows.values():
+        measure(workflow, 5)  # warm up
+    results = {name: measure(workflow, args.runs) for name, workflow in workflows.items()}
+    for name, median in results.items():
+        print(f"{name:<10} median {median * 1000:8.3f} ms per run")
+    overhead = results["enabled"] - results["disabled"]
+    print(f"\ninstrumentation overhead: {overhead * 1e6:.0f} us per run "
+          f"({overhead / results['disabled'] * 100:.1f}% of a stub run with no LLM or database latency)")
+    print(f"registry series: {sum(len(v) for v in get_metrics_registry().to_json()['counters'].values())} counters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measure end-to-end latency of the sequential and the fan-out workflow with a
+stub LLM of configurable delay (no OpenAI or Neo4j access needed).
+
+    python benchmarks/bench_parallel_flow.py --llm-delay 0.5 --runs 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+# Every run asks the same question, so keep the question and result caches out of the measurement
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+
+from stubs import install_stubs
+
+
+def measure(workflow, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = workflow.invoke({"question": "반포3동의 중심점을 구해줘"})
+        timings.append(time.perf_counter() - start)
+        assert result.get("response"), result
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    install_stubs(llm_delay=args.llm_delay)
+    from agent.flow import create_workflow
+
+    results = {}
+    for name, parallel in [("sequential", False), ("parallel", True)]:
+        timings = measure(create_workflow(parallel=parallel), args.runs)
+        results[name] = statistics.median(timings)
+        print(f"{name:<12} median {results[name] * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms")
+
+    saved = results["sequential"] - results["parallel"]
+    print(f"\nlatency reduction: {saved * 1000:.1f} ms ({saved / results['sequential'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
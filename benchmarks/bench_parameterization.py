@@ -0,0 +1,112 @@
+"""
+Compare Neo4j planning cost for repeated query shapes with literals inlined
+versus lifted into parameters by agent.parameterize.lift_literals.
+
+Each round issues `--variants` queries of the same shape that differ only in
+their literal values. Inlined literals make every query text new, so Neo4j
+plans each one; parameterized queries share one text and hit the plan cache.
+Requires the Neo4j instance configured in .env. Use --gspatial to benchmark
+the gspatial.operation shape (needs the plugin) instead of a plain MATCH.
+Literal lifting is first checked offline on EDGE_CASES (exit code 1 on a
+mismatch, --check-only to stop there).
+
+    python benchmarks/bench_parameterization.py --variants 200
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from dotenv import load_dotenv
+from agent.db import get_session, close_driver
+from agent.parameterize import lift_literals
+
+PLAIN_SHAPE = "MATCH (n) WHERE n.name = '{name}' AND coalesce(n.area, 0) > {area} WITH collect(n) AS n_list RETURN size(n_list) AS result"
+GSPATIAL_SHAPE = (
+    "MATCH (n) WHERE n.name = '{name}' WITH collect(n) AS n_list "
+    "CALL gspatial.operation('BUFFER', [n_list, [{area}.0]]) YIELD n, result RETURN result"
+)
+
+# query -> (lifted text, parameters)
+EDGE_CASES = {
+    "MATCH (n) WHERE n.행정동명2 = 'a' RETURN n": ("MATCH (n) WHERE n.행정동명2 = $p0 RETURN n", {"p0": "a"}),
+    "RETURN .5": ("RETURN $p0", {"p0": 0.5}),
+    "RETURN 0x1F, 0o17": ("RETURN $p0, $p1", {"p0": 31, "p1": 15}),
+    "RETURN 1.5e3 AS x": ("RETURN $p0 AS x", {"p0": 1500.0}),
+    "MATCH p = (a)-[*1..3]->(b) RETURN p": ("MATCH p = (a)-[*1..3]->(b) RETURN p", {}),
+    "MATCH p = (a)-[*..5]->(b) RETURN p": ("MATCH p = (a)-[*..5]->(b) RETURN p", {}),
+    "MATCH (n) WHERE n.`이름` = \"반포3동\" RETURN n.x2": ("MATCH (n) WHERE n.`이름` = $p0 RETURN n.x2", {"p0": "반포3동"})
+}
+
+
+def check_edge_cases() -> int:
+    failures = 0
+    for query, expected in EDGE_CASES.items():
+        lifted = lift_literals(query)
+        if lifted != expected:
+            failures += 1
+            print(f"MISMATCH {query!r}\n  got      {lifted}\n  expected {expected}")
+    print(f"edge cases: {len(EDGE_CASES) - failures}/{len(EDGE_CASES)} lifted as expected\n")
+    return failures
+
+
+def run_round(session, queries, explain_only: bool):
+    planning, wall = [], []
+    for query, params in queries:
+        text = f"EXPLAIN {query}" if explain_only else query
+        start = time.perf_counter()
+        summary = session.run(text, params).consume()
+        wall.append(time.perf_counter() - start)
+        # result_available_after covers planning plus time to the first record
+        if summary.result_available_after is not None:
+            planning.append(summary.result_available_after)
+    return planning, wall
+
+
+def report(name, planning, wall):
+    print(f"{name:<16} server first-record median {statistics.median(planning) if planning else float('nan'):7.1f} ms   "
+          f"client wall median {statistics.median(wall) * 1000:7.2f} ms   total {sum(wall) * 1000:8.1f} ms")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, default=200)
+    parser.add_argument("--explain", action="store_true", help="only plan (EXPLAIN) instead of executing")
+    parser.add_argument("--gspatial", action="store_true")
+    parser.add_argument("--check-only", action="store_true", help="only check EDGE_CASES, without Neo4j")
+    args = parser.parse_args()
+
+    if check_edge_cases():
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    shape = GSPATIAL_SHAPE if args.gspatial else PLAIN_SHAPE
+    literal = [(shape.format(name=f"bench_place_{i}", area=i), {}) for i in range(args.variants)]
+
+    start = time.perf_counter()
+    lifted = [lift_literals(query) for query, _ in literal]
+    lift_time = time.perf_counter() - start
+    distinct = len({query for query, _ in lifted})
+    print(f"distinct query texts: inlined {len({q for q, _ in literal})}, parameterized {distinct}; "
+          f"lift_literals {lift_time / len(literal) * 1e6:.0f} us/query\n")
+
+    try:
+        with get_session() as session:
+            try:
+                session.run("CALL db.clearQueryCaches()").consume()
+            except Exception:
+                pass
+            report("inlined", *run_round(session, literal, args.explain))
+            report("parameterized", *run_round(session, lifted, args.explain))
+    finally:
+        close_driver()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compare the graph pipeline (separate classify / extract / generate calls)
+with the planner mode (one structured-output call) on the labelled corpus:
+latency, LLM calls and tokens per question, and correctness of the query
+type, the operation the final Cypher calls and the extracted place names.
+
+Against OpenAI and Neo4j (OPENAI_API_KEY, NEO4J_*):
+
+    python benchmarks/bench_pipeline_modes.py --limit 20
+
+Offline with the stub model and driver (latency and tokens only, the stub's
+canned answers make correctness meaningless):
+
+    python benchmarks/bench_pipeline_modes.py --stub --llm-delay 0.5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+# Every mode sees the same questions, keep the caches out of the comparison
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+
+class UsageCounter(BaseCallbackHandler):
+    """Count chat model calls and the token usage they report."""
+
+    def __init__(self, usage: Counter):
+        self.usage = usage
+
+    def on_llm_end(self, response, **kwargs):
+        self.usage["calls"] += 1
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.usage.update({
+                    "input_tokens": metadata.get("input_tokens", 0),
+                    "output_tokens": metadata.get("output_tokens", 0)
+                })
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def score(state, item):
+    from agent.compiler import query_operation, extract_places
+    places = set(extract_places(state.get("entities")))
+    expected = set(extract_places(item["entities"]))
+    return {
+        "query_type": state.get("query_type") == item["query_type"],
+        "operation": query_operation(state.get("cypher_query"), state.get("cypher_params")) == item["operation"],
+        "places": len(places & expected) / len(expected) if expected else 1.0,
+        "executed": not state.get("error")
+    }
+
+
+def run_mode(mode, corpus, usage, parallel):
+    from agent.flow import create_workflow, _initial_state
+    workflow = create_workflow(parallel=parallel, mode=mode)
+    timings, scores, totals = [], [], Counter()
+    for item in corpus:
+        # The stub model counts its own usage; a real one reports it to the callback
+        counter = usage if usage is not None else Counter()
+        config = {} if usage is not None else {"callbacks": [UsageCounter(counter)]}
+        before = Counter(counter)
+        start = time.perf_counter()
+        state = workflow.invoke(_initial_state(item["question"]), config=config)
+        timings.append(time.perf_counter() - start)
+        totals.update(counter - before)
+        scores.append(score(state, item))
+    return timings, scores, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--limit", type=int, default=0, help="use only the first N questions")
+    parser.add_argument("--stub", action="store_true", help="use the stub model and driver")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--sequential", action="store_true", help="graph mode without the classify/extract fan-out")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    if args.limit:
+        corpus = corpus[:args.limit]
+
+    usage = None
+    if args.stub:
+        from stubs import install_stubs
+        usage = Counter()
+        install_stubs(llm_delay=args.llm_delay, usage=usage)
+
+    print(f"{len(corpus)} questions\n")
+    print(f"{'mode':<8} {'p50 ms':>9} {'p95 ms':>9} {'calls/q':>8} {'in tok/q':>9} {'out tok/q':>10} "
+          f"{'type':>6} {'op':>6} {'places':>7} {'ok':>6}")
+    for mode in ("graph", "planner"):
+        timings, scores, totals = run_mode(mode, corpus, usage, parallel=not args.sequential)
+        n = len(corpus)
+        share = lambda key: sum(s[key] for s in scores) / n * 100
+        print(f"{mode:<8} {statistics.median(timings) * 1000:>9.1f} {percentile(timings, 0.95) * 1000:>9.1f} "
+              f"{totals['calls'] / n:>8.2f} {totals['input_tokens'] / n:>9.0f} {totals['output_tokens'] / n:>10.0f} "
+              f"{share('query_type'):>5.1f}% {share('operation'):>5.1f}% {share('places'):>6.1f}% {share('executed'):>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Report accuracy and latency of the local query_type classifier on the
+labelled corpus: overall, and for the questions it answers at the
+confidence threshold (the rest go to the LLM). With --llm the same corpus
+is classified by the LLM through the workflow's classification prompt
+(needs OPENAI_API_KEY), and the hybrid (local above the threshold, LLM
+below) is reported as well.
+
+    python benchmarks/bench_query_classifier.py --threshold 0.7 [--llm]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.classifier import get_query_classifier
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def classify_with_llm(corpus):
+    from agent.nodes import get_llm, _parse_query_type
+    from agent.prompts import classification_prompt
+
+    chain = classification_prompt | get_llm()
+    predictions, timings = [], []
+    for item in corpus:
+        start = time.perf_counter()
+        result = chain.invoke({"input": item["question"], "schema": ""})
+        timings.append(time.perf_counter() - start)
+        predictions.append(_parse_query_type(result.content))
+    return predictions, timings
+
+
+def report(name, predictions, corpus, timings):
+    correct = sum(p == item["query_type"] for p, item in zip(predictions, corpus))
+    print(f"{name:<22} accuracy {correct}/{len(corpus)} ({correct / len(corpus) * 100:5.1f}%)   "
+          f"p50 {statistics.median(timings) * 1000:9.3f} ms   p95 {percentile(timings, 0.95) * 1000:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("QUERY_CLASSIFIER_THRESHOLD", "0.7")))
+    parser.add_argument("--llm", action="store_true", help="also classify with the LLM")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    classifier = get_query_classifier()
+    classifier.classify(corpus[0]["question"])  # warm up
+    local, timings = [], []
+    for item in corpus:
+        start = time.perf_counter()
+        local.append(classifier.classify(item["question"]))
+        timings.append(time.perf_counter() - start)
+
+    report("local (all)", [query_type for query_type, _ in local], corpus, timings)
+    confident = [(prediction, item) for prediction, item in zip(local, corpus) if prediction[1] >= args.threshold]
+    correct = sum(query_type == item["query_type"] for (query_type, _), item in confident)
+    print(f"local >= {args.threshold:<13} answered {len(confident)}/{len(corpus)} "
+          f"({len(confident) / len(corpus) * 100:.1f}%), accuracy {correct}/{len(confident)}")
+    if args.verbose:
+        for (query_type, confidence), item in zip(local, corpus):
+            mark = "ok " if query_type == item["query_type"] else "ERR"
+            print(f"  {mark} {confidence:.2f} {query_type:<12} {item['question']}")
+
+    if not args.llm:
+        return
+    llm_predictions, llm_timings = classify_with_llm(corpus)
+    report("llm", llm_predictions, corpus, llm_timings)
+    hybrid, hybrid_timings = [], []
+    for (query_type, confidence), llm_type, local_time, llm_time in zip(local, llm_predictions, timings, llm_timings):
+        deferred = confidence < args.threshold
+        hybrid.append(llm_type if deferred else query_type)
+        hybrid_timings.append(local_time + (llm_time if deferred else 0.0))
+    report("hybrid", hybrid, corpus, hybrid_timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Report response-prompt sizes with raw WKT results versus geometry
+descriptors, on synthetic outputs shaped like BUFFER, UNION, BOUNDARY,
+TOPOLOGICAL (nodes with geometry properties) and CENTROID results.
+
+    python benchmarks/bench_result_summary.py --vertices 5000
+"""
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.prompts import response_generation_prompt
+from agent.schema_render import estimate_tokens
+from agent.geometry import summarize_rows
+
+CENTER = (127.0039765, 37.5123278)
+
+
+class FakeNode(dict):
+    """Stands in for neo4j.graph.Node (labels + property items)."""
+
+    def __init__(self, labels, properties):
+        super().__init__(properties)
+        self.labels = frozenset(labels)
+
+
+def ring(vertices: int, radius: float, center=CENTER, jitter: float = 0.0, seed: int = 0):
+    rng = random.Random(seed)
+    points = []
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        r = radius * (1 + rng.uniform(-jitter, jitter))
+        points.append((center[0] + r * math.cos(angle), center[1] + r * math.sin(angle)))
+    points.append(points[0])
+    return ", ".join(f"{x:.12f} {y:.12f}" for x, y in points)
+
+
+def outputs(vertices: int):
+    line = ", ".join(
+        f"{CENTER[0] + k * 1e-5:.12f} {CENTER[1] + math.sin(k / 50) * 1e-3:.12f}" for k in range(vertices)
+    )
+    return {
+        "BUFFER": [{"result": f"POLYGON (({ring(vertices, 0.005)}))"}],
+        "UNION": [{"result": (
+            f"MULTIPOLYGON ((({ring(vertices, 0.02, jitter=0.05, seed=1)})), "
+            f"(({ring(vertices, 0.015, (CENTER[0] + 0.05, CENTER[1]), jitter=0.05, seed=2)})))"
+        )}],
+        "BOUNDARY": [{"result": f"LINESTRING ({line})"}],
+        "TOPOLOGICAL": [
+            {
+                "n": FakeNode(["AdminDong"], {"name": f"반포{k}동", "geometry": f"POLYGON (({ring(vertices // 5, 0.01, seed=k)}))"}),
+                "m": FakeNode(["District"], {"name": "서초구", "geometry": f"POLYGON (({ring(vertices // 5, 0.05, seed=9)}))"})
+            }
+            for k in range(1, 6)
+        ],
+        "CENTROID": [{"result": f"POINT ({CENTER[0]} {CENTER[1]})"}]
+    }
+
+
+def prompt_tokens(rows) -> int:
+    text = response_generation_prompt.format(question="질문", query="MATCH (n) RETURN n", result=str(rows[:5]))
+    return estimate_tokens(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'output':<12} {'raw tokens':>11} {'summarized':>11} {'ratio':>8} {'summarize':>10}")
+    for name, rows in outputs(args.vertices).items():
+        before = prompt_tokens(rows)
+        start = time.perf_counter()
+        summarized = summarize_rows(rows[:5])
+        elapsed = time.perf_counter() - start
+        after = prompt_tokens(summarized)
+        print(f"{name:<12} {before:>11,} {after:>11,} {before / after:>7.1f}x {elapsed * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
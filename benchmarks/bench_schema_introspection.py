@@ -0,0 +1,115 @@
+"""
+Compare the original full-scan schema introspection with the catalog/sampling engine.
+
+Loads a synthetic spatial graph into the Neo4j instance configured in .env
+(labels prefixed with "Bench"), times each implementation and removes the
+synthetic data afterwards.
+
+    python benchmarks/bench_schema_introspection.py --labels 8 --nodes 200000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from agent.db import get_session, close_driver
+from agent.schema import introspect_schema
+from agent.introspection import SchemaIntrospector
+
+
+def load_synthetic_graph(labels: int, nodes: int, batch: int = 10000) -> None:
+    with get_session() as session:
+        for i in range(labels):
+            label = f"BenchLabel{i}"
+            for start in range(0, nodes, batch):
+                session.run(
+                    f"""
+                    UNWIND range($start, $end) AS idx
+                    CREATE (:`{label}` {{
+                        name: 'bench_' + toString(idx),
+                        idx: idx,
+                        area: toFloat(idx) * 1.5,
+                        geometry: 'POLYGON ((' + toString(idx) + ' 0, ' + toString(idx + 1) + ' 0, '
+                                  + toString(idx + 1) + ' 1, ' + toString(idx) + ' 0))'
+                    }})
+                    """,
+                    start=start,
+                    end=min(start + batch, nodes) - 1
+                ).consume()
+            session.run(
+                f"""
+                MATCH (a:`{label}`) WHERE a.idx % 10 = 0
+                MATCH (b:`{label}` {{idx: a.idx + 1}})
+                CREATE (a)-[:BENCH_ADJACENT_{i} {{weight: 1.0}}]->(b)
+                """
+            ).consume()
+
+
+def drop_synthetic_graph(labels: int, batch: int = 10000) -> None:
+    with get_session() as session:
+        for i in range(labels):
+            while True:
+                summary = session.run(
+                    f"MATCH (n:`BenchLabel{i}`) WITH n LIMIT $batch DETACH DELETE n",
+                    batch=batch
+                ).consume()
+                if summary.counters.nodes_deleted == 0:
+                    break
+
+
+def timed(name: str, fn, repeat: int):
+    timings = []
+    schema = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        schema = fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{name:<24} best {best * 1000:10.1f} ms   mean {sum(timings) / len(timings) * 1000:10.1f} ms")
+    return schema, best
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=8)
+    parser.add_argument("--nodes", type=int, default=100000, help="nodes per label")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic graph")
+    args = parser.parse_args()
+
+    print(f"Loading synthetic graph: {args.labels} labels x {args.nodes} nodes")
+    load_synthetic_graph(args.labels, args.nodes)
+    try:
+        def legacy():
+            with get_session() as session:
+                return introspect_schema(session)
+
+        catalog = SchemaIntrospector(mode="catalog", max_workers=args.workers)
+        sample = SchemaIntrospector(mode="sample", sample_size=args.sample_size, max_workers=args.workers)
+
+        reference, legacy_time = timed("full scan (current)", legacy, args.repeat)
+        catalog_schema, catalog_time = timed("catalog procedures", catalog.introspect, args.repeat)
+        sample_schema, sample_time = timed("parallel sampling", sample.introspect, args.repeat)
+
+        print(f"\nspeedup catalog: {legacy_time / catalog_time:6.1f}x   sampling: {legacy_time / sample_time:6.1f}x")
+        for name, schema in [("catalog", catalog_schema), ("sampling", sample_schema)]:
+            missing = {
+                label: sorted(set(props) - set(schema["nodeProperties"].get(label, [])))
+                for label, props in reference["nodeProperties"].items()
+                if set(props) - set(schema["nodeProperties"].get(label, []))
+            }
+            print(f"{name}: labels with missing properties vs full scan: {missing or 'none'}")
+    finally:
+        if not args.keep:
+            drop_synthetic_graph(args.labels)
+        close_driver()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Report Cypher-generation prompt sizes with the full JSON schema versus the
+compact, relevance-pruned rendering.
+
+Uses the persisted schema cache file when available (see NEO4J_SCHEMA_CACHE_PATH),
+otherwise a synthetic schema of the given size.
+
+    python benchmarks/bench_schema_prompt.py --schema ~/.cache/gspatial-agent/neo4j_schema.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.prompts import cypher_generation_prompt
+from agent.schema_render import SchemaRenderer, estimate_tokens
+
+QUESTIONS = [
+    ("반포3동의 중심점을 구해줘", "SINGLE", {"entities": [{"type": "위치명", "value": "반포3동"}]}, ["AdminDong"]),
+    ("강남구의 면적은?", "SINGLE", {"entities": [{"type": "위치명", "value": "강남구"}]}, ["AdminGu"]),
+    ("서울역 반경 500m 버퍼를 만들어줘", "BUFFER", {"entities": [{"type": "위치명", "value": "서울역"}, {"type": "거리", "value": "500m"}]}, []),
+    ("한강과 교차하는 행정동을 찾아줘", "TOPOLOGICAL", {"entities": [{"type": "위치명", "value": "한강"}, {"type": "공간 관계", "value": "교차"}]}, ["River"]),
+    ("서초구와 강남구 사이의 거리", "DISTANCE", {"entities": [{"type": "위치명", "value": "서초구"}, {"type": "위치명", "value": "강남구"}]}, ["AdminGu"]),
+]
+
+
+def synthetic_schema(labels: int, properties: int):
+    names = [f"Layer{i}" for i in range(labels)] + ["AdminDong", "AdminGu", "Road", "River"]
+    node_props = {
+        name: ["name", "geometry", "code"] + [f"attr_{name.lower()}_{j}" for j in range(properties)]
+        for name in names
+    }
+    return {
+        "labels": names,
+        "relationshipTypes": [f"REL_{i}" for i in range(labels // 4)],
+        "propertyKeys": sorted({p for props in node_props.values() for p in props}),
+        "nodeProperties": node_props,
+        "relProperties": {f"REL_{i}": ["weight"] for i in range(labels // 4)}
+    }
+
+
+def prompt_tokens(schema_str: str, question: str, query_type: str, entities) -> int:
+    text = cypher_generation_prompt.format(
+        input=question,
+        query_type=query_type,
+        entities=json.dumps(entities, ensure_ascii=False, indent=2),
+        schema=schema_str
+    )
+    return estimate_tokens(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", help="persisted schema cache JSON file")
+    parser.add_argument("--labels", type=int, default=60)
+    parser.add_argument("--properties", type=int, default=25)
+    parser.add_argument("--budget", type=int, default=800)
+    args = parser.parse_args()
+
+    if args.schema and os.path.exists(os.path.expanduser(args.schema)):
+        with open(os.path.expanduser(args.schema), encoding="utf-8") as f:
+            data = json.load(f)
+        schema = data.get("schema", data)
+    else:
+        schema = synthetic_schema(args.labels, args.properties)
+
+    renderer = SchemaRenderer(token_budget=args.budget)
+    full_str = json.dumps(schema, ensure_ascii=False, indent=2)
+    before, after, render_times = [], [], []
+    for question, query_type, entities, labels in QUESTIONS:
+        # Labels the gazetteer would resolve the places to (resolved_entities)
+        resolved = [{"label": label} for label in labels]
+        start = time.perf_counter()
+        compact = renderer.render(schema, entities=entities, question=question, query_type=query_type, resolved=resolved)
+        render_times.append(time.perf_counter() - start)
+        before.append(prompt_tokens(full_str, question, query_type, entities))
+        after.append(prompt_tokens(compact, question, query_type, entities))
+        print(f"{question:<28} {before[-1]:>7} -> {after[-1]:>6} tokens  "
+              f"({renderer.last_stats['labels_included']}/{renderer.last_stats['labels_total']} labels)")
+
+    print(f"\nmean prompt tokens: {statistics.mean(before):.0f} -> {statistics.mean(after):.0f} "
+          f"({(1 - statistics.mean(after) / statistics.mean(before)) * 100:.1f}% smaller)")
+    print(f"median render time: {statistics.median(render_times) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
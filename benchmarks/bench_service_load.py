@@ -0,0 +1,141 @@
+"""
+Load test for the HTTP service (agent/service.py). Reports throughput, the
+status mix (200 / 503 shed / 504 deadline) and p50/p95/p99 latency.
+
+By default the ASGI app runs in-process on the stub model and driver
+(benchmarks/stubs.py) and requests go through httpx's ASGI transport, so no
+server, OpenAI or Neo4j is needed. With --url the same load is sent over
+HTTP to a running service (uvicorn agent.service:app).
+
+Closed loop (N clients, each sends its next request when the last returns):
+
+    python benchmarks/bench_service_load.py --concurrency 32 --requests 500
+
+Open loop (fixed arrival rate, overload shows up as 503s instead of queueing):
+
+    python benchmarks/bench_service_load.py --rate 200 --requests 1000 --max-in-flight 16 --max-queue 32
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+# Repeated questions must do the full work every time
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+
+import httpx
+
+QUESTIONS = [
+    "반포3동의 중심점을 구해줘",
+    "반포3동 반경 500m 버퍼를 만들어줘",
+    "반포3동이 서초구 안에 있는지",
+    "반포3동의 이웃 동네는 어디야"
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def send(client, endpoint, i, timeout, latencies, statuses):
+    path = "/v1/ask/stream" if endpoint == "stream" else "/v1/ask"
+    body = {"question": QUESTIONS[i % len(QUESTIONS)], "timeout": timeout}
+    start = time.perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        status = response.status_code
+        # A stream that hit its deadline reports it in the last event
+        if status == 200 and endpoint == "stream" and "event: error" in response.text:
+            status = 504
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    latencies.append((status, time.perf_counter() - start))
+    statuses[status] += 1
+
+
+async def closed_loop(client, args, latencies, statuses):
+    counter = iter(range(args.requests))
+
+    async def worker():
+        for i in counter:
+            await send(client, args.endpoint, i, args.timeout, latencies, statuses)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client, args, latencies, statuses):
+    tasks = []
+    start = time.perf_counter()
+    for i in range(args.requests):
+        # Requests are issued on schedule whether or not earlier ones have returned
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, args.endpoint, i, args.timeout, latencies, statuses)))
+    await asyncio.gather(*tasks)
+
+
+async def run(args):
+    service = None
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        from stubs import install_stubs
+        from agent.service import AgentService
+        install_stubs(llm_delay=args.llm_delay, db_delay=args.db_delay, rows=args.rows)
+        service = AgentService(max_in_flight=args.max_in_flight, max_queue=args.max_queue)
+        await service.startup()
+        transport, base_url = httpx.ASGITransport(app=service), "http://service"
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout + 30, limits=limits) as client:
+        # One request to warm up the workflow and the caches of the stub backends
+        await client.post("/v1/ask", json={"question": QUESTIONS[0]})
+        latencies, statuses = [], Counter()
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, args, latencies, statuses)
+        else:
+            await closed_loop(client, args, latencies, statuses)
+        elapsed = time.perf_counter() - start
+        ready = (await client.get("/readyz")).json()
+    return latencies, statuses, elapsed, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running service (default: in-process app on stubs)")
+    parser.add_argument("--endpoint", choices=("ask", "stream"), default="ask")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32, help="closed-loop clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop requests per second (overrides --concurrency)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request deadline sent to the service")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="in-process service: concurrent questions")
+    parser.add_argument("--max-queue", type=int, default=64, help="in-process service: queued questions")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="in-process service: seconds per stub LLM call")
+    parser.add_argument("--db-delay", type=float, default=0.005, help="in-process service: seconds per stub query")
+    parser.add_argument("--rows", type=int, default=5, help="in-process service: rows per geometry result")
+    args = parser.parse_args()
+
+    latencies, statuses, elapsed, ready = asyncio.run(run(args))
+    ok = [seconds for status, seconds in latencies if status == 200]
+    mode = f"open loop {args.rate:g} req/s" if args.rate else f"closed loop, {args.concurrency} clients"
+    print(f"{args.requests} requests to /{args.endpoint} ({mode}) in {elapsed:.2f} s: "
+          f"{len(ok) / elapsed:.1f} ok/s")
+    print("status: " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+    for label, values in (("ok", ok), ("all", [seconds for _, seconds in latencies])):
+        if values:
+            print(f"{label:<4} p50 {percentile(values, 0.50) * 1000:8.1f} ms  p95 {percentile(values, 0.95) * 1000:8.1f} ms  "
+                  f"p99 {percentile(values, 0.99) * 1000:8.1f} ms  mean {statistics.mean(values) * 1000:8.1f} ms")
+    print(f"admission: {ready.get('admission')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Measure how much the STR-tree envelope prefilter reduces the pairs a
+pairwise gspatial.operation has to test, on a synthetic grid of square
+polygons (n side) against randomly placed small quadrilaterals (m side).
+
+Exact tests are a pure-Python separating-axis intersection check standing in
+for the procedure: the prefiltered run executes them on every candidate
+pair, the brute-force time is extrapolated from a random sample of pairs.
+The script also checks that every envelope-intersecting pair is covered.
+
+    python benchmarks/bench_spatial_prefilter.py --grid 50 --features 2000
+    python benchmarks/bench_spatial_prefilter.py --distance 1.5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.spatial_index import EnvelopeIndex, wkt_envelope
+
+# Projected (metre-like) coordinates, so distances are not converted from degrees
+ORIGIN = (200000.0, 400000.0)
+
+
+def polygon_wkt(points):
+    ring = points + [points[0]]
+    return "POLYGON ((" + ", ".join(f"{x} {y}" for x, y in ring) + "))"
+
+
+def synthetic_layers(grid: int, features: int, seed: int = 0):
+    rng = random.Random(seed)
+    ox, oy = ORIGIN
+    cells = {}
+    for i in range(grid):
+        for j in range(grid):
+            cells[f"cell:{i}:{j}"] = [(ox + i, oy + j), (ox + i + 1, oy + j), (ox + i + 1, oy + j + 1), (ox + i, oy + j + 1)]
+    shapes = {}
+    for k in range(features):
+        cx, cy = ox + rng.uniform(0, grid), oy + rng.uniform(0, grid)
+        size = rng.uniform(0.05, 0.4)
+        shapes[f"shape:{k}"] = [
+            (cx - size, cy - size * rng.random()), (cx + size * rng.random(), cy - size),
+            (cx + size, cy + size * rng.random()), (cx - size * rng.random(), cy + size)
+        ]
+    return cells, shapes
+
+
+def _project(points, axis):
+    values = [x * axis[0] + y * axis[1] for x, y in points]
+    return min(values), max(values)
+
+
+def convex_intersects(a, b) -> bool:
+    """Separating-axis test for two convex polygons."""
+    for poly in (a, b):
+        for k in range(len(poly)):
+            x1, y1 = poly[k]
+            x2, y2 = poly[(k + 1) % len(poly)]
+            axis = (y1 - y2, x2 - x1)
+            amin, amax = _project(a, axis)
+            bmin, bmax = _project(b, axis)
+            if amax < bmin or bmax < amin:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, default=50, help="grid cells per side (n = grid^2)")
+    parser.add_argument("--features", type=int, default=2000, help="random polygons on the m side")
+    parser.add_argument("--distance", type=float, default=None, help="distance-bounded mode")
+    parser.add_argument("--sample", type=int, default=20000, help="pairs sampled to time brute force")
+    args = parser.parse_args()
+
+    cells, shapes = synthetic_layers(args.grid, args.features)
+    geometries = {**cells, **shapes}
+
+    start = time.perf_counter()
+    entries = {}
+    for label, layer in (("Cell", cells), ("Shape", shapes)):
+        ids = list(layer)
+        boxes = np.array([wkt_envelope(polygon_wkt(layer[i])) for i in ids])
+        entries[label] = (ids, boxes)
+    parse_seconds = time.perf_counter() - start
+    index = EnvelopeIndex(ttl=-1)
+    start = time.perf_counter()
+    index.load_envelopes(entries)
+    build_seconds = time.perf_counter() - start
+    print(f"index: {index.stats()['nodes']} envelopes, WKT parse {parse_seconds:.2f}s, "
+          f"STR build {build_seconds * 1000:.1f} ms, {len(index.tree.levels)} levels")
+
+    n_ids, m_ids = list(cells), list(shapes)
+    start = time.perf_counter()
+    groups, pairs_after = index.candidate_groups(n_ids, m_ids, args.distance)
+    prefilter_seconds = time.perf_counter() - start
+    pairs_before = len(n_ids) * len(m_ids)
+
+    # Coverage: every envelope-intersecting (or within-distance) pair is in some group
+    margin = args.distance or 0.0
+    n_boxes, m_boxes = entries["Cell"][1], entries["Shape"][1]
+    expected = (
+        (n_boxes[:, None, 0] - margin <= m_boxes[None, :, 2]) & (n_boxes[:, None, 2] + margin >= m_boxes[None, :, 0]) &
+        (n_boxes[:, None, 1] - margin <= m_boxes[None, :, 3]) & (n_boxes[:, None, 3] + margin >= m_boxes[None, :, 1])
+    )
+    n_row, m_row = {i: k for k, i in enumerate(n_ids)}, {i: k for k, i in enumerate(m_ids)}
+    covered = np.zeros_like(expected)
+    for group in groups:
+        covered[np.ix_([n_row[i] for i in group["n"]], [m_row[i] for i in group["m"]])] = True
+    missing = int((expected & ~covered).sum())
+
+    rng = random.Random(1)
+    sample = [(rng.choice(n_ids), rng.choice(m_ids)) for _ in range(args.sample)]
+    start = time.perf_counter()
+    for a, b in sample:
+        convex_intersects(geometries[a], geometries[b])
+    per_pair = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    true_pairs = 0
+    for group in groups:
+        for a in group["n"]:
+            for b in group["m"]:
+                true_pairs += convex_intersects(geometries[a], geometries[b])
+    exact_seconds = time.perf_counter() - start
+
+    print(f"pairs: {pairs_before:,} -> {pairs_after:,} in {len(groups)} groups "
+          f"({pairs_after / pairs_before * 100:.2f}%), envelope pairs missed: {missing}")
+    print(f"prefilter: {prefilter_seconds * 1000:.1f} ms")
+    print(f"exact tests, brute force (est.): {pairs_before * per_pair:.2f}s")
+    print(f"exact tests, prefiltered:        {exact_seconds + prefilter_seconds:.2f}s "
+          f"({true_pairs:,} intersecting pairs)")
+
+
+if __name__ == "__main__":
+    main()
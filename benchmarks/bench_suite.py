@@ -0,0 +1,201 @@
+"""
+Offline benchmark suite for the whole pipeline, on the fake chat model and
+the fake Bolt driver (benchmarks/stubs.py); no OpenAI or Neo4j access needed.
+
+For each scenario question it measures end-to-end latency (sync invoke) and
+per-node latency (instrumented workflow), then async throughput at several
+concurrency levels and peak Python heap memory (tracemalloc) per scenario.
+Results are written as JSON and compared against a stored baseline; a
+metric worse than the baseline by more than --tolerance (and by more than a
+small absolute slack) is reported as a regression and the exit code is 1.
+
+    python benchmarks/bench_suite.py --output bench_results.json
+    python benchmarks/bench_suite.py --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+# Repeated questions must do the full work every time
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+
+from stubs import install_stubs
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bench_baseline.json")
+
+SCENARIOS = {
+    # template Cypher, one POINT, template response
+    "centroid": "반포3동의 중심점을 구해줘",
+    # template Cypher, WKT polygons summarized for the LLM response
+    "buffer": "반포3동 반경 500m 버퍼를 만들어줘",
+    # node pairs with polygon properties
+    "within": "반포3동이 서초구 안에 있는지",
+    # no operation keyword: LLM classification and LLM Cypher
+    "llm_cypher": "반포3동의 이웃 동네는 어디야"
+}
+
+# Absolute differences below these are noise, whatever the relative change
+SLACK = {"ms": 1.0, "mib": 0.5, "qps": 0.0}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure_latency(workflow, runs, metrics):
+    from agent.flow import _initial_state
+    for name, question in SCENARIOS.items():
+        workflow.invoke(_initial_state(question))  # warm up
+        timings, nodes = [], defaultdict(list)
+        for _ in range(runs):
+            start = time.perf_counter()
+            state = workflow.invoke(_initial_state(question))
+            timings.append(time.perf_counter() - start)
+            for record in state.get("node_metrics") or []:
+                nodes[record["node"]].append(record["seconds"])
+        metrics[f"e2e.{name}.p50_ms"] = statistics.median(timings) * 1000
+        metrics[f"e2e.{name}.p95_ms"] = percentile(timings, 0.95) * 1000
+        for node, seconds in nodes.items():
+            # Nodes that run more than once per question (repairs) add one sample per call
+            metrics[f"node.{name}.{node}.p50_ms"] = statistics.median(seconds) * 1000
+
+
+async def _throughput(workflow, concurrency, total):
+    from agent.flow import _initial_state
+    questions = list(SCENARIOS.values())
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await workflow.ainvoke(_initial_state(questions[i % len(questions)]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def measure_throughput(workflow, levels, metrics):
+    for concurrency in levels:
+        total = max(16, concurrency * 4)
+        metrics[f"throughput.c{concurrency}.qps"] = asyncio.run(_throughput(workflow, concurrency, total))
+
+
+def measure_memory(workflow, metrics):
+    from agent.flow import _initial_state
+    for name, question in SCENARIOS.items():
+        tracemalloc.start()
+        workflow.invoke(_initial_state(question))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics[f"memory.{name}.peak_mib"] = peak / 2 ** 20
+
+
+def unit(metric: str) -> str:
+    # "e2e.buffer.p50_ms" -> "ms", "throughput.c8.qps" -> "qps"
+    return metric.rsplit(".", 1)[-1].rsplit("_", 1)[-1]
+
+
+def compare(metrics, baseline, tolerance):
+    """Return (metric, baseline, current, change) for every regression."""
+    regressions = []
+    for metric, before in sorted(baseline["metrics"].items()):
+        if metric not in metrics:
+            continue
+        after = metrics[metric]
+        kind = unit(metric)
+        higher_is_better = kind == "qps"
+        worse = before - after if higher_is_better else after - before
+        if before and worse > tolerance * abs(before) and worse > SLACK.get(kind, 0.0):
+            regressions.append((metric, before, after, worse / abs(before)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--db-delay", type=float, default=0.005, help="seconds per fake query")
+    parser.add_argument("--rows", type=int, default=5, help="rows per geometry result")
+    parser.add_argument("--vertices", type=int, default=2000, help="vertices per synthetic polygon")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated async concurrency levels")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args()
+
+    config = {
+        "llm_delay": args.llm_delay,
+        "llm_token_delay": args.llm_token_delay,
+        "db_delay": args.db_delay,
+        "rows": args.rows,
+        "vertices": args.vertices,
+        "runs": args.runs
+    }
+    install_stubs(
+        llm_delay=args.llm_delay,
+        db_delay=args.db_delay,
+        rows=args.rows,
+        vertices=args.vertices,
+        llm_latency_per_token=args.llm_token_delay
+    )
+    from agent.flow import create_workflow
+
+    workflow = create_workflow(instrumented=True)
+    metrics = {}
+    measure_latency(workflow, args.runs, metrics)
+    measure_throughput(create_workflow(instrumented=False), [int(c) for c in args.concurrency.split(",")], metrics)
+    measure_memory(create_workflow(instrumented=False), metrics)
+    metrics = {metric: round(value, 4) for metric, value in metrics.items()}
+
+    results = {
+        "config": config,
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "metrics": metrics
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    width = max(len(metric) for metric in metrics)
+    for metric, value in metrics.items():
+        print(f"{metric:<{width}} {value:>12.3f}")
+    print(f"\nwrote {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"updated baseline {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against (run with --update-baseline)")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"warning: baseline was recorded with {baseline.get('config')}")
+    regressions = compare(metrics, baseline, args.tolerance)
+    if not regressions:
+        print(f"no regressions against the baseline (tolerance {args.tolerance:.0%})")
+        return
+    print(f"\n{len(regressions)} regression(s) against the baseline (tolerance {args.tolerance:.0%}):")
+    for metric, before, after, change in regressions:
+        print(f"  {metric:<{width}} {before:>10.3f} -> {after:>10.3f} ({change:+.0%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure how often the template compiler can build the Cypher without the LLM
+on a labelled question corpus, and check the operation it picks.
+
+    python benchmarks/bench_template_compiler.py --corpus benchmarks/data/questions.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent.compiler import compile_cypher
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "questions.jsonl")
+SCHEMA = {"nodeProperties": {"AdminDong": ["name", "geometry"], "Station": ["name", "geometry"]}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    hits, wrong_operation = Counter(), 0
+    totals = Counter(item["query_type"] for item in corpus)
+    elapsed = 0.0
+    for item in corpus:
+        start = time.perf_counter()
+        compiled = compile_cypher(item["query_type"], item["question"], item["entities"], SCHEMA)
+        elapsed += time.perf_counter() - start
+        if compiled is None:
+            if args.verbose:
+                print(f"fallback  {item['question']}")
+            continue
+        hits[item["query_type"]] += 1
+        if compiled[1]["operation"] != item["operation"]:
+            wrong_operation += 1
+            print(f"wrong op  {item['question']}: {compiled[1]['operation']} != {item['operation']}")
+
+    for query_type in sorted(totals):
+        print(f"{query_type:<12} {hits[query_type]:>3}/{totals[query_type]:<3} compiled")
+    total_hits = sum(hits.values())
+    print(f"\nhit rate: {total_hits}/{len(corpus)} ({total_hits / len(corpus) * 100:.1f}%), "
+          f"wrong operation: {wrong_operation}, mean compile time: {elapsed / len(corpus) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
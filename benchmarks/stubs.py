@@ -0,0 +1,385 @@
+"""
+Deterministic local stand-ins for the OpenAI chat model and the Neo4j driver,
+used by the benchmark scripts so the pipeline can be timed offline.
+
+- FakeChatModel: a LangChain chat model with configurable latency and token
+  usage that returns a canned answer per pipeline prompt.
+- FakeDriver / FakeAsyncDriver: in-process Bolt driver stand-ins installed in
+  agent.db's driver managers, so every session opened by the agent goes
+  through them. gspatial.operation queries return synthetic WKT records of
+  configurable size (FakeGraph).
+"""
+import json
+import math
+import time
+import asyncio
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+
+DEFAULT_CYPHER = """```cypher
+MATCH (n)
+WITH collect(n) AS n_list
+CALL gspatial.operation('CENTROID', [n_list]) YIELD n, result
+RETURN result
+```"""
+
+STUB_PLAN = {
+    "query_type": "SINGLE",
+    "operation": "CENTROID",
+    "entities": [{"type": "위치명", "value": "반포3동"}],
+    "cypher": DEFAULT_CYPHER.strip("`").replace("cypher\n", "", 1).strip()
+}
+
+CENTER = (127.00397653968966, 37.51232775350869)
+
+
+def canned_response(prompt: str) -> str:
+    """Pick a canned answer based on which pipeline prompt is being rendered."""
+    if "쿼리 계획을 한 번에" in prompt:
+        return json.dumps(STUB_PLAN, ensure_ascii=False)
+    if "유형 (TOPOLOGICAL" in prompt:
+        return "SINGLE"
+    if "JSON 형식으로 출력하세요" in prompt:
+        # Known place names in the order they appear in the question
+        question = prompt.split("질문:", 1)[-1].split("\n", 1)[0]
+        places = sorted((question.find(value), value) for _, _, value in STUB_PLACES if value in question)
+        entities = [{"type": "위치명", "value": value} for _, value in places] or [{"type": "위치명", "value": "반포3동"}]
+        return json.dumps({"entities": entities}, ensure_ascii=False)
+    if "Cypher 쿼리를 작성하세요" in prompt:
+        return DEFAULT_CYPHER
+    return "반포3동의 중심점은 경도 127.0039765, 위도 37.5123278 지점에 위치해 있습니다."
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model stand-in. Each call sleeps `latency` seconds plus
+    `latency_per_token` per completion token and returns the canned answer
+    for the prompt with usage_metadata (estimated from the text, or the
+    fixed `output_tokens`). Usage is also added to `usage`, if given.
+    Bound arguments such as response_format are accepted and ignored.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: float = 0.5
+    latency_per_token: float = 0.0
+    output_tokens: Optional[int] = None
+    # Any, so pydantic keeps the caller's Counter instead of copying it
+    usage: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages) -> AIMessage:
+        from agent.schema_render import estimate_tokens
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = canned_response(prompt)
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = self.output_tokens if self.output_tokens is not None else estimate_tokens(content)
+        if self.usage is not None:
+            self.usage.update({"calls": 1, "input_tokens": input_tokens, "output_tokens": output_tokens})
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        })
+
+    def _delay(self, message: AIMessage) -> float:
+        return self.latency + self.latency_per_token * message.usage_metadata["output_tokens"]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        time.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        await asyncio.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def make_stub_llm(delay: float = 0.5, usage: Optional[Counter] = None, **kwargs) -> FakeChatModel:
+    """Return a FakeChatModel with `delay` seconds per call."""
+    return FakeChatModel(latency=delay, usage=usage, **kwargs)
+
+
+def polygon_wkt(vertices: int, radius: float = 0.005, center=CENTER, seed: int = 0) -> str:
+    """A closed, slightly irregular ring of `vertices` points around `center`."""
+    points = []
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        r = radius * (1 + 0.05 * math.sin(7 * angle + seed))
+        points.append(f"{center[0] + r * math.cos(angle):.12f} {center[1] + r * math.sin(angle):.12f}")
+    points.append(points[0])
+    return f"POLYGON (({', '.join(points)}))"
+
+
+class FakeNode(dict):
+    """Stands in for neo4j.graph.Node (labels + property items)."""
+
+    def __init__(self, labels, properties, element_id: str = ""):
+        super().__init__(properties)
+        self.labels = frozenset(labels)
+        self.element_id = element_id
+
+
+class FakeGraph:
+    """
+    Synthetic answers for gspatial.operation queries: one POINT for
+    CENTROID, `rows` rows with a `vertices`-vertex POLYGON for geometry
+    operations, node pairs with polygon properties for topological ones and
+    a number for measurements. Fixed `records` override all of them.
+    """
+
+    def __init__(self, rows: int = 1, vertices: int = 1000, records: Optional[List[Dict[str, Any]]] = None):
+        self.rows = rows
+        self.vertices = vertices
+        self.records = records
+        self._cache: Dict[str, List[Dict[str, Any]]] = {}
+
+    def records_for(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        from agent.compiler import query_operation, OPERATIONS
+        if self.records is not None:
+            return self.records
+        operation = query_operation(query, parameters)
+        if operation is None:
+            return []
+        if operation not in self._cache:
+            self._cache[operation] = self._build(operation, OPERATIONS)
+        # Fresh strings per query, as the Bolt driver decodes every record
+        return [{key: _copy_value(value) for key, value in record.items()} for record in self._cache[operation]]
+
+    def _build(self, operation: str, operations) -> List[Dict[str, Any]]:
+        if operation == "CENTROID":
+            return [{"result": f"POINT ({CENTER[0]} {CENTER[1]})"}]
+        if operation in ("AREA", "LENGTH", "DISTANCE", "SRID", "DIMENSION"):
+            return [{"result": 4326 if operation == "SRID" else 2 if operation == "DIMENSION" else 1234567.891}]
+        if operation in operations["TOPOLOGICAL"]:
+            district = FakeNode(["District"], {"name": "서초구", "geometry": polygon_wkt(self.vertices, 0.05)}, "4:d:0")
+            return [
+                {
+                    "n": FakeNode(["AdminDong"], {"name": f"반포{k}동", "geometry": polygon_wkt(self.vertices, 0.01, seed=k)}, f"4:a:{k}"),
+                    "m": district
+                }
+                for k in range(1, self.rows + 1)
+            ]
+        return [{"result": polygon_wkt(self.vertices, seed=k)} for k in range(self.rows)]
+
+
+def _copy_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.encode("utf-8").decode("utf-8")
+    if isinstance(value, FakeNode):
+        return FakeNode(value.labels, {key: _copy_value(prop) for key, prop in value.items()}, value.element_id)
+    return value
+
+
+class FakeCounters:
+    contains_updates = False
+
+
+class FakeSummary:
+    def __init__(self, available_after: int, consumed_after: int):
+        self.result_available_after = available_after
+        self.result_consumed_after = consumed_after
+        self.counters = FakeCounters()
+
+
+def _answer(graph: FakeGraph, query: str, parameters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    stripped = query.lstrip()
+    if stripped.upper().startswith(("EXPLAIN", "PROFILE")):
+        return []
+    if "AS marker" in query:
+        return [{"marker": [1000, 0]}]
+    return graph.records_for(query, parameters)
+
+
+class FakeResult:
+    def __init__(self, records: List[Dict[str, Any]], available_after_ms: int):
+        self._records = list(records)
+        self._iter = iter(self._records)
+        self._summary = FakeSummary(available_after_ms, len(self._records) // 100)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iter)
+
+    def peek(self):
+        return self._records[0] if self._records else None
+
+    def single(self):
+        return next(self._iter, None)
+
+    def consume(self):
+        for _ in self._iter:
+            pass
+        return self._summary
+
+
+class FakeSession:
+    def __init__(self, graph: FakeGraph, delay: float):
+        self.graph = graph
+        self.delay = delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        records = _answer(self.graph, query, parameters or kwargs)
+        if records or not query.lstrip().upper().startswith("EXPLAIN"):
+            # Planning only (EXPLAIN) skips the execution delay
+            time.sleep(self.delay)
+        return FakeResult(records, int(self.delay * 1000))
+
+
+class FakeDriver:
+    """In-process stand-in for neo4j.Driver."""
+
+    def __init__(self, graph: Optional[FakeGraph] = None, delay: float = 0.0):
+        self.graph = graph or FakeGraph()
+        self.delay = delay
+
+    def session(self, **kwargs):
+        return FakeSession(self.graph, self.delay)
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        return None
+
+
+class FakeAsyncResult(FakeResult):
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def single(self):
+        return next(self._iter, None)
+
+    async def consume(self):
+        return FakeResult.consume(self)
+
+
+class FakeAsyncSession(FakeSession):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, parameters=None, **kwargs):
+        records = _answer(self.graph, query, parameters or kwargs)
+        if records or not query.lstrip().upper().startswith("EXPLAIN"):
+            await asyncio.sleep(self.delay)
+        return FakeAsyncResult(records, int(self.delay * 1000))
+
+
+class FakeAsyncDriver(FakeDriver):
+    """In-process stand-in for neo4j.AsyncDriver."""
+
+    def session(self, **kwargs):
+        return FakeAsyncSession(self.graph, self.delay)
+
+    async def verify_connectivity(self):
+        return None
+
+    async def close(self):
+        return None
+
+
+def install_fake_driver(graph: Optional[FakeGraph] = None, delay: float = 0.0) -> FakeGraph:
+    """Route every agent.db session (sync and async) to the fake driver."""
+    import agent.db as db
+
+    graph = graph or FakeGraph()
+
+    class FakeAsyncDriverManager(db.AsyncNeo4jDriverManager):
+        # The real manager creates one driver per event loop; the fake serves all loops
+        @property
+        def driver(self):
+            return self._driver
+
+    manager = db.Neo4jDriverManager()
+    manager._driver = FakeDriver(graph, delay)
+    async_manager = FakeAsyncDriverManager()
+    async_manager._driver = FakeAsyncDriver(graph, delay)
+    db._manager, db._async_manager = manager, async_manager
+    return graph
+
+
+def stub_schema() -> Dict[str, Any]:
+    """Schema of the labels in STUB_PLACES, each with a name and a WKT geometry property."""
+    labels = sorted({label for label, _, _ in STUB_PLACES})
+    return {
+        "labels": labels,
+        "relationshipTypes": [],
+        "propertyKeys": ["name", "geometry"],
+        "nodeProperties": {label: ["name", "geometry"] for label in labels},
+        "relProperties": {}
+    }
+
+
+class StubSchemaCache:
+    fingerprint = "stub"
+
+    def get(self):
+        return stub_schema()
+
+
+STUB_PLACES = [
+    ("AdminDong", "name", "반포3동"),
+    ("AdminDong", "name", "반포4동"),
+    ("AdminDong", "name", "서초동"),
+    ("District", "name", "서초구"),
+    ("District", "name", "강남구"),
+    ("Station", "name", "강남역")
+]
+
+
+def make_stub_gazetteer(entries=None):
+    """Return a preloaded gazetteer that never refreshes from the database."""
+    from agent.gazetteer import Gazetteer
+    gazetteer = Gazetteer(ttl=-1)
+    gazetteer.load_entries(entries or STUB_PLACES)
+    return gazetteer
+
+
+def install_stubs(
+    llm_delay: float = 0.5,
+    db_delay: float = 0.0,
+    records=None,
+    usage: Optional[Counter] = None,
+    rows: int = 1,
+    vertices: int = 1000,
+    llm_latency_per_token: float = 0.0
+) -> FakeGraph:
+    """
+    Use the fake chat model and the fake driver, with the schema and the
+    gazetteer of STUB_PLACES. Returns the FakeGraph answering the queries.
+    """
+    import agent.nodes as nodes
+
+    nodes.llm = make_stub_llm(llm_delay, usage=usage, latency_per_token=llm_latency_per_token)
+    nodes.get_schema = stub_schema
+    nodes.get_schema_cache = StubSchemaCache
+    gazetteer = make_stub_gazetteer()
+    nodes.get_gazetteer = lambda: gazetteer
+    return install_fake_driver(FakeGraph(rows, vertices, records), db_delay)
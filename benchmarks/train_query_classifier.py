@@ -0,0 +1,98 @@
+"""
+Train the local query_type classifier (agent/classifier.py) on synthetic
+questions built from phrasing templates and place names, and write the
+float16 model file. The labelled corpus in benchmarks/data is not used for
+training, so bench_query_classifier.py measures held-out accuracy.
+
+    python benchmarks/train_query_classifier.py --out agent/data/query_type_model.npz
+"""
+import os
+import sys
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.classifier import QueryTypeClassifier, DEFAULT_MODEL_PATH, LABELS
+
+AREAS = ["해운대구", "부산진구", "수영구", "분당구", "정자동", "서현동", "유성구", "둔산동", "수성구", "동래구",
+         "광안동", "노원구", "도봉구", "상계동", "목동", "신림동", "봉천동", "일산동구", "영통구", "구월동"]
+FEATURES = ["낙동강", "금강", "양재천", "탄천", "중랑천", "부산역", "대전역", "수원역", "판교역", "동대구역",
+            "월드컵공원", "올림픽공원", "경부고속도로", "수인분당선", "광안대교"]
+KINDS = ["건물", "학교", "공원", "지하철역", "병원", "도로", "하천", "행정동"]
+DISTANCES = ["100m", "300미터", "1km", "2킬로미터", "5km", "750m"]
+
+TEMPLATES = {
+    "SINGLE": [
+        "{a}의 중심점 좌표를 알려줘", "{a} 무게중심은 어디야", "{a}의 centroid",
+        "{a} 면적이 얼마나 돼?", "{a}의 넓이를 구해줘", "{a}는 얼마나 넓어?", "{a} area 계산",
+        "{f}의 총 길이는 몇이야", "{f} 연장 길이를 알려줘", "{f}는 얼마나 길어?",
+        "{a} 경계선 좌표를 보여줘", "{a}의 boundary를 구해줘", "{a} 외곽선을 그려줘",
+        "{a}의 볼록 껍질", "{a} convex hull을 계산해줘", "{a}를 감싸는 최소 경계 사각형을 구해줘",
+        "{a} bbox 알려줘", "{a}의 envelope", "{a} 외접 사각형 좌표",
+        "{f} 도형의 차원은?", "{f}는 몇 차원이야", "{a} 좌표계가 뭐야", "{f}의 srid 확인",
+        "{a} 공간 참조 시스템을 알려줘", "{a} 모양 정보를 알려줘", "{a}의 위치 좌표는?"
+    ],
+    "BUFFER": [
+        "{f} 주변 {d} 버퍼를 생성해줘", "{a} 반경 {d} 영역을 구해줘", "{f}에서 {d} 이내 영역",
+        "{f}을 중심으로 {d} 반경을 만들어줘", "{f} {d} buffer", "{a} 경계에서 {d} 확장한 영역",
+        "{f} 둘레 {d} 완충 구역", "{f} 기준 {d} 반경 범위를 그려줘", "{f} 근처 {d} 권역을 만들어줘"
+    ],
+    "DISTANCE": [
+        "{a}에서 {b}까지 얼마나 떨어져 있어?", "{a}와 {b} 사이 거리를 알려줘", "{f}까지의 거리는?",
+        "{a}랑 {f}는 몇 km 떨어져 있나", "{a}에서 {f}까지 distance", "{f}와 {g} 간의 최단 거리",
+        "{a}에서 가장 가까운 {k}까지 거리", "{a}와 {b}는 얼마나 멀어?", "{f}에서 {a}까지 몇 미터야"
+    ],
+    "SET": [
+        "{a}와 {b}의 교집합 영역을 구해줘", "{a}와 {b}가 겹치는 영역", "{a} intersection {b}",
+        "{a}와 {b}를 합쳐서 하나로 만들어줘", "{a}, {b} 합집합", "{a}와 {b}의 union을 구해줘",
+        "{a}에서 {b}를 뺀 영역", "{a}와 {b}의 차집합을 계산해줘", "{a}에서 {f} 부분을 제외한 영역",
+        "{a}와 {b} 두 영역을 병합해줘", "{a} difference {b}"
+    ],
+    "TOPOLOGICAL": [
+        "{f}와 교차하는 {k}를 찾아줘", "{a} 안에 있는 {k} 목록", "{a}에 속한 {k}는 뭐가 있어",
+        "{a}가 {f}를 포함하는지", "{a}와 {b}가 맞닿아 있어?", "{a}와 인접한 동네는?",
+        "{f}가 {a}를 가로지르나", "{a}와 {b}가 부분적으로 겹치나요", "{a}와 {b}는 분리되어 있는지",
+        "{a}와 {b}가 같은 도형이야?", "{a} 내부에 위치한 {k}", "{f}가 지나가는 {k}를 찾아줘",
+        "{a}에 있는 {k}를 모두 보여줘", "{a} 옆에 붙어있는 동네", "{a}와 {b}가 닿아 있는지 확인",
+        "{f}에 걸쳐 있는 {k}", "{a}의 이웃 행정동 목록", "{k} 중 {a}와 만나는 것"
+    ]
+}
+
+
+def synthesize(per_template: int, seed: int):
+    rng = random.Random(seed)
+    questions, labels = [], []
+    for query_type, templates in TEMPLATES.items():
+        for template in templates:
+            for _ in range(per_template):
+                a, b = rng.sample(AREAS, 2)
+                f, g = rng.sample(FEATURES, 2)
+                question = template.format(a=a, b=b, f=f, g=g, k=rng.choice(KINDS), d=rng.choice(DISTANCES))
+                questions.append(question)
+                labels.append(query_type)
+    return questions, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--per-template", type=int, default=12)
+    parser.add_argument("--dim", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questions, labels = synthesize(args.per_template, args.seed)
+    model = QueryTypeClassifier.train(questions, labels, dim=args.dim)
+    model.save(args.out)
+
+    predicted = [LABELS[int(model.model_proba(q).argmax())] for q in questions]
+    correct = sum(p == y for p, y in zip(predicted, labels))
+    print(f"trained on {len(questions)} questions {dict(Counter(labels))}")
+    print(f"training accuracy (model only): {correct / len(questions) * 100:.1f}%")
+    print(f"wrote {args.out} ({os.path.getsize(args.out) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,78 @@
 import os
+import argparse
 from dotenv import load_dotenv
-from agent.flow import run_agent
+from agent.db import close_driver
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="gSpatial LangGraph Agent")
+    parser.add_argument("--batch", metavar="QUESTIONS", help="질문 파일 (한 줄에 하나, 또는 JSONL)로 배치 실행")
+    parser.add_argument("--output", default="results.jsonl", help="배치 결과 JSONL 경로")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 질문 수")
+    parser.add_argument("--max-retries", type=int, default=5, help="LLM rate limit 재시도 횟수")
+    parser.add_argument("--no-resume", action="store_true", help="기존 결과를 무시하고 처음부터 실행")
+    parser.add_argument("--metrics-file", help="노드별 계측 지표 저장 경로 (.json이면 JSON, 그 외 Prometheus 텍스트)")
+    parser.add_argument("--metrics-port", type=int, help="Prometheus 지표 HTTP 포트 (/metrics, /metrics.json)")
+    parser.add_argument("--thread", help="이어서 진행할 대화 세션 ID (기본: 새 세션, SESSION_STORE=sqlite이면 재시작 후에도 유지)")
+    return parser.parse_args()
+
+def create_instrumented_workflow(args, checkpointer=None):
+    """Return an instrumented workflow when metrics are requested, otherwise None (default workflow)."""
+    if not args.metrics_file and args.metrics_port is None:
+        return None
+    from agent.flow import create_workflow
+    from agent.metrics import start_metrics_server
+    
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+        print(f"지표: http://localhost:{args.metrics_port}/metrics")
+    return create_workflow(instrumented=True, checkpointer=checkpointer)
+
+def save_metrics(args):
+    if args.metrics_file:
+        from agent.metrics import write_metrics
+        write_metrics(args.metrics_file)
+
+def run_batch_mode(args, workflow=None):
+    from agent.batch import run_batch
+    
+    summary = run_batch(
+        args.batch,
+        args.output,
+        workers=args.workers,
+        max_retries=args.max_retries,
+        resume=not args.no_resume,
+        workflow=workflow
+    )
+    save_metrics(args)
+    print("\n" + "="*50)
+    print("배치 실행 요약:")
+    print("="*50)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
 
 def main():
     # Load environment variables
     load_dotenv()
     
+    args = parse_args()
+    # LangGraph and the workflow are loaded after argument parsing, so --help stays fast
+    if args.batch:
+        try:
+            run_batch_mode(args, create_instrumented_workflow(args))
+        finally:
+            close_driver()
+        return
+    
+    # Interactive questions are turns of one session, so follow-ups
+    # ("그 면적은?") can refer to the previous answer
+    import uuid
+    from agent.flow import run_session
+    from agent.checkpoint import get_checkpointer
+    workflow = create_instrumented_workflow(args, get_checkpointer())
+    thread_id = args.thread or uuid.uuid4().hex
+    
     print("Neo4j Cypher Agent (LangGraph Version)")
+    print(f"세션: {thread_id}")
     print("Type 'exit' to quit\n")
     
     while True:
@@ -22,7 +88,8 @@ def main():
                 continue
                 
             # Run the agent
-            result = run_agent(question)
+            result = run_session(question, thread_id, workflow)
+            save_metrics(args)
             
             # Display the results
             print("\n" + "="*50)
@@ -40,8 +107,11 @@ def main():
                 for i, item in enumerate(result["query_result"][:5], 1):
                     print(f"{i}. {item}")
                 
-                if len(result["query_result"]) > 5:
-                    print(f"\n...총 {len(result['query_result'])}개 중 5개 항목만 표시됨")
+                total = result.get("row_count") or len(result["query_result"])
+                if total > 5:
+                    print(f"\n...총 {total}개 중 5개 항목만 표시됨")
+                if result.get("result_path"):
+                    print(f"전체 결과 파일: {result['result_path']}")
             
             print("\n" + "="*50 + "\n")
             
@@ -50,6 +120,9 @@ def main():
             break
         except Exception as e:
             print(f"\n오류가 발생했습니다: {str(e)}\n")
+    
+    # Release pooled Neo4j connections
+    close_driver()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file